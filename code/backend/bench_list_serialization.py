@@ -0,0 +1,131 @@
+# backend/bench_list_serialization.py
+"""
+Benchmark: list endpoint serialization, ORM + Pydantic vs Core rows + FastJSONResponse.
+
+Seeds a throwaway SQLite database (never masumi.db) with --rows agents and --rows
+ratings of one agent, then serves every row in one response through two otherwise
+identical FastAPI routes per resource:
+
+    legacy  ORM objects -> AgentOut/RatingOut models -> response_model validation -> JSONResponse
+    fast    Core column tuples -> plain dicts -> FastJSONResponse (orjson when installed)
+
+Both bodies are checked for equality before timing. Reports the median latency of
+--repeat requests per route and the speed-up.
+
+    cd code && python -m backend.bench_list_serialization [--rows 10000] [--repeat 20]
+"""
+
+import argparse
+import hashlib
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi import Depends, FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend import responses
+from backend.database.database import Base
+from backend.database.models import Agent, Rating
+from backend.routes.route import (AGENT_OUT_COLUMNS, RATING_OUT_COLUMNS, PaginatedAgents, PaginatedRatings,
+                                  RatingOut, _agent_dict, _attach_img, _fast_json, _rating_dict)
+
+RATED_AGENT_ID = "agent-00000"
+RATED_AGENT_DID = "did:masumi:agent-00000"
+
+
+def seed(session_factory, rows: int) -> None:
+    with session_factory() as db:
+        db.add_all(Agent(id=f"agent-{i:05d}", name=f"Agent {i}", category=("Finance", "Research", "Coding")[i % 3],
+                         description=f"Benchmark agent number {i} " * 4, did=f"did:masumi:agent-{i:05d}",
+                         url=f"https://agents.example/{i}", price_usd=round(i % 50 * 0.5, 2),
+                         avg_score=round(1 + i % 400 / 100, 2), num_ratings=i % 97,
+                         img_url=f"dataset/image/agent_{i}.png" if i % 4 else None) for i in range(rows))
+        db.add_all(Rating(agent_id=RATED_AGENT_ID, user_id=f"user-{i}", score=1 + i % 5,
+                          comment=f"Comment {i}" if i % 3 else "", timestamp=f"2025-01-01T00:00:{i:08d}",
+                          hash=hashlib.sha256(str(i).encode()).hexdigest()) for i in range(rows))
+        db.commit()
+
+
+def build_app(session_factory) -> FastAPI:
+    def get_db():
+        with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/legacy/agents", response_model=PaginatedAgents)
+    def legacy_agents(db: Session = Depends(get_db)):
+        agents = db.query(Agent).order_by(Agent.avg_score.desc(), Agent.id.desc()).all()
+        items = [_attach_img(a) for a in agents]
+        return {"items": items, "page": 1, "page_size": len(items), "total_items": len(items), "next_cursor": None}
+
+    @app.get("/fast/agents", response_model=PaginatedAgents)
+    def fast_agents(response: Response, db: Session = Depends(get_db)):
+        rows = db.execute(select(*AGENT_OUT_COLUMNS).order_by(Agent.avg_score.desc(), Agent.id.desc())).all()
+        items = [_agent_dict(row) for row in rows]
+        return _fast_json({"items": items, "page": 1, "page_size": len(items), "total_items": len(items),
+                           "next_cursor": None}, response)
+
+    @app.get("/legacy/ratings", response_model=PaginatedRatings)
+    def legacy_ratings(db: Session = Depends(get_db)):
+        ratings = (db.query(Rating).filter(Rating.agent_id == RATED_AGENT_ID)
+                   .order_by(Rating.timestamp.desc(), Rating.id.desc()).all())
+        items = [RatingOut.model_validate(r).model_copy(update={"did": RATED_AGENT_DID}) for r in ratings]
+        return {"items": items, "page": 1, "page_size": len(items), "total_items": len(items),
+                "total_estimated": False, "next_cursor": None}
+
+    @app.get("/fast/ratings", response_model=PaginatedRatings)
+    def fast_ratings(response: Response, db: Session = Depends(get_db)):
+        rows = db.execute(select(*RATING_OUT_COLUMNS).where(Rating.agent_id == RATED_AGENT_ID)
+                          .order_by(Rating.timestamp.desc(), Rating.id.desc())).all()
+        items = [_rating_dict(row, RATED_AGENT_DID) for row in rows]
+        return _fast_json({"items": items, "page": 1, "page_size": len(items), "total_items": len(items),
+                           "total_estimated": False, "next_cursor": None}, response)
+
+    return app
+
+
+def median_ms(client: TestClient, path: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.get(path).raise_for_status()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare legacy and fast list serialization paths.")
+    parser.add_argument("--rows", type=int, default=10000, help="Agents, and ratings of one agent, to serve (default: 10000)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed requests per route (default: 20)")
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # One INFO line per request otherwise
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        seed(session_factory, args.rows)
+
+        with TestClient(build_app(session_factory)) as client:
+            print(f"{args.rows} rows per response, median of {args.repeat} requests, "
+                  f"encoder: {'orjson' if responses.orjson is not None else 'json'}")
+            for resource in ("agents", "ratings"):
+                legacy, fast = client.get(f"/legacy/{resource}"), client.get(f"/fast/{resource}")  # Also warm-up
+                if legacy.json() != fast.json():
+                    raise SystemExit(f"/{resource}: fast and legacy bodies differ")
+                legacy_ms = median_ms(client, f"/legacy/{resource}", args.repeat)
+                fast_ms = median_ms(client, f"/fast/{resource}", args.repeat)
+                print(f"  {resource:<8} legacy {legacy_ms:8.1f} ms   fast {fast_ms:8.1f} ms   "
+                      f"speed-up x{legacy_ms / fast_ms:.1f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# backend/database/catalog.py
+"""
+Process-local, read-through cache of the agent catalog.
+
+`/api/agents` and `/api/agents/{id}` are read far more often than the catalog
+changes, so `CatalogCache` keeps one snapshot of every agent as a ready-made
+response item (a plain dict in AgentOut's shape, built from Core column rows
+without ORM objects and served as-is by the fast JSON path), plus sorted views built lazily per
+(sort key, category, dedupe) listing and reused until the catalog changes.
+
+Changes are tracked by a version counter in the one-row `catalog_state` table.
+Every writer bumps it in the same transaction as its change: `submit_rating`,
+the registry loader and the near-duplicate job. Readers compare it (one
+primary-key lookup, at most every `check_interval_s`) with the snapshot's
+version and reload on mismatch, so writes made by other processes and workers
+are picked up. A worker's own rating submissions patch its snapshot instead of
+reloading it: the patch builds a new snapshot (copy-on-write) and swaps the
+reference, so readers always see one consistent version, and memoized views are
+carried over, with only the changed agent moved within the views sorted on a
+field that changed.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Row, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .models import AgentDuplicate, CatalogState  # Relative: also imported as code.backend.* by the build jobs
+
+CATALOG_STATE_ID = 1
+
+# Listing sort keys -> position in a snapshot row (category, avg_score, num_ratings)
+ROW_SORT_COLUMNS = {"avg_score": 1, "num_ratings": 2}
+
+
+def catalog_version(db: Session) -> int:
+    """Current catalog version (0 before the first write)."""
+    return db.execute(select(CatalogState.version).where(CatalogState.id == CATALOG_STATE_ID)).scalar() or 0
+
+
+def bump_catalog_version(db: Session) -> int:
+    """Increment the catalog version inside the caller's transaction (committed with the change itself)."""
+    if db.execute(update(CatalogState).where(CatalogState.id == CATALOG_STATE_ID)
+                  .values(version=CatalogState.version + 1)).rowcount == 0:
+        db.add(CatalogState(id=CATALOG_STATE_ID, version=1))
+        db.flush()
+    return catalog_version(db)
+
+
+def sort_key(value: Any, agent_id: str) -> tuple:
+    """Ascending key whose reverse is the SQL listing order (value DESC with NULLs last, then id DESC)."""
+    return (value is not None, value if value is not None else 0, agent_id)
+
+
+class _Snapshot:
+    """One catalog version: response items by id, listing inputs and memoized views (never mutated once built)."""
+
+    def __init__(self, version: int, items: Dict[str, Any], rows: Dict[str, tuple], hidden: frozenset):
+        self.version = version
+        self.items = items     # agent id -> response item (AgentOut-shaped dict)
+        self.rows = rows       # agent id -> (category, avg_score, num_ratings)
+        self.hidden = hidden   # Non-representative members of near-duplicate clusters
+        self.views: Dict[tuple, Tuple[List[tuple], List[str]]] = {}
+
+    def view(self, sort_by: str, category: Optional[str], dedupe: bool) -> Tuple[List[tuple], List[str]]:
+        """(ascending sort keys, agent ids) of one listing; read from the end for highest-first order."""
+        key = (sort_by, category, dedupe)
+        view = self.views.get(key)
+        if view is None:
+            column = ROW_SORT_COLUMNS[sort_by]
+            entries = sorted(
+                (sort_key(row[column], agent_id), agent_id) for agent_id, row in self.rows.items()
+                if (category is None or row[0] == category) and not (dedupe and agent_id in self.hidden)
+            )
+            view = self.views[key] = ([k for k, _ in entries], [agent_id for _, agent_id in entries])
+        return view
+
+    def listed(self, agent_id: str, category: Optional[str], dedupe: bool) -> bool:
+        """Whether the agent appears in the (category, dedupe) listing."""
+        return (category is None or self.rows[agent_id][0] == category) and not (dedupe and agent_id in self.hidden)
+
+
+def _moved(view: Tuple[List[tuple], List[str]], agent_id: str, old_key: tuple, new_key: tuple) -> Tuple[List[tuple], List[str]]:
+    """Copy of a sorted view with one agent moved from old_key to new_key (two bisects, no re-sort)."""
+    keys, ids = list(view[0]), list(view[1])
+    position = bisect_left(keys, old_key)
+    del keys[position], ids[position]
+    position = bisect_left(keys, new_key)
+    keys.insert(position, new_key)
+    ids.insert(position, agent_id)
+    return keys, ids
+
+
+class CatalogCache:
+    """Read-through agent catalog snapshot with version-checked invalidation and in-place rating patches."""
+
+    def __init__(self, session_factory: Callable, columns: Sequence, build_item: Callable[[Row], Dict[str, Any]],
+                 check_interval_s: float = 1.0):
+        self._session_factory = session_factory
+        self._columns = tuple(columns)  # Agent columns selected for build_item (must include id, category, avg_score, num_ratings)
+        self._build_item = build_item   # Column row -> response item
+        self.check_interval_s = check_interval_s
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.patches = 0
+        self.last_load_ms = 0.0
+
+    def snapshot(self) -> _Snapshot:
+        """The current snapshot, (re)loaded first if the catalog version moved on."""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.check_interval_s:
+            self.hits += 1
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            with self._session_factory() as db:
+                version = catalog_version(db)
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._snapshot = self._load(db, version)
+                else:
+                    self.hits += 1
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def _load(self, db: Session, version: int) -> _Snapshot:
+        started = time.perf_counter()
+        agents = db.execute(select(*self._columns)).all()
+        try:
+            hidden = frozenset(db.execute(
+                select(AgentDuplicate.agent_id).where(AgentDuplicate.cluster_id != AgentDuplicate.agent_id)
+            ).scalars())
+        except SQLAlchemyError:
+            db.rollback()
+            hidden = frozenset()  # No clusters yet: dedupe lists everything
+        snapshot = _Snapshot(
+            version,
+            {a.id: self._build_item(a) for a in agents},
+            {a.id: (a.category, a.avg_score, a.num_ratings) for a in agents},
+            hidden,
+        )
+        self.loads += 1
+        self.last_load_ms = (time.perf_counter() - started) * 1000
+        logging.info(f"Catalog cache loaded {len(agents)} agents at version {version} in {self.last_load_ms:.1f} ms.")
+        return snapshot
+
+    def get(self, agent_id: str) -> Optional[Any]:
+        """Response item of one agent, or None if it is not in the snapshot."""
+        return self.snapshot().items.get(agent_id)
+
+    def page(self, sort_by: str, category: Optional[str], dedupe: bool, page_size: int,
+             page: int = 1, after: Optional[tuple] = None) -> Tuple[List[Any], int, Optional[tuple], int]:
+        """
+        (items, total, sort key of the last item if another page follows, version) of one listing
+        page, highest first: by page number, or continuing after the sort key `after` (keyset).
+        """
+        snapshot = self.snapshot()
+        keys, ids = snapshot.view(sort_by, category, dedupe)
+        end = bisect_left(keys, after) if after is not None else len(keys) - (page - 1) * page_size
+        start = max(end - page_size, 0)
+        chosen = ids[start:end][::-1] if end > 0 else []
+        items = [snapshot.items[agent_id] for agent_id in chosen]
+        last = keys[start] if start > 0 and chosen else None
+        return items, len(keys), last, snapshot.version
+
+    def patch(self, agent_id: str, version: int, **fields: Any) -> bool:
+        """
+        Apply this worker's own write (committed at catalog `version`) without a reload. Only when
+        the snapshot was exactly one version behind; otherwise another writer got in between and
+        the next read reloads. The patched snapshot is a copy (readers holding the old one are
+        unaffected) that keeps every memoized view: views on an unchanged sort field are shared,
+        the others get the agent moved to its new position. Returns True if patched.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version - 1 or agent_id not in snapshot.items:
+                return False
+            old_row = snapshot.rows[agent_id]
+            new_row = (old_row[0], fields.get("avg_score", old_row[1]), fields.get("num_ratings", old_row[2]))
+            items, rows = dict(snapshot.items), dict(snapshot.rows)
+            items[agent_id] = {**items[agent_id], **fields}
+            rows[agent_id] = new_row
+            patched = _Snapshot(version, items, rows, snapshot.hidden)
+            for key, view in dict(snapshot.views).items(): # Copied first: readers may be memoizing views concurrently
+                sort_by, category, dedupe = key
+                column = ROW_SORT_COLUMNS[sort_by]
+                if old_row[column] != new_row[column] and snapshot.listed(agent_id, category, dedupe):
+                    view = _moved(view, agent_id, sort_key(old_row[column], agent_id), sort_key(new_row[column], agent_id))
+                patched.views[key] = view
+            self._snapshot = patched
+            self.patches += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot is not None else None,
+            "agents": len(snapshot.items) if snapshot is not None else 0,
+            "views": len(snapshot.views) if snapshot is not None else 0,
+            "hits": self.hits,
+            "loads": self.loads,
+            "patches": self.patches,
+            "last_load_ms": round(self.last_load_ms, 2),
+            "check_interval_s": self.check_interval_s,
+        }
@@ -1,7 +1,7 @@
 # backend/database/models.py
 
 from sqlalchemy import (
-    Column, String, Integer, Float, JSON, ForeignKey, Text, DateTime
+    Column, String, Integer, Float, JSON, ForeignKey, Text, DateTime, Index
 )
 from datetime import datetime
 # Import Base for the main application database
@@ -25,6 +25,15 @@ class Agent(Base):
     avg_score   = Column(Float, default=0.0)
     num_ratings = Column(Integer, default=0)
 
+    # Listing sort orders (GET /agents?sort_by=...), with and without a category filter.
+    # The trailing id makes every order total, which keyset cursors rely on.
+    __table_args__ = (
+        Index("ix_agents_avg_score_id", "avg_score", "id"),
+        Index("ix_agents_num_ratings_id", "num_ratings", "id"),
+        Index("ix_agents_category_avg_score_id", "category", "avg_score", "id"),
+        Index("ix_agents_category_num_ratings_id", "category", "num_ratings", "id"),
+    )
+
 
 class Rating(Base):
     """ User feedback/rating stored in the main database. """
@@ -37,6 +46,34 @@ class Rating(Base):
     timestamp = Column(String) # Store as ISO 8601 string
     hash = Column(String) # Optional hash for audit
 
+    # Newest-first rating pages per agent: keyset cursors seek on (agent_id, timestamp, id)
+    __table_args__ = (
+        Index("ix_ratings_agent_id_timestamp_id", "agent_id", "timestamp", "id"),
+    )
+
+
+class AgentDuplicate(Base):
+    """
+    Near-duplicate cluster membership, written by the `find_duplicates` batch job.
+    Only clustered agents have a row; the cluster's representative (the agent listings
+    and de-duplicated search keep) has cluster_id == agent_id.
+    """
+    __tablename__ = "agent_duplicates"
+    agent_id    = Column(String, ForeignKey("agents.id"), primary_key=True)
+    cluster_id  = Column(String, nullable=False, index=True) # Agent id of the cluster's representative
+    similarity  = Column(Float) # Highest cosine similarity to another member of the cluster
+    detected_at = Column(String) # ISO 8601 timestamp of the batch run
+
+
+class CatalogState(Base):
+    """
+    Single-row catalog version counter. Every write to agents (ratings, registry loads,
+    duplicate clusters) bumps it in the same transaction; catalog caches reload when it moves.
+    """
+    __tablename__ = "catalog_state"
+    id         = Column(Integer, primary_key=True) # Always 1
+    version    = Column(Integer, nullable=False, default=0)
+
 
 class RegistryEntry(Base):
     """ Stores the full, original Masumi registry JSON blob in the main database. """
@@ -45,6 +82,16 @@ class RegistryEntry(Base):
     full_json = Column(JSON)
 
 
+def create_missing_indexes(engine) -> None:
+    """
+    Create indexes declared on the main DB models that an existing database lacks.
+    `create_all` skips tables that already exist, including their newly added indexes.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
 # ------------- Recommendation DB Models (inherit from RecommendBase) -------------
 
 # Create a separate Base for models residing in recommend.db
@@ -17,6 +17,7 @@ import hashlib
 import json
 import uuid  # kept for future use (not strictly needed here)
 
+from backend.database.catalog import bump_catalog_version
 from backend.database.database import SessionLocal, engine, Base
 from backend.database.models import Agent, Rating, RegistryEntry
 
@@ -129,6 +130,7 @@ def main() -> None:
             if rows:
                 agent.num_ratings = len(rows)
                 agent.avg_score   = sum(r.score for r in rows) / len(rows)
+        bump_catalog_version(db)  # running servers reload their catalog caches
         db.commit()
 
         print(f"Imported {len(entries)} agents and {len(comments)} ratings.")
@@ -11,11 +11,9 @@ Entry-point for the FastAPI application.
 * Loads semantic search models on startup.
 """
 
+import os
 import sys
 import logging
-import json
-import numpy as np
-import faiss
 
 from sentence_transformers import SentenceTransformer
 from pathlib import Path
@@ -26,12 +24,24 @@ from apscheduler.schedulers.background import BackgroundScheduler
 
 # --- Database Imports ---
 # Import Base and engine for the main database
-from backend.database.database import Base as MainBase, engine as main_engine
+from backend.database.database import Base as MainBase, engine as main_engine, SessionLocal
+from backend.database.models import create_missing_indexes
 # Import the initializer for the recommendation database
 from backend.database.recommend_db import init_recommend_db
 
+# --- Search Runtime Imports ---
+from backend.search.encoder import MicroBatchEncoder
+from backend.search.executor import SearchExecutor, configure_thread_budget
+from backend.search.cache import SearchCache
+from backend.search.artifacts import ARTIFACT_VERIFY_MODES, SearchArtifactManager
+from backend.search.attributes import AgentAttributes
+from backend.search.hybrid import SEARCH_MODES, SearchOptions
+from backend.search.rerank import RerankParams
+from backend.search.metrics import process_memory
+from ml.search_model.versions import resolve_current
+
 # --- Router Import ---
-from backend.routes.route import router as ranker_router
+from backend.routes.route import router as ranker_router, create_catalog_cache
 
 # --- Disabled Sync Import ---
 # from backend.sync_registry_live import run_sync # Keep commented out
@@ -73,45 +83,153 @@ AGENTS_FILE_NAME = "agents.json"
 INDEX_FILE_NAME = "index.faiss"
 TRANSFORMER_MODEL_NAME = "all-MiniLM-L6-v2"
 
+# --- Query Encoder Micro-Batching (overridable via environment / .env) ---
+SEARCH_BATCH_MAX_SIZE = int(os.getenv("SEARCH_BATCH_MAX_SIZE", "32"))     # Max queries per encode call
+SEARCH_BATCH_MAX_WAIT_MS = float(os.getenv("SEARCH_BATCH_MAX_WAIT_MS", "3")) # Max time a query waits for batch-mates
+
+# --- Search Inference Executor (keeps encode/Faiss work off the event loop) ---
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "2"))                   # Threads dedicated to search inference
+SEARCH_MAX_QUEUE_DEPTH = int(os.getenv("SEARCH_MAX_QUEUE_DEPTH", "64"))  # In-flight searches before 503
+SEARCH_RETRY_AFTER_S = int(os.getenv("SEARCH_RETRY_AFTER_S", "1"))       # Retry-After sent with 503
+SEARCH_TORCH_THREADS = int(os.getenv("SEARCH_TORCH_THREADS", "0"))       # torch.set_num_threads (0 = library default)
+SEARCH_OMP_THREADS = int(os.getenv("SEARCH_OMP_THREADS", "0"))           # Faiss OpenMP threads (0 = library default)
+
+# --- Search Caches (size 0 or TTL 0 disables a level) ---
+SEARCH_CACHE_EMBEDDINGS_SIZE = int(os.getenv("SEARCH_CACHE_EMBEDDINGS_SIZE", "4096"))   # Normalized query -> embedding
+SEARCH_CACHE_EMBEDDINGS_TTL_S = float(os.getenv("SEARCH_CACHE_EMBEDDINGS_TTL_S", "3600"))
+SEARCH_CACHE_RESULTS_SIZE = int(os.getenv("SEARCH_CACHE_RESULTS_SIZE", "4096"))         # (embedding, top_k, filters, ANN params, index version) -> results
+SEARCH_CACHE_RESULTS_TTL_S = float(os.getenv("SEARCH_CACHE_RESULTS_TTL_S", "300"))
+
+# --- ANN Query Defaults (per deployment; requests may override; 0 = value stored in the index) ---
+SEARCH_NPROBE = int(os.getenv("SEARCH_NPROBE", "0"))        # IVF indexes: inverted lists scanned per query
+SEARCH_EF_SEARCH = int(os.getenv("SEARCH_EF_SEARCH", "0"))  # HNSW indexes: search beam width
+
+# --- Hybrid Search (lexical BM25 + semantic, fused with reciprocal rank fusion) ---
+SEARCH_DEFAULT_MODE = os.getenv("SEARCH_DEFAULT_MODE", "semantic")           # hybrid | semantic | lexical (requests may override)
+SEARCH_HYBRID_CANDIDATES = int(os.getenv("SEARCH_HYBRID_CANDIDATES", "50"))  # Depth of each ranking fed into the fusion
+SEARCH_RRF_K = int(os.getenv("SEARCH_RRF_K", "60"))                          # RRF damping constant
+SEARCH_LEXICAL_FALLBACK = os.getenv("SEARCH_LEXICAL_FALLBACK", "1") != "0"   # Answer lexically instead of 503 when saturated
+
+# --- Rating-Aware Re-Ranking (defaults; requests may override the weights) ---
+SEARCH_RERANK_RATING_WEIGHT = float(os.getenv("SEARCH_RERANK_RATING_WEIGHT", "0"))  # Weight of the Bayesian-average rating (0 = off)
+SEARCH_RERANK_PRICE_WEIGHT = float(os.getenv("SEARCH_RERANK_PRICE_WEIGHT", "0"))    # Weight of the (cheaper = higher) price signal
+SEARCH_RERANK_OVERFETCH = int(os.getenv("SEARCH_RERANK_OVERFETCH", "3"))            # Retrieve top_k * N candidates before re-ranking
+SEARCH_RATING_PRIOR = float(os.getenv("SEARCH_RATING_PRIOR", "5"))                  # Pseudo-ratings at the global mean per agent
+
+# --- Near-Duplicate Collapsing (clusters from `python -m code.ml.search_model.find_duplicates`) ---
+SEARCH_DEDUPE = os.getenv("SEARCH_DEDUPE", "0") != "0"                       # Keep one hit per near-duplicate cluster (requests may override)
+SEARCH_DEDUPE_OVERFETCH = int(os.getenv("SEARCH_DEDUPE_OVERFETCH", "3"))     # Retrieve top_k * N candidates before collapsing
+
+# --- Search Artifact Loading ---
+SEARCH_MMAP = os.getenv("SEARCH_MMAP", "1") != "0"  # Memory-map index + embeddings read-only (shared by all workers on a host)
+
+# --- Filtered Search ---
+SEARCH_ATTRIBUTES_REFRESH_S = int(os.getenv("SEARCH_ATTRIBUTES_REFRESH_S", "300"))  # Re-read category/price/rating filter attributes (0 = only on swap + rating submit)
+
+# --- Search Artifact Integrity ---
+SEARCH_ARTIFACT_VERIFY = os.getenv("SEARCH_ARTIFACT_VERIFY", "sampled")  # sampled (constant time) | full (re-hash files) | off
+
+# --- Agent Catalog Cache (GET /api/agents, /api/agents/{id}) ---
+CATALOG_CACHE = os.getenv("CATALOG_CACHE", "1") != "0"                  # Serve the catalog from a process-local snapshot
+CATALOG_CACHE_CHECK_S = float(os.getenv("CATALOG_CACHE_CHECK_S", "1"))  # Max staleness vs. other writers (version check interval; 0 = every read)
+
+# --- Search Artifact Hot Swap ---
+SEARCH_ARTIFACT_WATCH_S = int(os.getenv("SEARCH_ARTIFACT_WATCH_S", "30"))  # Poll search_model/CURRENT every N seconds (0 = off)
+
 # --- Startup Event: Load Search Models ---
 @app.on_event("startup")
 def load_search_models():
     """Load semantic search models and data into app.state on startup."""
     logging.info("Attempting to load semantic search models...")
     search_model_path = PROJECT_ROOT / MODEL_DIR_NAME
-    agents_path = search_model_path / AGENTS_FILE_NAME
-    index_path = search_model_path / INDEX_FILE_NAME
+    _, artifacts_path = resolve_current(search_model_path) # versions/<CURRENT>, or search_model/ itself (legacy layout)
+    agents_path = artifacts_path / AGENTS_FILE_NAME
+    index_path = artifacts_path / INDEX_FILE_NAME
     model_name = TRANSFORMER_MODEL_NAME
 
     # Initialize state
     app.state.search_enabled = False
-    app.state.search_agents_list = None
-    app.state.faiss_index = None
+    app.state.search_artifacts = None # SearchArtifactManager; `.current` is the version being served
     app.state.sentence_model = None
+    app.state.query_encoder = None
+    app.state.search_executor = None
+    if SEARCH_DEFAULT_MODE not in SEARCH_MODES:
+        logging.warning(f"Unknown SEARCH_DEFAULT_MODE '{SEARCH_DEFAULT_MODE}'; using 'semantic'.")
+    app.state.search_options = SearchOptions(
+        default_mode=SEARCH_DEFAULT_MODE if SEARCH_DEFAULT_MODE in SEARCH_MODES else "semantic",
+        hybrid_candidates=SEARCH_HYBRID_CANDIDATES,
+        rrf_k=SEARCH_RRF_K,
+        lexical_fallback=SEARCH_LEXICAL_FALLBACK,
+        rerank=RerankParams(
+            rating=SEARCH_RERANK_RATING_WEIGHT,
+            price=SEARCH_RERANK_PRICE_WEIGHT,
+            overfetch=SEARCH_RERANK_OVERFETCH,
+        ),
+        rating_prior=SEARCH_RATING_PRIOR,
+        dedupe=SEARCH_DEDUPE,
+        dedupe_overfetch=SEARCH_DEDUPE_OVERFETCH,
+    )
+    if getattr(app.state, "search_cache", None) is None:
+        app.state.search_cache = SearchCache(
+            embedding_size=SEARCH_CACHE_EMBEDDINGS_SIZE,
+            embedding_ttl_s=SEARCH_CACHE_EMBEDDINGS_TTL_S,
+            result_size=SEARCH_CACHE_RESULTS_SIZE,
+            result_ttl_s=SEARCH_CACHE_RESULTS_TTL_S,
+        )
 
     try:
-        if not search_model_path.is_dir() or not agents_path.is_file() or not index_path.is_file():
-             logging.error(f"Search model files not found in {search_model_path}. Semantic search disabled. Run build script.")
+        if not artifacts_path.is_dir() or not agents_path.is_file() or not index_path.is_file():
+             logging.error(f"Search model files not found in {artifacts_path}. Semantic search disabled. Run build script.")
              return
 
-        logging.info(f"Loading agent metadata for search from {agents_path}...")
-        with open(agents_path, "r", encoding="utf-8") as f:
-            app.state.search_agents_list = json.load(f)
-
-        logging.info(f"Loading Faiss index from {index_path}...")
-        app.state.faiss_index = faiss.read_index(str(index_path))
+        # Set the torch/OpenMP thread budget before the model spins up its thread pools
+        configure_thread_budget(SEARCH_TORCH_THREADS, SEARCH_OMP_THREADS)
+        app.state.search_executor = SearchExecutor(
+            max_workers=SEARCH_WORKERS,
+            max_queue_depth=SEARCH_MAX_QUEUE_DEPTH,
+            retry_after_s=SEARCH_RETRY_AFTER_S,
+        )
 
         logging.info(f"Loading Sentence Transformer model '{model_name}'...")
         app.state.sentence_model = SentenceTransformer(model_name)
-
-        if not isinstance(app.state.search_agents_list, list):
-             raise ValueError("Loaded agent data for search is not a list.")
-        if app.state.faiss_index.ntotal != len(app.state.search_agents_list):
-             logging.warning(f"Search Model Mismatch! Index vectors ({app.state.faiss_index.ntotal}) != agents loaded ({len(app.state.search_agents_list)}).")
+        app.state.query_encoder = MicroBatchEncoder(
+            app.state.sentence_model,
+            max_batch_size=SEARCH_BATCH_MAX_SIZE,
+            max_wait_ms=SEARCH_BATCH_MAX_WAIT_MS,
+            executor=app.state.search_executor.pool, # Batched encodes run on the search pool
+        )
+
+        # Load + validate the current artifact version (vector store, manifest).
+        # Later versions are swapped in by POST /api/admin/search/reload or the CURRENT file watch.
+        manager = SearchArtifactManager(
+            root=search_model_path,
+            model_name=model_name,
+            dim=app.state.sentence_model.get_sentence_embedding_dimension(),
+            cache=app.state.search_cache, # Rebound (and thus cleared) on every swap
+            nprobe=SEARCH_NPROBE or None,
+            ef_search=SEARCH_EF_SEARCH or None,
+            mmap=SEARCH_MMAP,
+            attributes_loader=lambda store: AgentAttributes.from_db(SessionLocal, store.vector_ids()),
+            verify=SEARCH_ARTIFACT_VERIFY if SEARCH_ARTIFACT_VERIFY in ARTIFACT_VERIFY_MODES else "sampled",
+        )
+        memory_before = process_memory()
+        status = manager.reload(force=True)
+        if manager.current is None:
+            raise RuntimeError(f"Search artifacts could not be loaded: {status.get('error')}")
+        app.state.search_artifacts = manager
 
         app.state.search_enabled = True
         logging.info("Semantic search models loaded successfully and search is enabled.")
-        logging.info(f"Faiss index contains {app.state.faiss_index.ntotal} vectors.")
+        logging.info(f"Faiss '{manager.current.store.index_type}' index contains {manager.current.store.index.ntotal} vectors ({manager.current.store.live_count} live agents), version '{manager.current.version}'.")
+        memory_after = process_memory()
+        if memory_after is not None:
+            # Memory-mapped artifacts show up as shared (page cache), not private heap
+            logging.info(
+                f"Worker memory after loading search artifacts (mmap={'on' if SEARCH_MMAP else 'off'}): "
+                f"RSS {memory_after['rss_mb']} MiB, shared {memory_after['shared_mb']} MiB, private {memory_after['private_mb']} MiB "
+                f"(artifacts: +{memory_after['private_mb'] - memory_before['private_mb']:.1f} MiB private, "
+                f"+{memory_after['shared_mb'] - memory_before['shared_mb']:.1f} MiB shared)."
+            )
 
     except Exception as e:
         logging.error(f"Failed to load semantic search models: {e}", exc_info=True)
@@ -126,6 +244,7 @@ def initialize_databases():
     try:
         logging.info("Checking/creating main database tables (masumi.db)...")
         MainBase.metadata.create_all(bind=main_engine)
+        create_missing_indexes(main_engine) # Indexes added to existing tables (e.g. listing sort orders)
         logging.info("Main database tables checked/created successfully.")
     except Exception as e:
         logging.error(f"Error creating main database tables: {e}", exc_info=True)
@@ -140,6 +259,9 @@ def initialize_databases():
         logging.error(f"Initialization call for recommendation database failed: {e}", exc_info=True)
         # Decide if app should proceed if recommend DB fails
 
+    # Catalog cache: loaded lazily on the first /agents read, reloaded whenever catalog_state.version moves
+    app.state.catalog_cache = create_catalog_cache(CATALOG_CACHE_CHECK_S) if CATALOG_CACHE else None
+
 # --- Startup Event: Configure Background Scheduler (Sync Disabled) ---
 scheduler = BackgroundScheduler(daemon=True)
 
@@ -152,6 +274,15 @@ def start_scheduler():
     logging.info("Configuring background tasks (Sync Disabled)...")
     # --- Masumi Sync Disabled ---
     # scheduler.add_job(run_sync, "interval", minutes=30, id="run_sync_job")
+    # --- Search artifact file watch: hot-swap when search_model/CURRENT changes ---
+    manager = getattr(app.state, "search_artifacts", None)
+    if manager is not None and SEARCH_ARTIFACT_WATCH_S > 0:
+        scheduler.add_job(manager.check_for_update, "interval", seconds=SEARCH_ARTIFACT_WATCH_S,
+                          id="search_artifact_watch", replace_existing=True, max_instances=1)
+    # --- Search filter attributes: pick up agent edits made outside the rating endpoint ---
+    if manager is not None and SEARCH_ATTRIBUTES_REFRESH_S > 0:
+        scheduler.add_job(manager.refresh_attributes, "interval", seconds=SEARCH_ATTRIBUTES_REFRESH_S,
+                          id="search_attributes_refresh", replace_existing=True, max_instances=1)
     # --- Add other jobs if needed ---
 
     if scheduler.get_jobs():
@@ -196,6 +327,14 @@ def shutdown_event():
     """Handle application shutdown."""
     global scheduler
     logging.info("Shutting down application...")
+    # Stop the micro-batching query encoder task
+    encoder = getattr(app.state, "query_encoder", None)
+    if encoder is not None:
+        encoder.close()
+    # Stop the search inference thread pool
+    executor = getattr(app.state, "search_executor", None)
+    if executor is not None:
+        executor.shutdown()
     # Shutdown scheduler
     try:
         if scheduler.running:
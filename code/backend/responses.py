@@ -0,0 +1,47 @@
+# backend/responses.py
+"""
+Fast JSON responses for list endpoints.
+
+List endpoints build plain dicts (from SQLAlchemy Core rows or the catalog cache)
+that already have their response model's shape, and return them as a
+`FastJSONResponse`. Returning a Response skips FastAPI's re-validation against
+`response_model`, which is still declared on the route, so the OpenAPI schema
+does not change. Bodies are encoded with orjson when it is installed and with
+the standard library otherwise. Both produce the same compact JSON as
+Starlette's JSONResponse, with dates and times as ISO 8601 strings (as Pydantic
+would have serialized them).
+"""
+
+import json
+from datetime import date, datetime, time
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; the stdlib encoder is the fallback
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Encoder hook for values JSON has no type for (DB rows may hold datetimes)."""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON for dicts/lists of JSON-native values and dates/times."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+                      default=_default).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response for pre-shaped content (no response_model validation, no jsonable_encoder pass)."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -8,26 +8,41 @@ Review Summarization, and Registry data (Registry sync currently disabled).
 
 import logging
 import json
+import os
+import base64
+import binascii
 import numpy as np
-import faiss
 from pathlib import Path
 from datetime import datetime, timezone
 import hashlib
-from typing import List, Dict, Any, Generator, Optional
-
-from fastapi import APIRouter, HTTPException, Depends, Query, Request, Body # Added Body import back
-from pydantic import BaseModel, Field, ConfigDict # Assuming Pydantic v2+
+import hmac
+from contextlib import ExitStack
+from dataclasses import replace
+from typing import List, Dict, Any, AsyncIterator, Generator, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Body, Header # Added Body import back
+from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ConfigDict, field_validator # Assuming Pydantic v2+
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import distinct # For querying distinct DIDs
+from sqlalchemy import distinct, func, select, tuple_ # distinct: for querying distinct DIDs
+
+from backend.search.executor import SearchSaturated
+from backend.search.hybrid import SearchOptions, reciprocal_rank_fusion
+from backend.search.metrics import process_memory
+from backend.search.rerank import RerankParams, rerank
+from ml.search_model.vector_store import vector_id_for
 
 # --- Database and Model Imports ---
 # Import Session factory for the main database (masumi.db)
 from backend.database.database import SessionLocal
+from backend.database.catalog import CatalogCache, bump_catalog_version, catalog_version, sort_key
 # Import all SQLAlchemy models defined in models.py
 # Assumes Agent, Rating, RegistryEntry use main Base
 # Assumes Recommendation, RecommendedAgent use RecommendBase
-from backend.database.models import Agent, Rating, RegistryEntry, Recommendation
+from backend.database.models import Agent, AgentDuplicate, Rating, RegistryEntry, Recommendation
+from backend.responses import FastJSONResponse
 try:
     # Import the separate Session factory for the recommendation database (recommend.db)
     from backend.database.recommend_db import SessionRecommend
@@ -39,18 +54,47 @@ except ImportError:
 # API endpoints defined here will be included with a prefix (e.g., /api) in main.py
 router = APIRouter(tags=["MasumiRanker API"])
 
+# Queries per encode/search round when a batch search is streamed as NDJSON
+BATCH_STREAM_CHUNK_SIZE = 64
+
+# Metadata fields decoded per search hit (everything AgentResult needs)
+SEARCH_HIT_FIELDS = ("id", "did", "name", "description")
+
+# Cache-Control per catalog read route. Responses also carry a catalog-version ETag,
+# so a revalidation costs a 304 with no body.
+AGENTS_CACHE_CONTROL = "public, max-age=10, stale-while-revalidate=30" # Listings may lag a rating by a few seconds
+AGENT_CACHE_CONTROL = "public, no-cache"   # Detail pages revalidate every time, so a new rating shows at once
+RATINGS_CACHE_CONTROL = "public, no-cache"
+NOT_MODIFIED_RESPONSE = {304: {"description": "Not Modified: the If-None-Match ETag is still current (empty body)."}}
+
 # --------------------- Helper Functions ---------------------
 
-def paginate(items: list, page: int = 1, size: int = 20) -> Dict[str, Any]:
-    """Helper function to paginate a list of items."""
-    if page < 1: page = 1
-    if size < 1: size = 1
-    start = (page - 1) * size
-    end = page * size
-    total_items = len(items)
-    paginated_items = items[start:end]
-    logging.debug(f"Paginating: page={page}, size={size}, total_items={total_items}, returning {len(paginated_items)} items.")
-    return {"items": paginated_items, "page": page, "page_size": size, "total_items": total_items}
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Opaque keyset cursor: URL-safe base64 of the JSON position (and the parameters it belongs to)."""
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+# Position fields of each listing's cursors -> accepted JSON types (bool is rejected even where int is accepted)
+AGENT_CURSOR_FIELDS = {"value": (int, float, type(None)), "id": (str,)}
+RATING_CURSOR_FIELDS = {"timestamp": (str, type(None)), "id": (int,)}
+
+def decode_cursor(cursor: str, fields: Dict[str, tuple], **expected: Any) -> Dict[str, Any]:
+    """
+    Decodes a cursor from `encode_cursor`; 400 if it is malformed, lacks one of the position
+    `fields` (or holds a value of the wrong type there), or was issued for other query parameters.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if not isinstance(payload, dict) or any(
+        key not in payload or isinstance(payload[key], bool) or not isinstance(payload[key], types)
+        for key, types in fields.items()
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if any(payload.get(key) != value for key, value in expected.items()):
+        raise HTTPException(status_code=400, detail="Cursor does not match the query parameters it is used with.")
+    return payload
 
 def get_db() -> Generator[Session, None, None]:
     """FastAPI dependency to get a main database (masumi.db) session."""
@@ -84,6 +128,34 @@ def agent_id_from_did(db: Session, did: str) -> Optional[str]:
         # Let the calling endpoint handle the HTTPException
         raise HTTPException(status_code=500, detail="Database error retrieving agent by DID.")
 
+def _current_search_artifacts(request: Request):
+    """The search artifact version currently being served (None if search is not loaded)."""
+    manager = getattr(request.app.state, 'search_artifacts', None)
+    return manager.current if manager is not None else None
+
+def _catalog_cache(request: Request) -> Optional[CatalogCache]:
+    """The process-local agent catalog cache (None when disabled)."""
+    return getattr(request.app.state, 'catalog_cache', None)
+
+def _catalog_etag(request: Request, version: int) -> str:
+    """Strong ETag of a catalog read: the catalog version plus the exact URL (path and query) it answers."""
+    digest = hashlib.sha256(f"{request.url.path}?{request.url.query}".encode("utf-8")).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+def _conditional_get(request: Request, response: Response, etag: str, cache_control: str) -> Optional[Response]:
+    """
+    A bodiless 304 if the client's If-None-Match already names `etag` (nothing is queried or
+    serialized); otherwise None, after stamping ETag and Cache-Control on the 200 response.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags): # Weak comparison (RFC 9110)
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
 def utc_iso() -> str:
     """Returns the current timestamp in UTC ISO 8601 format string."""
     return datetime.now(tz=timezone.utc).isoformat()
@@ -132,14 +204,17 @@ class PaginatedAgents(BaseModel):
     items: List[AgentOut]
     page: int
     page_size: int
-    total_items: int
+    total_items: Optional[int] = None # None on cursor pages unless total=exact, and with total=none
+    next_cursor: Optional[str] = None # Keyset cursor for the following page (None on the last page)
 
 class PaginatedRatings(BaseModel):
     """Schema for paginated responses containing a list of ratings."""
     items: List[RatingOut]
     page: int
     page_size: int
-    total_items: int
+    total_items: Optional[int] = None # None with total=none
+    total_estimated: bool = False # True when total_items is the agent's num_ratings aggregate (total=estimate)
+    next_cursor: Optional[str] = None # Keyset cursor for the following page (None on the last page)
 
 class RegistryListSchema(BaseModel):
     """Schema for returning a list of raw registry entries (feature currently disabled)."""
@@ -157,10 +232,51 @@ class RecommendationStatus(BaseModel):
     did: str
     timestamp: str # ISO 8601 timestamp string
 
+class SearchFilters(BaseModel):
+    """Structured search filters, evaluated inside the vector search so top_k is exact among matching agents."""
+    category: Optional[List[str]] = Field(None, description="Match any of these categories (case-insensitive).")
+    price_min: Optional[float] = Field(None, ge=0, description="Minimum price_usd (inclusive).")
+    price_max: Optional[float] = Field(None, ge=0, description="Maximum price_usd (inclusive).")
+    min_avg_score: Optional[float] = Field(None, ge=0, le=5, description="Minimum average rating.")
+    min_num_ratings: Optional[int] = Field(None, ge=0, description="Minimum number of ratings.")
+
+    @field_validator("category", mode="before")
+    @classmethod
+    def _single_category(cls, v):
+        return [v] if isinstance(v, str) else v # Accept "finance" as well as ["finance", "health"]
+
+    def conditions(self) -> Dict[str, Any]:
+        return {k: v for k, v in self.model_dump(exclude_none=True).items() if v != []} # category=[] filters nothing
+
+    def cache_key(self) -> tuple:
+        return tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in self.conditions().items()))
+
+class RerankRequest(BaseModel):
+    """Per-request blend weights for rating-aware re-ranking (unset fields use the deployment defaults)."""
+    relevance: Optional[float] = Field(None, ge=0, le=100, description="Weight of the retrieval score (min-max scaled over the candidates).")
+    rating: Optional[float] = Field(None, ge=0, le=100, description="Weight of the confidence-adjusted (Bayesian average) rating.")
+    price: Optional[float] = Field(None, ge=0, le=100, description="Weight of the price signal (cheaper = higher).")
+    overfetch: Optional[int] = Field(None, ge=1, le=10, description="Retrieve top_k * overfetch candidates before re-ranking.")
+
 class QueryRequest(BaseModel):
     """Schema for validating incoming semantic search requests."""
     query: str = Field(..., description="The natural language query string to search for.")
     top_k: int = Field(3, ge=1, le=50, description="The maximum number of similar agents to return.")
+    nprobe: Optional[int] = Field(None, ge=1, le=4096, description="IVF indexes only: inverted lists to scan (higher = better recall, slower). Defaults to the deployment setting.")
+    ef_search: Optional[int] = Field(None, ge=1, le=4096, description="HNSW indexes only: search beam width (higher = better recall, slower). Defaults to the deployment setting.")
+    mode: Optional[Literal["hybrid", "semantic", "lexical"]] = Field(None, description="Retrieval mode: semantic (embeddings), lexical (BM25 over name/description/tags/capability/author) or hybrid (both, rank-fused). Defaults to the deployment setting.")
+    filters: Optional[SearchFilters] = Field(None, description="Only return agents matching these category/price/rating conditions.")
+    rerank: Optional[RerankRequest] = Field(None, description="Blend relevance with ratings (and optionally price). Defaults to the deployment setting.")
+    dedupe: Optional[bool] = Field(None, description="Keep only the best-ranked agent of each near-duplicate cluster. Defaults to the deployment setting.")
+
+    @field_validator("filters")
+    @classmethod
+    def _empty_filters(cls, v):
+        return v if v is not None and v.conditions() else None # {} / all-null filters mean "no filters"
+
+    def search_params(self) -> tuple:
+        """ANN knobs as a hashable (nprobe, ef_search) pair; ignored by index types they do not apply to."""
+        return (self.nprobe, self.ef_search)
 
 class AgentResult(BaseModel):
     """Schema for representing a single agent within search results."""
@@ -169,10 +285,26 @@ class AgentResult(BaseModel):
     name: str
     description: Optional[str] = ""
     score: float # Similarity score (higher is better for cosine/IP index)
+    rank_score: Optional[float] = None # Blended relevance/rating/price score results are ordered by (only when re-ranked)
+    agent: Optional[AgentOut] = None # Full, current agent record (only with hydrate=true)
 
 class QueryResponse(BaseModel):
     """Schema for the semantic search API response."""
     results: List[AgentResult]
+    mode: Optional[str] = None # Retrieval mode actually used (e.g. "lexical" when falling back under load)
+
+class BatchQueryRequest(BaseModel):
+    """Schema for validating a batch of semantic search requests."""
+    queries: List[QueryRequest] = Field(..., min_length=1, max_length=256, description="Search requests to resolve in one call (max 256).")
+
+class BatchQueryResponse(BaseModel):
+    """Schema for the batch search response; `results[i]` answers `queries[i]`."""
+    results: List[QueryResponse]
+
+class SimilarAgentsResponse(BaseModel):
+    """Schema for the "more like this" response: agents nearest to `agent_id`, most similar first."""
+    agent_id: str
+    results: List[AgentResult]
 
 class RecommendationListResponse(BaseModel):
     """Schema for returning the list of distinct DIDs from recommendation events."""
@@ -209,30 +341,152 @@ def _attach_img(agent_obj: Agent) -> AgentOut:
         # Raise exception to be handled by the calling endpoint, resulting in a 500 response
         raise HTTPException(status_code=500, detail="Internal server error while processing agent image data.")
 
+# --------------------- Fast List Serialization ---------------------
+# List endpoints select these columns as plain tuples (SQLAlchemy Core, no ORM identity map or
+# Pydantic models), build response dicts directly and return them as a FastJSONResponse.
+
+AGENT_OUT_COLUMNS = (Agent.id, Agent.name, Agent.category, Agent.description, Agent.did, Agent.url,
+                     Agent.price_usd, Agent.avg_score, Agent.num_ratings, Agent.img_url)
+RATING_OUT_COLUMNS = (Rating.agent_id, Rating.user_id, Rating.score, Rating.comment,
+                      Rating.timestamp, Rating.hash, Rating.id) # id: keyset cursor only
+AGENT_OUT_FIELDS = tuple(c.key for c in AGENT_OUT_COLUMNS)
+RATING_OUT_FIELDS = tuple(c.key for c in RATING_OUT_COLUMNS[:-1])
+
+def _agent_dict(row) -> Dict[str, Any]:
+    """AgentOut-shaped dict of an AGENT_OUT_COLUMNS row, with the same image URL rewrite as _attach_img (NULL name/did as "")."""
+    item = dict(zip(AGENT_OUT_FIELDS, row)) # Positional: much cheaper than one Row attribute lookup per field
+    for field in ("name", "did"): # str in AgentOut; did is a nullable column
+        if item[field] is None:
+            item[field] = ""
+    if item["img_url"]:
+        item["img_url"] = f"/images/{os.path.basename(item['img_url'])}" # Path(...).name for file paths, ~5x cheaper
+    return item
+
+def _rating_dict(row, did: Optional[str] = None) -> Dict[str, Any]:
+    """RatingOut-shaped dict of a RATING_OUT_COLUMNS row (NULLs in its str fields are returned as "")."""
+    item = dict(zip(RATING_OUT_FIELDS, row)) # zip stops before the trailing id column
+    for field in ("comment", "timestamp", "hash"): # Nullable columns; the NULL-timestamp tail is still paged
+        if item[field] is None:
+            item[field] = ""
+    item["did"] = did
+    return item
+
+def _fast_json(content: Dict[str, Any], response: Response) -> FastJSONResponse:
+    """
+    200 response for a body already in its response_model's shape. Skips FastAPI's re-validation
+    and jsonable_encoder pass; keeps the headers (ETag, Cache-Control) stamped on `response`.
+    """
+    return FastJSONResponse(content, headers=dict(response.headers))
+
+def create_catalog_cache(check_interval_s: float = 1.0) -> CatalogCache:
+    """Catalog cache for the /agents endpoints; its items are built exactly like the uncached list items."""
+    return CatalogCache(SessionLocal, AGENT_OUT_COLUMNS, _agent_dict, check_interval_s)
+
 # --------------------- API Endpoints ---------------------
 
 # --- Agent Endpoints (using main DB: masumi.db) ---
-@router.get("/agents", response_model=PaginatedAgents, tags=["Agents"])
+
+# GET /agents sort keys -> column (each backed by (column, id) and (category, column, id) indexes)
+AGENT_SORT_COLUMNS = {"avg_score": Agent.avg_score, "num_ratings": Agent.num_ratings}
+
+# How GET /agents reports total_items: a COUNT over the filtered listing, or nothing
+AgentTotal = Literal["exact", "none"]
+
+def _keyset_rows(db: Session, query, column, id_column, value: Any, last_id: Any, limit: int) -> list:
+    """
+    Up to `limit` rows of `query` (ordered by column DESC, id DESC, NULLs last) after the position
+    (value, last_id). Each part is an index range seek: the row-value comparison
+    (column, id) < (value, last_id), which never matches NULLs, then, once that runs out, the
+    NULL tail (column IS NULL, id < last_id when the position is already inside it).
+    """
+    rows = []
+    if value is not None:
+        rows = db.execute(query.where(tuple_(column, id_column) < tuple_(value, last_id)).limit(limit)).all()
+        last_id = None # The NULL tail is entered from its start
+    if len(rows) < limit:
+        tail = query.where(column.is_(None))
+        if last_id is not None:
+            tail = tail.where(id_column < last_id)
+        rows += db.execute(tail.limit(limit - len(rows))).all()
+    return rows
+
+@router.get("/agents", response_model=PaginatedAgents, responses=NOT_MODIFIED_RESPONSE, tags=["Agents"])
 def get_agents(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1, description="Page number, starting from 1"),
     page_size: int = Query(20, ge=1, le=100, description="Number of agents per page (1-100)"),
+    category: Optional[str] = Query(None, description="Only list agents of this category (exact match)."),
+    sort_by: Literal["avg_score", "num_ratings"] = Query("avg_score", description="Sort key, highest first."),
+    cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page; continues after it (`page` is ignored)."),
+    dedupe: bool = Query(False, description="List only the representative of each near-duplicate cluster."),
+    total: Optional[AgentTotal] = Query(None, description="total_items: exact COUNT or none. Default: exact on numbered pages, none on cursor pages."),
     db: Session = Depends(get_db) # Dependency injects the main DB session
 ):
     """
     Retrieve a paginated list of agents from the main database (masumi.db).
-    Agents are sorted by average rating score in descending order by default.
+    Agents are sorted by `sort_by` (average rating score by default) in descending order,
+    ties broken by agent id. Filtering, counting and paging all run in SQL against
+    composite indexes, so a page costs the same however large the catalog is. Deep pages
+    should follow `next_cursor` (keyset pagination) instead of growing `page` offsets;
+    cursor pages skip the COUNT (`total_items` is null) unless `total=exact` asks for it.
+    With `dedupe=true`, non-representative members of near-duplicate clusters are left out.
+    Served from the in-memory catalog cache when it is enabled (same order and cursors).
+    Conditional requests (If-None-Match with the catalog-version ETag) get a 304.
     """
-    logging.info(f"Request received for GET /agents: page={page}, page_size={page_size}")
+    logging.info(f"Request received for GET /agents: page={page}, page_size={page_size}, category={category}, "
+                 f"sort_by={sort_by}, cursor={'yes' if cursor else 'no'}, dedupe={dedupe}")
+    column = AGENT_SORT_COLUMNS[sort_by]
+    # Cursors carry the parameters they were issued for, so a cursor is never applied to a different listing
+    position = decode_cursor(cursor, AGENT_CURSOR_FIELDS, sort_by=sort_by, category=category, dedupe=dedupe) if cursor else None
+    count_total = (total or ("none" if position is not None else "exact")) == "exact"
     try:
-        # Query all agents, ordered by score
-        db_agents = db.query(Agent).order_by(Agent.avg_score.desc()).all()
-        # Process each agent to format image URL and validate output schema
-        items = [_attach_img(a) for a in db_agents]
-        # Paginate the results
-        response = paginate(items, page=page, size=page_size)
-        logging.info(f"Returning {len(response['items'])} agents for page {page}.")
-        return response
-    except HTTPException: raise # Re-raise HTTPExceptions from helpers (e.g., _attach_img)
+        catalog = _catalog_cache(request)
+        version = catalog.snapshot().version if catalog is not None else catalog_version(db)
+        not_modified = _conditional_get(request, response, _catalog_etag(request, version), AGENTS_CACHE_CONTROL)
+        if not_modified is not None:
+            return not_modified
+        if catalog is not None:
+            after = sort_key(position["value"], position["id"]) if position is not None else None
+            items, total_items, last, page_version = catalog.page(sort_by, category, dedupe, page_size, page, after)
+            total_items = total_items if count_total else None # Free here, but the body matches the SQL path
+            if page_version != version: # Reloaded in between: tag the body with the version it came from
+                response.headers["ETag"] = _catalog_etag(request, page_version)
+            next_cursor = None
+            if last is not None:
+                next_cursor = encode_cursor({"sort_by": sort_by, "category": category, "dedupe": dedupe,
+                                             "value": last[1] if last[0] else None, "id": last[2]})
+            logging.info(f"Returning {len(items)} of {total_items} agents for page {page} (catalog cache).")
+            return _fast_json({"items": items, "page": page, "page_size": page_size, "total_items": total_items,
+                               "next_cursor": next_cursor}, response)
+
+        conditions = []
+        if category:
+            conditions.append(Agent.category == category)
+        if dedupe:
+            # Agents whose cluster is represented by another agent (one indexed anti-join)
+            hidden = select(AgentDuplicate.agent_id).where(AgentDuplicate.cluster_id != AgentDuplicate.agent_id)
+            conditions.append(Agent.id.not_in(hidden))
+        total_items = None
+        if count_total:
+            total_items = db.execute(select(func.count()).select_from(Agent).where(*conditions)).scalar_one()
+        query = select(*AGENT_OUT_COLUMNS).where(*conditions).order_by(column.desc(), Agent.id.desc())
+        # One extra row tells whether another page follows
+        if position is not None:
+            rows = _keyset_rows(db, query, column, Agent.id, position["value"], position["id"], page_size + 1)
+        else:
+            rows = db.execute(query.offset((page - 1) * page_size).limit(page_size + 1)).all()
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_cursor = encode_cursor({"sort_by": sort_by, "category": category, "dedupe": dedupe,
+                                         "value": getattr(last, sort_by), "id": last.id})
+        items = [_agent_dict(row) for row in rows]
+        logging.info(f"Returning {len(items)} of {total_items} agents for page {page}.")
+        return _fast_json({"items": items, "page": page, "page_size": page_size, "total_items": total_items,
+                           "next_cursor": next_cursor}, response)
+    except HTTPException: raise # Re-raise HTTPExceptions from helpers (e.g., decode_cursor)
     except SQLAlchemyError as e:
         logging.error(f"Database error while fetching agents: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="A database error occurred while fetching agents.")
@@ -240,26 +494,38 @@ def get_agents(
         logging.error(f"Unexpected error while fetching agents: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An internal server error occurred while fetching agents.")
 
-@router.get("/agents/{agent_id}", response_model=AgentOut, tags=["Agents"])
+@router.get("/agents/{agent_id}", response_model=AgentOut, responses=NOT_MODIFIED_RESPONSE, tags=["Agents"])
 def read_agent(
     agent_id: str, # Agent ID from the URL path
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
     Retrieve details for a specific agent by its internal database ID
-    from the main database (masumi.db).
+    from the main database (masumi.db), via the catalog cache when it is enabled.
+    Conditional requests (If-None-Match with the catalog-version ETag) get a 304.
     """
     logging.info(f"Request received for GET /agents/{agent_id}")
     try:
-        # Use db.get for efficient primary key lookup
-        db_agent = db.get(Agent, agent_id)
-        if not db_agent:
-            logging.warning(f"Agent with ID '{agent_id}' not found.")
-            raise HTTPException(status_code=404, detail="Agent not found")
-        # Process the agent data (including image URL) for the response
-        response = _attach_img(db_agent)
+        catalog = _catalog_cache(request)
+        version = catalog.snapshot().version if catalog is not None else catalog_version(db)
+        agent = catalog.get(agent_id) if catalog is not None else None
+        if agent is None:
+            # Not cached (or cache disabled): an agent added since the last version check is still found in the DB
+            # Use db.get for efficient primary key lookup
+            db_agent = db.get(Agent, agent_id)
+            if not db_agent:
+                logging.warning(f"Agent with ID '{agent_id}' not found.")
+                raise HTTPException(status_code=404, detail="Agent not found")
+            # Process the agent data (including image URL) for the response
+            agent = _attach_img(db_agent)
+        # Only after the existence check: an unknown id is a 404 whatever If-None-Match says
+        not_modified = _conditional_get(request, response, _catalog_etag(request, version), AGENT_CACHE_CONTROL)
+        if not_modified is not None:
+            return not_modified
         logging.info(f"Returning details for agent ID: {agent_id}")
-        return response
+        return agent
     except HTTPException: raise # Re-raise 404 or 500 from _attach_img
     except SQLAlchemyError as e:
         logging.error(f"Database error fetching agent {agent_id}: {e}", exc_info=True)
@@ -269,12 +535,25 @@ def read_agent(
         raise HTTPException(status_code=500, detail="An internal server error occurred while fetching the agent.")
 
 
+@router.get("/catalog/metrics", tags=["Agents"])
+def catalog_metrics(request: Request) -> Dict[str, Any]:
+    """
+    Returns this worker's catalog cache counters: the catalog version it serves,
+    cached agents and listing views, snapshot hits, (re)loads, in-place rating
+    patches and the duration of the last load.
+    """
+    catalog = _catalog_cache(request)
+    return {"enabled": catalog is not None, "cache": catalog.stats() if catalog is not None else None}
+
+
 # --- Rating Endpoints (using main DB: masumi.db) ---
 @router.post("/ratings", response_model=RatingOut, status_code=201, tags=["Ratings"])
-def submit_rating(p: RatingIn, db: Session = Depends(get_db)):
+def submit_rating(p: RatingIn, request: Request, db: Session = Depends(get_db)):
     """
     Submits a new rating (score and optional comment) for an agent.
-    Updates the agent's average score and rating count in the main database.
+    Updates the agent's average score and rating count in the main database,
+    and in the search filter attributes so rating filters see it immediately.
+    Bumps the catalog version; this worker's catalog cache is patched in place.
     """
     logging.info(f"Request received for POST /ratings for agent_id: {p.agent_id}")
     try:
@@ -299,10 +578,18 @@ def submit_rating(p: RatingIn, db: Session = Depends(get_db)):
         agent.avg_score = round((current_total_score + p.score) / new_num_ratings, 2)
         agent.num_ratings = new_num_ratings
         logging.debug(f"Updating agent {p.agent_id} rating aggregates: score={agent.avg_score}, num_ratings={agent.num_ratings}")
+        new_version = bump_catalog_version(db) # Other workers' catalog caches reload on the new version
 
         db.commit() # Commit transaction
         db.refresh(new_rating) # Refresh to get any DB-generated fields (like autoincrement ID)
         logging.info(f"Rating submitted successfully for agent ID: {p.agent_id}")
+
+        artifacts = _current_search_artifacts(request)
+        if artifacts is not None and artifacts.attributes is not None:
+            artifacts.attributes.update(agent.id, avg_score=agent.avg_score, num_ratings=agent.num_ratings)
+        catalog = _catalog_cache(request)
+        if catalog is not None:
+            catalog.patch(agent.id, new_version, avg_score=agent.avg_score, num_ratings=agent.num_ratings)
         # Return the details of the created rating
         return RatingOut.model_validate(new_rating)
 
@@ -316,29 +603,72 @@ def submit_rating(p: RatingIn, db: Session = Depends(get_db)):
         logging.error(f"Unexpected error submitting rating for agent {p.agent_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error occurred while submitting rating.")
 
-@router.get("/ratings/by-did", response_model=PaginatedRatings, tags=["Ratings"])
+# How /ratings/by-* report total_items: COUNT of the agent's ratings, its num_ratings aggregate, or nothing
+RatingTotal = Literal["exact", "estimate", "none"]
+
+def _ratings_page(db: Session, agent_id: str, page: int, page_size: int, cursor: Optional[str],
+                  total: str, did: Optional[str] = None) -> Dict[str, Any]:
+    """
+    One newest-first page of an agent's ratings, read with LIMIT on the (agent_id, timestamp, id)
+    index: by OFFSET for `page`, or seeking past a `cursor` position. Only page_size rows are loaded,
+    as plain column tuples; the items are RatingOut-shaped dicts.
+    """
+    position = decode_cursor(cursor, RATING_CURSOR_FIELDS, agent_id=agent_id) if cursor else None
+    query = (select(*RATING_OUT_COLUMNS).where(Rating.agent_id == agent_id)
+             .order_by(Rating.timestamp.desc(), Rating.id.desc()))
+    # One extra row tells whether another page follows
+    if position is not None:
+        ratings = _keyset_rows(db, query, Rating.timestamp, Rating.id, position["timestamp"], position["id"], page_size + 1)
+    else:
+        ratings = db.execute(query.offset((page - 1) * page_size).limit(page_size + 1)).all()
+    next_cursor = None
+    if len(ratings) > page_size:
+        ratings = ratings[:page_size]
+        next_cursor = encode_cursor({"agent_id": agent_id, "timestamp": ratings[-1].timestamp, "id": ratings[-1].id})
+
+    total_items = None
+    if total == "exact":
+        total_items = db.execute(select(func.count()).select_from(Rating)
+                                 .where(Rating.agent_id == agent_id)).scalar_one() # Index-only count
+    elif total == "estimate":
+        # Maintained by submit_rating; O(1), but may drift from ratings inserted behind the API's back
+        total_items = db.query(Agent.num_ratings).filter(Agent.id == agent_id).scalar() or 0
+
+    items = [_rating_dict(r, did) for r in ratings] # did: the agent's DID for context on /ratings/by-did
+    return {"items": items, "page": page, "page_size": page_size, "total_items": total_items,
+            "total_estimated": total == "estimate", "next_cursor": next_cursor}
+
+@router.get("/ratings/by-did", response_model=PaginatedRatings, responses=NOT_MODIFIED_RESPONSE, tags=["Ratings"])
 def get_ratings_by_did(
+    request: Request,
+    response: Response,
     did: str = Query(..., description="Agent DID (Decentralized Identifier)"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page; continues after it (`page` is ignored)."),
+    total: RatingTotal = Query("exact", description="total_items: exact COUNT, estimate (the agent's num_ratings) or none."),
     db: Session = Depends(get_db)
 ):
-    """Retrieve a paginated list of ratings for an agent specified by its DID."""
-    logging.info(f"Request received for GET /ratings/by-did: did={did}, page={page}, page_size={page_size}")
+    """
+    Retrieve a paginated list of ratings (newest first) for an agent specified by its DID.
+    Conditional requests (If-None-Match with the catalog-version ETag) get a 304.
+    """
+    logging.info(f"Request received for GET /ratings/by-did: did={did}, page={page}, page_size={page_size}, "
+                 f"cursor={'yes' if cursor else 'no'}, total={total}")
     try:
+        # Version read before the page: the ETag can lag the body, but never claims a newer version than it has
+        version = catalog_version(db)
         agent_id = agent_id_from_did(db, did) # Find internal ID from DID
         if not agent_id:
             logging.warning(f"Agent not found for DID: {did} in get_ratings_by_did")
             raise HTTPException(status_code=404, detail="Agent with the specified DID not found")
+        not_modified = _conditional_get(request, response, _catalog_etag(request, version), RATINGS_CACHE_CONTROL)
+        if not_modified is not None:
+            return not_modified
 
-        # Query ratings associated with the found agent_id
-        query = db.query(Rating).filter(Rating.agent_id == agent_id).order_by(Rating.timestamp.desc())
-        all_ratings = query.all()
-        # Convert to Pydantic model, adding the DID for context
-        items = [ RatingOut.model_validate(r).model_copy(update={"did": did}) for r in all_ratings ]
-        response = paginate(items, page=page, size=page_size)
-        logging.info(f"Returning {len(response['items'])} ratings for DID {did}, page {page}.")
-        return response
+        body = _ratings_page(db, agent_id, page, page_size, cursor, total, did=did)
+        logging.info(f"Returning {len(body['items'])} ratings for DID {did}, page {page}.")
+        return _fast_json(body, response)
     except HTTPException: raise
     except SQLAlchemyError as e:
         logging.error(f"Database error fetching ratings by DID {did}: {e}", exc_info=True)
@@ -347,29 +677,38 @@ def get_ratings_by_did(
         logging.error(f"Unexpected error fetching ratings by DID {did}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error fetching ratings.")
 
-@router.get("/ratings/by-agent", response_model=PaginatedRatings, tags=["Ratings"])
+@router.get("/ratings/by-agent", response_model=PaginatedRatings, responses=NOT_MODIFIED_RESPONSE, tags=["Ratings"])
 def get_ratings_by_agent(
+    request: Request,
+    response: Response,
     agent_id: str = Query(..., description="Agent's internal database ID"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page; continues after it (`page` is ignored)."),
+    total: RatingTotal = Query("exact", description="total_items: exact COUNT, estimate (the agent's num_ratings) or none."),
     db: Session = Depends(get_db)
 ):
-    """Retrieve a paginated list of ratings for an agent specified by its internal ID."""
-    logging.info(f"Request received for GET /ratings/by-agent: agent_id={agent_id}, page={page}, page_size={page_size}")
+    """
+    Retrieve a paginated list of ratings (newest first) for an agent specified by its internal ID.
+    Conditional requests (If-None-Match with the catalog-version ETag) get a 304.
+    """
+    logging.info(f"Request received for GET /ratings/by-agent: agent_id={agent_id}, page={page}, page_size={page_size}, "
+                 f"cursor={'yes' if cursor else 'no'}, total={total}")
     try:
+        # Version read before the page: the ETag can lag the body, but never claims a newer version than it has
+        version = catalog_version(db)
         # Verify the agent actually exists
         agent_exists = db.query(Agent.id).filter(Agent.id == agent_id).first() is not None
         if not agent_exists:
              logging.warning(f"Agent not found for ID: {agent_id} in get_ratings_by_agent")
              raise HTTPException(status_code=404, detail="Agent with the specified ID not found")
+        not_modified = _conditional_get(request, response, _catalog_etag(request, version), RATINGS_CACHE_CONTROL)
+        if not_modified is not None:
+            return not_modified
 
-        # Query ratings associated with the agent_id
-        query = db.query(Rating).filter(Rating.agent_id == agent_id).order_by(Rating.timestamp.desc())
-        all_ratings = query.all()
-        items = [RatingOut.model_validate(r) for r in all_ratings]
-        response = paginate(items, page=page, size=page_size)
-        logging.info(f"Returning {len(response['items'])} ratings for agent ID {agent_id}, page {page}.")
-        return response
+        body = _ratings_page(db, agent_id, page, page_size, cursor, total)
+        logging.info(f"Returning {len(body['items'])} ratings for agent ID {agent_id}, page {page}.")
+        return _fast_json(body, response)
     except HTTPException: raise
     except SQLAlchemyError as e:
         logging.error(f"Database error fetching ratings by agent ID {agent_id}: {e}", exc_info=True)
@@ -454,79 +793,560 @@ def payment_info(
 @router.post("/search", response_model=QueryResponse, tags=["Search"])
 async def search_agents_endpoint(
     query_req: QueryRequest, # Request body validated by Pydantic
-    request: Request         # FastAPI request object to access application state
+    request: Request,        # FastAPI request object to access application state
+    hydrate: bool = Query(False, description="Attach the full, current AgentOut record to every hit (one batched DB fetch)."),
 ):
     """
-    Performs semantic vector search for agents based on the provided query string,
-    using pre-loaded Sentence Transformer model and Faiss index.
+    Searches agents for the provided query string. `mode` selects semantic search
+    (pre-loaded Sentence Transformer model + Faiss index), lexical search (BM25) or
+    hybrid search (both rankings fused with reciprocal rank fusion). When the search
+    executor is saturated, queries are answered lexically instead of rejected.
+    `rerank` (or the deployment defaults) blends relevance with agent ratings and price.
+    `dedupe` keeps only the best-ranked agent of each near-duplicate cluster.
+    With `hydrate=true` each hit also carries its full, current `agent` record
+    (category, price, rating aggregates, image URL), in similarity order.
     """
     # Retrieve pre-loaded models and data from application state (set in main.py)
-    summarizer_instance = getattr(request.app.state, 'summarizer', None) # Keep for consistency
     search_enabled = getattr(request.app.state, 'search_enabled', False)
-    model = getattr(request.app.state, 'sentence_model', None)
-    index = getattr(request.app.state, 'faiss_index', None)
-    agents_list_for_search = getattr(request.app.state, 'search_agents_list', None) # List of dicts from search_model/agents.json
-
-    # Check if search functionality is ready
-    if not search_enabled or model is None or index is None or agents_list_for_search is None:
+    encoder = getattr(request.app.state, 'query_encoder', None) # Micro-batching wrapper around the Sentence Transformer
+    executor = getattr(request.app.state, 'search_executor', None) # Bounded thread pool for encode/Faiss work
+    # Pin the artifact version for the whole request: a concurrent hot swap only affects later requests
+    artifacts = _current_search_artifacts(request)
+    store = artifacts.store if artifacts is not None else None # Stable-ID Faiss index + agent metadata
+    cache = getattr(request.app.state, 'search_cache', None) # Query embedding + result caches
+    options = _search_options(request)
+    mode = options.mode_for(query_req.mode)
+
+    # Check if search functionality is ready (lexical search needs neither the encoder nor the executor)
+    if not search_enabled or store is None or (mode != "lexical" and (encoder is None or executor is None)):
         logging.warning("Search endpoint called but search models/data are not available/loaded.")
         raise HTTPException(status_code=503, detail="Semantic search service is currently unavailable.")
 
-    logging.info(f"Processing search request: query='{query_req.query}', top_k={query_req.top_k}")
+    logging.info(f"Processing search request: query='{query_req.query}', top_k={query_req.top_k}, mode={mode}")
 
     try:
-        # 1. Encode the incoming query string into a vector embedding
-        # Note: model.encode might be CPU/GPU intensive
-        q_emb = model.encode([query_req.query], convert_to_numpy=True, show_progress_bar=False)
-
-        # 2. Normalize the query embedding (L2 normalization)
-        # This is crucial for IndexFlatIP to perform cosine similarity search.
-        faiss.normalize_L2(q_emb)
-
-        # 3. Search the Faiss index for nearest neighbors
-        # Returns distances (inner product scores for IndexFlatIP) and indices
-        scores, ids = index.search(q_emb, query_req.top_k)
-
-        # 4. Process the search results
-        results = []
-        if ids.size > 0: # Check if Faiss returned any indices
-            logging.debug(f"Raw search results: Indices={ids[0]}, Scores={scores[0]}")
-            # Iterate through the indices and scores found for the first (only) query
-            for i, idx in enumerate(ids[0]):
-                # Faiss might return -1 for indices if k > number of items
-                if idx != -1:
-                    # Safety check: Ensure the index is within the bounds of our agent list
-                    if 0 <= idx < len(agents_list_for_search):
-                        agent_data = agents_list_for_search[idx] # Get agent metadata dict
-                        if isinstance(agent_data, dict):
-                             # Create the result object using Pydantic schema
-                             result = AgentResult(
-                                 # Use agentIdentifier field if available, otherwise fallback to id
-                                 id=agent_data.get("agentIdentifier", agent_data.get("id", f"missing_id_at_index_{idx}")),
-                                 did=agent_data.get("did", "missing_did"), # Provide default if missing
-                                 name=agent_data.get("name", "Unknown Agent"),
-                                 description=agent_data.get("description", ""),
-                                 score=float(scores[0][i]) # Get the corresponding similarity score
-                             )
-                             results.append(result)
-                             logging.debug(f"Adding search result: {result.name} (Score: {result.score:.4f})")
-                        else:
-                            logging.warning(f"Data at index {idx} in search agent list is not a dictionary. Skipping.")
-                    else:
-                        # This indicates an inconsistency between the index and the agent list file
-                        logging.warning(f"Faiss returned out-of-bounds index {idx}. Max index is {len(agents_list_for_search)-1}. Skipping.")
+        # Structured filters -> the vector ids the search may return (None = unfiltered)
+        allowed_ids, filter_key = _resolve_filters(query_req, artifacts.attributes)
+        rerank_params = _resolve_rerank(query_req, options, artifacts.attributes)
+
+        if mode == "lexical":
+            # BM25 lookups take microseconds: answered inline, without an executor slot
+            response = _run_lexical_search(query_req, store, allowed_ids, rerank_params, artifacts.attributes, options)
+            return await _maybe_hydrate(response, hydrate)
+
+        # Fast path: a fully cached query needs neither the transformer nor Faiss,
+        # so it is answered without taking an executor slot.
+        q_vec = None
+        if cache is not None:
+            q_vec = cache.get_embedding(query_req.query)
+            if q_vec is not None:
+                params = _result_params(query_req, mode, rerank_params, artifacts.attributes, options)
+                cached_results = cache.get_results(cache.result_key(q_vec, query_req.top_k, filter_key, params))
+                if cached_results is not None:
+                    logging.info(f"Search cache hit for query '{query_req.query}'.")
+                    return await _maybe_hydrate(QueryResponse(results=cached_results, mode=mode), hydrate)
+
+        with executor.admit(): # Raises SearchSaturated when too many searches are in flight
+            response = await _run_search(query_req, encoder, executor, store, cache, q_vec, mode=mode, options=options,
+                                         allowed_ids=allowed_ids, filter_key=filter_key,
+                                         rerank_params=rerank_params, attributes=artifacts.attributes)
+        # Hydration is a DB read, not search work: it runs after the executor slot is released
+        return await _maybe_hydrate(response, hydrate)
+    except SearchSaturated as e:
+        if options.lexical_fallback:
+            fallback = _run_lexical_search(query_req, store, allowed_ids, rerank_params, artifacts.attributes, options)
+            if fallback.results:
+                logging.warning(f"Search executor saturated; answered query '{query_req.query}' lexically.")
+                return await _maybe_hydrate(fallback, hydrate)
+        logging.warning(f"Search executor saturated; rejecting query '{query_req.query}'.")
+        raise HTTPException(
+            status_code=503,
+            detail="Search service is busy. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except HTTPException: raise
+    except Exception as e:
+        # Catch potential errors during encoding or Faiss search
+        logging.error(f"Error during search processing for query '{query_req.query}': {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error occurred during search processing.")
+
+async def _maybe_hydrate(response: QueryResponse, hydrate: bool) -> QueryResponse:
+    """`hydrate=true` query parameter: attach full agent records to the hits."""
+    return (await _hydrate_responses([response]))[0] if hydrate else response
+
+def _search_options(request: Request) -> SearchOptions:
+    """Deployment search options from app state (defaults when main.py did not set any)."""
+    return getattr(request.app.state, 'search_options', None) or SearchOptions()
+
+def _result_params(query_req: QueryRequest, mode: str, rerank_params: Optional[RerankParams] = None,
+                   attributes=None, options: Optional[SearchOptions] = None) -> tuple:
+    """Everything besides the embedding and top_k that changes a query's results (result cache key part)."""
+    params = (mode,) + query_req.search_params()
+    if rerank_params is not None:
+        # Re-ranked order depends on the ratings too: a rating change (new generation) retires the entry
+        params += (rerank_params, attributes.generation)
+    if _dedupe(query_req, options or SearchOptions(), attributes):
+        params += ("dedupe", attributes.generation) # Clusters are reloaded with the attributes
+    return params
+
+def _resolve_rerank(query_req: QueryRequest, options: SearchOptions, attributes) -> Optional[RerankParams]:
+    """Effective re-ranking parameters for a query, or None to keep plain relevance order."""
+    params = options.rerank
+    if query_req.rerank is not None:
+        params = replace(params, **query_req.rerank.model_dump(exclude_none=True))
+    if not params.active:
+        return None
+    if attributes is None:
+        # Re-ranking only reorders relevant results, so it degrades to relevance order instead of failing
+        logging.warning("Rating-aware re-ranking requested but search attributes are not loaded; using relevance order.")
+        return None
+    return params
+
+def _dedupe(query_req: QueryRequest, options: SearchOptions, attributes) -> bool:
+    """Whether near-duplicate hits are collapsed for a query (needs clusters in the search attributes)."""
+    wanted = query_req.dedupe if query_req.dedupe is not None else options.dedupe
+    # Without cluster data there is nothing to collapse, so no over-fetch and no separate cache entries
+    return bool(wanted) and attributes is not None and attributes.has_clusters
+
+def _candidate_count(query_req: QueryRequest, rerank_params: Optional[RerankParams],
+                     options: Optional[SearchOptions] = None, attributes=None) -> int:
+    """Results to retrieve before the final top_k cut (over-fetched when re-ranking or de-duplicating)."""
+    count = rerank_params.depth(query_req.top_k) if rerank_params is not None else query_req.top_k
+    options = options or SearchOptions()
+    if _dedupe(query_req, options, attributes):
+        count = max(count, options.dedupe_depth(query_req.top_k))
+    return count
+
+def _resolve_filters(query_req: QueryRequest, attributes) -> tuple:
+    """(allowed vector ids or None, result-cache filter key) for a query's structured filters."""
+    if query_req.filters is None or not query_req.filters.conditions():
+        return None, None
+    if attributes is None:
+        raise HTTPException(status_code=503, detail="Filtered search is currently unavailable.")
+    # The attribute generation changes whenever ratings/prices change, retiring stale cached results
+    return attributes.allowed_ids(**query_req.filters.conditions()), (query_req.filters.cache_key(), attributes.generation)
+
+def _run_lexical_search(query_req: QueryRequest, store, allowed_ids: Optional[np.ndarray] = None,
+                        rerank_params: Optional[RerankParams] = None, attributes=None,
+                        options: Optional[SearchOptions] = None) -> QueryResponse:
+    """BM25-only search; cheap enough to run directly on the event loop."""
+    scores, ids = store.search_lexical(query_req.query, _candidate_count(query_req, rerank_params, options, attributes), allowed_ids)
+    found = ids[0] != -1 # Drop padding when fewer than top_k agents match any query term
+    results = _rank_hits(query_req, scores[0][found], ids[0][found], store, rerank_params, attributes, options)
+    logging.info(f"Lexical search completed. Returning {len(results)} results for query '{query_req.query}'.")
+    return QueryResponse(results=results, mode="lexical")
+
+def _fuse_with_lexical(query_req: QueryRequest, semantic_ids: np.ndarray, store, options: SearchOptions,
+                       allowed_ids: Optional[np.ndarray] = None, k: Optional[int] = None) -> tuple:
+    """Reciprocal rank fusion of a semantic candidate ranking with the BM25 ranking; returns 1-D top-k (scores, ids)."""
+    k = k or query_req.top_k
+    _, lexical_ids = store.search_lexical(query_req.query, options.candidate_depth(k), allowed_ids)
+    scores, ids = reciprocal_rank_fusion([semantic_ids, lexical_ids[0]], k, options.rrf_k)
+    found = ids != -1
+    return scores[found], ids[found]
+
+def _rank_hits(query_req: QueryRequest, scores_row: np.ndarray, ids_row: np.ndarray, store,
+               rerank_params: Optional[RerankParams] = None, attributes=None,
+               options: Optional[SearchOptions] = None) -> List[AgentResult]:
+    """
+    Final top_k results from 1-D candidates: re-ranked by the blended score, or in retrieval
+    order. With de-duplication, only the best-ranked hit of each near-duplicate cluster is kept.
+    """
+    options = options or SearchOptions()
+    top_k, blended = query_req.top_k, None
+    dedupe = _dedupe(query_req, options, attributes)
+    if rerank_params is not None:
+        depth = len(ids_row) if dedupe else top_k # Collapse over the whole re-ranked list, then cut
+        scores_row, ids_row, blended = rerank(scores_row, ids_row, attributes, rerank_params, depth, options.rating_prior)
+    if dedupe:
+        keep = attributes.first_in_cluster(ids_row)
+        scores_row, ids_row = scores_row[keep], ids_row[keep]
+        blended = blended[keep] if blended is not None else None
+    return _hits_to_results(scores_row[:top_k], ids_row[:top_k], store, blended[:top_k] if blended is not None else None)
+
+def _hits_to_results(scores_row: np.ndarray, ids_row: np.ndarray, store,
+                     rank_scores: Optional[np.ndarray] = None) -> List[AgentResult]:
+    """Converts one row of vector store (scores, vector ids) output into AgentResult objects."""
+    results = []
+    if ids_row.size > 0: # Check if Faiss returned any ids
+        logging.debug(f"Raw search results: Vector IDs={ids_row}, Scores={scores_row}")
+        # Resolve every hit's metadata in one vectorized lookup (None if unknown or tombstoned)
+        hits = store.hydrate(ids_row, SEARCH_HIT_FIELDS)
+        # Iterate through the vector ids and scores found for this query
+        for i, vector_id in enumerate(ids_row):
+            # Faiss might return -1 for ids if k > number of items
+            if vector_id != -1:
+                agent_data = hits[i] # Agent metadata dict
+                if agent_data is not None:
+                     # Create the result object using Pydantic schema
+                     result = AgentResult(
+                         # Use agentIdentifier field if available, otherwise fallback to id
+                         id=agent_data.get("agentIdentifier", agent_data.get("id", f"missing_id_for_vector_{vector_id}")),
+                         did=agent_data.get("did", "missing_did"), # Provide default if missing
+                         name=agent_data.get("name", "Unknown Agent"),
+                         description=agent_data.get("description") or "",
+                         score=float(scores_row[i]), # Get the corresponding similarity score
+                         rank_score=float(rank_scores[i]) if rank_scores is not None else None,
+                     )
+                     results.append(result)
+                     logging.debug(f"Adding search result: {result.name} (Score: {result.score:.4f})")
                 else:
-                     # This can happen if k > index.ntotal or for other Faiss reasons
-                     logging.warning(f"Faiss returned invalid index -1 at search result position {i}. Skipping.")
+                    # This indicates an inconsistency between the index and the agent metadata
+                    logging.warning(f"Faiss returned vector id {vector_id} with no live agent metadata. Skipping.")
+            else:
+                 # This can happen if k > index.ntotal or for other Faiss reasons
+                 logging.warning(f"Faiss returned invalid index -1 at search result position {i}. Skipping.")
+    return results
+
+def _fetch_agents_out(agent_ids: List[str]) -> Dict[str, AgentOut]:
+    """Loads the given agents with ONE `IN (...)` query; returns AgentOut keyed by agent id."""
+    with SessionLocal() as db:
+        rows = db.query(Agent).filter(Agent.id.in_(agent_ids)).all()
+        return {a.id: _attach_img(a) for a in rows}
+
+async def _hydrate_responses(responses: List[QueryResponse]) -> List[QueryResponse]:
+    """
+    Attaches the full AgentOut record to every hit of the given responses, in place of
+    a client-side N+1 of /agents/{id} calls. All hits (across all responses) are fetched
+    in a single DB round trip off the event loop. Returns new response objects, so
+    result lists shared with the search cache are never mutated.
+    """
+    agent_ids = list(dict.fromkeys(r.id for response in responses for r in response.results))
+    if not agent_ids:
+        return responses
+    agents = await run_in_threadpool(_fetch_agents_out, agent_ids)
+    missing = [agent_id for agent_id in agent_ids if agent_id not in agents]
+    if missing:
+        # Indexed but since deleted from the DB: the hit is kept, just without a record
+        logging.warning(f"Search hydration: {len(missing)} hit(s) not found in the database: {missing[:5]}")
+    return [
+        response.model_copy(update={"results": [r.model_copy(update={"agent": agents.get(r.id)}) for r in response.results]})
+        for response in responses
+    ]
+
+async def _run_search(query_req: QueryRequest, encoder, executor, store,
+                      cache=None, q_vec: Optional[np.ndarray] = None,
+                      mode: str = "semantic", options: Optional[SearchOptions] = None,
+                      allowed_ids: Optional[np.ndarray] = None, filter_key: Any = None,
+                      rerank_params: Optional[RerankParams] = None, attributes=None) -> QueryResponse:
+    """
+    Encodes the query (unless a cached embedding `q_vec` is given) and searches the index;
+    in hybrid mode the Faiss candidates are fused with the BM25 ranking. `allowed_ids`
+    (from structured filters) restricts both rankings to matching agents. With
+    `rerank_params`, top_k * overfetch candidates are re-ranked by rating (and price).
+    All CPU-heavy work (model.encode and index.search) runs on the dedicated search
+    executor, never on the event loop. New embeddings and result lists are written
+    back to the search cache when one is given.
+    """
+    options = options or SearchOptions()
+    # 1. Encode the incoming query string into a vector embedding.
+    # Concurrent queries are coalesced into one batched model.encode call by the
+    # micro-batching encoder, which also L2-normalizes the rows (cosine similarity
+    # via the inner-product index).
+    if q_vec is None:
+        q_vec = await encoder.encode(query_req.query)
+        if cache is not None:
+            cache.put_embedding(query_req.query, q_vec)
+    params = _result_params(query_req, mode, rerank_params, attributes, options)
+    result_key = cache.result_key(q_vec, query_req.top_k, filter_key, params) if cache is not None else None
+    q_emb = q_vec[np.newaxis, :] # Add the batch axis back for Faiss
+
+    # 2. Search the Faiss index for nearest neighbors (on the search executor)
+    # Returns inner product scores and stable vector ids (tombstoned agents skipped).
+    # Hybrid mode fetches a deeper candidate list so the fusion has something to re-rank.
+    # Re-ranking fetches top_k * overfetch candidates so promoted agents can come from below the top_k cut.
+    wanted = _candidate_count(query_req, rerank_params, options, attributes)
+    depth = options.candidate_depth(wanted) if mode == "hybrid" else wanted
+    scores, ids = await executor.run(store.search, q_emb, depth, *query_req.search_params(), allowed_ids)
+    scores_row, ids_row = scores[0], ids[0]
+    if allowed_ids is not None:
+        found = ids_row != -1 # Fewer than `depth` agents may match the filters
+        scores_row, ids_row = scores_row[found], ids_row[found]
+    if mode == "hybrid":
+        scores_row, ids_row = _fuse_with_lexical(query_req, ids_row, store, options, allowed_ids, wanted)
+
+    # 3. Process the search results (re-ranked when rating/price weights are set)
+    results = _rank_hits(query_req, scores_row, ids_row, store, rerank_params, attributes, options)
+
+    if cache is not None:
+        cache.put_results(result_key, results)
+    logging.info(f"Search completed ({mode}). Returning {len(results)} results for query '{query_req.query}'.")
+    return QueryResponse(results=results, mode=mode)
+
+async def _run_search_matrix(queries: List[QueryRequest], executor, encoder, store, cache=None,
+                             options: Optional[SearchOptions] = None, lexical_only: bool = False,
+                             attributes=None) -> List[QueryResponse]:
+    """
+    Resolves several queries with ONE encode call (for the uncached texts) and ONE
+    index.search over the stacked query matrix, then slices each row to its own top_k.
+    Queries that ask for different nprobe/efSearch values are searched in one call per setting.
+    Lexical queries skip the encoder and Faiss entirely; hybrid rows are fused with BM25.
+    `lexical_only` answers every query lexically (fallback when the executor is saturated).
+    Queries with structured filters are searched together with others using the same filters.
+    Re-ranked queries retrieve top_k * overfetch candidates and are cut to top_k after re-ranking
+    (and after collapsing near-duplicates, for queries with `dedupe`).
+    """
+    options = options or SearchOptions()
+    modes = ["lexical" if lexical_only else options.mode_for(q.mode) for q in queries]
+    filters = [_resolve_filters(q, attributes) for q in queries] # (allowed ids, cache key) per query
+    reranks = [_resolve_rerank(q, options, attributes) for q in queries]
+    wanted = [_candidate_count(q, reranks[row], options, attributes) for row, q in enumerate(queries)]
+    vector_rows = [row for row, mode in enumerate(modes) if mode != "lexical"]
+
+    # 1. Embeddings: level-1 cache first, then encode all misses as a single matrix
+    vectors: Dict[int, np.ndarray] = {}
+    for row in vector_rows:
+        cached = cache.get_embedding(queries[row].query) if cache is not None else None
+        if cached is not None:
+            vectors[row] = cached
+    missing_texts = list(dict.fromkeys(queries[row].query for row in vector_rows if row not in vectors)) # Unique, in order
+    if missing_texts:
+        encoded = await executor.run(encoder.encode_now, missing_texts)
+        encoded_by_text = {text: encoded[i] for i, text in enumerate(missing_texts)}
+        for row in vector_rows:
+            if row not in vectors:
+                vectors[row] = encoded_by_text[queries[row].query]
+                if cache is not None:
+                    cache.put_embedding(queries[row].query, vectors[row])
+
+    # 2. One Faiss search per distinct ANN setting + filter (normally just one), at the deepest requested k
+    rows_by_group: Dict[tuple, List[int]] = {}
+    for row in vector_rows:
+        rows_by_group.setdefault((queries[row].search_params(), filters[row][1]), []).append(row)
+    depth = {row: options.candidate_depth(wanted[row]) if modes[row] == "hybrid" else wanted[row] for row in vector_rows}
+    hits: Dict[int, tuple] = {}
+    for (params, _), rows in rows_by_group.items():
+        q_matrix = np.ascontiguousarray(np.vstack([vectors[row] for row in rows]), dtype=np.float32)
+        allowed_ids = filters[rows[0]][0]
+        scores, ids = await executor.run(store.search, q_matrix, max(depth[row] for row in rows), *params, allowed_ids)
+        for i, row in enumerate(rows):
+            found = ids[i][:depth[row]] != -1
+            hits[row] = (scores[i][:depth[row]][found], ids[i][:depth[row]][found])
+
+    # 3. Per-query result lists, each trimmed to its own top_k
+    responses = []
+    for row, q in enumerate(queries):
+        allowed_ids, filter_key = filters[row]
+        if modes[row] == "lexical":
+            responses.append(_run_lexical_search(q, store, allowed_ids, reranks[row], attributes, options))
+            continue
+        scores_row, ids_row = hits[row]
+        if modes[row] == "hybrid":
+            scores_row, ids_row = _fuse_with_lexical(q, ids_row, store, options, allowed_ids, wanted[row])
+        results = _rank_hits(q, scores_row, ids_row, store, reranks[row], attributes, options)
+        if cache is not None:
+            params = _result_params(q, modes[row], reranks[row], attributes, options)
+            cache.put_results(cache.result_key(vectors[row], q.top_k, filter_key, params), results)
+        responses.append(QueryResponse(results=results, mode=modes[row]))
+    return responses
+
+@router.post("/search/batch", response_model=BatchQueryResponse, tags=["Search"])
+async def search_agents_batch_endpoint(
+    batch_req: BatchQueryRequest,
+    request: Request,
+    stream: bool = Query(False, description="Stream results as NDJSON (one line per query, in request order)."),
+    hydrate: bool = Query(False, description="Attach the full, current AgentOut record to every hit (one batched DB fetch per chunk)."),
+):
+    """
+    Resolves many search queries in one request. Queries are encoded as one matrix and
+    searched with a single index.search call; `results[i]` answers `queries[i]`.
+    Each query may pick its own `mode`; a saturated executor degrades the batch to lexical search.
 
-        logging.info(f"Search completed. Returning {len(results)} results for query '{query_req.query}'.")
-        return QueryResponse(results=results)
+    With `stream=true` (or `Accept: application/x-ndjson`) the response is NDJSON:
+    queries are processed in chunks and each line `{"index", "query", "mode", "results"}` is
+    sent as soon as its chunk completes, so large batches start arriving early.
 
+    With `hydrate=true` every hit also carries its full `agent` record; all hits of the
+    batch (or of one streamed chunk) are loaded with a single `IN (...)` query.
+    """
+    search_enabled = getattr(request.app.state, 'search_enabled', False)
+    encoder = getattr(request.app.state, 'query_encoder', None)
+    executor = getattr(request.app.state, 'search_executor', None)
+    artifacts = _current_search_artifacts(request) # Pinned for the whole batch (and stream)
+    store = artifacts.store if artifacts is not None else None
+    attributes = artifacts.attributes if artifacts is not None else None
+    cache = getattr(request.app.state, 'search_cache', None)
+    options = _search_options(request)
+    needs_encoder = any(options.mode_for(q.mode) != "lexical" for q in batch_req.queries)
+
+    if not search_enabled or store is None or (needs_encoder and (encoder is None or executor is None)):
+        logging.warning("Batch search endpoint called but search models/data are not available/loaded.")
+        raise HTTPException(status_code=503, detail="Semantic search service is currently unavailable.")
+
+    queries = batch_req.queries
+    if attributes is None and any(q.filters is not None for q in queries):
+        raise HTTPException(status_code=503, detail="Filtered search is currently unavailable.")
+    stream = stream or "application/x-ndjson" in request.headers.get("accept", "")
+    logging.info(f"Processing batch search request: {len(queries)} queries, stream={stream}")
+
+    def saturated_batch(e: SearchSaturated) -> HTTPException:
+        logging.warning(f"Search executor saturated; rejecting batch of {len(queries)} queries.")
+        return HTTPException(status_code=503, detail="Search service is busy. Please retry shortly.",
+                             headers={"Retry-After": str(e.retry_after)})
+
+    if stream:
+        if needs_encoder and executor.saturated and not options.lexical_fallback:
+            raise saturated_batch(SearchSaturated(executor.retry_after_s)) # Still possible to answer with a 503
+
+        async def ndjson_lines() -> AsyncIterator[str]:
+            # One executor slot covers the whole stream, taken and released in here: a client that
+            # disconnects before the first chunk never starts the generator, so no slot is held
+            slot = ExitStack()
+            try:
+                lexical_only = False
+                if needs_encoder:
+                    try:
+                        slot.enter_context(executor.admit())
+                    except SearchSaturated as e:
+                        if not options.lexical_fallback:
+                            # Filled up since the check above; headers are already sent
+                            logging.warning(f"Search executor saturated; rejecting streamed batch of {len(queries)} queries.")
+                            yield json.dumps({"error": "Search service is busy. Please retry shortly.", "retry_after": e.retry_after}) + "\n"
+                            return
+                        logging.warning(f"Search executor saturated; answering batch of {len(queries)} queries lexically.")
+                        lexical_only = True
+                for start in range(0, len(queries), BATCH_STREAM_CHUNK_SIZE):
+                    chunk = queries[start:start + BATCH_STREAM_CHUNK_SIZE]
+                    responses = await _run_search_matrix(chunk, executor, encoder, store, cache, options, lexical_only, attributes)
+                    if hydrate:
+                        responses = await _hydrate_responses(responses)
+                    for offset, (q, response) in enumerate(zip(chunk, responses)):
+                        line = {"index": start + offset, "query": q.query, "mode": response.mode, "results": [r.model_dump(mode="json") for r in response.results]}
+                        yield json.dumps(line, ensure_ascii=False) + "\n"
+            except Exception as e:
+                # Headers are already sent; report the failure in-band and stop
+                logging.error(f"Error during streamed batch search: {e}", exc_info=True)
+                yield json.dumps({"error": "Internal server error occurred during search processing."}) + "\n"
+            finally:
+                slot.close()
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    # One executor slot covers the whole batch
+    slot = ExitStack()
+    lexical_only = False
+    if needs_encoder:
+        try:
+            slot.enter_context(executor.admit())
+        except SearchSaturated as e:
+            if not options.lexical_fallback:
+                raise saturated_batch(e)
+            logging.warning(f"Search executor saturated; answering batch of {len(queries)} queries lexically.")
+            lexical_only = True
+
+    try:
+        responses = await _run_search_matrix(queries, executor, encoder, store, cache, options, lexical_only, attributes)
+        if hydrate:
+            responses = await _hydrate_responses(responses)
+        logging.info(f"Batch search completed for {len(queries)} queries.")
+        return BatchQueryResponse(results=responses)
     except Exception as e:
-        # Catch potential errors during encoding or Faiss search
-        logging.error(f"Error during search processing for query '{query_req.query}': {e}", exc_info=True)
+        logging.error(f"Error during batch search processing ({len(queries)} queries): {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error occurred during search processing.")
+    finally:
+        slot.close()
+
+@router.get("/agents/{agent_id}/similar", response_model=SimilarAgentsResponse, tags=["Search"])
+async def similar_agents(
+    agent_id: str,
+    request: Request,
+    k: int = Query(5, ge=1, le=50, description="Number of similar agents to return."),
+    hydrate: bool = Query(False, description="Attach the full, current AgentOut record to every hit."),
+    dedupe: Optional[bool] = Query(None, description="Skip the agent's own near-duplicates and keep one agent per cluster. Defaults to the deployment setting."),
+):
+    """
+    "More like this": agents nearest to the given agent in embedding space. The agent's
+    stored vector is read from the index artifacts, so this is a single nearest-neighbour
+    lookup with no transformer call. The agent itself is excluded from the results.
+    Versions built with a neighbour table answer k up to its depth with a single row read.
+    With `dedupe`, clones of the agent are skipped and other clusters collapse to one hit.
+    """
+    executor = getattr(request.app.state, 'search_executor', None)
+    artifacts = _current_search_artifacts(request)
+    store = artifacts.store if artifacts is not None else None
+    if not getattr(request.app.state, 'search_enabled', False) or store is None or executor is None:
+        logging.warning("Similar agents endpoint called but search data is not available/loaded.")
+        raise HTTPException(status_code=503, detail="Semantic search service is currently unavailable.")
+
+    vector_id = vector_id_for(agent_id)
+    if store.vector_of(vector_id) is None:
+        raise HTTPException(status_code=404, detail=f"Agent '{agent_id}' not found in the search index")
+    options = _search_options(request)
+    attributes = artifacts.attributes
+    dedupe = (dedupe if dedupe is not None else options.dedupe) and attributes is not None and attributes.has_clusters
+    depth = options.dedupe_depth(k) if dedupe else k
+    try:
+        if store.has_neighbors(depth):
+            scores, ids = store.similar(vector_id, depth) # Precomputed table: one row read, no executor slot needed
+        else:
+            with executor.admit():
+                scores, ids = await executor.run(store.similar, vector_id, depth)
+        if dedupe:
+            # The agent itself goes first, so its own cluster counts as already shown
+            keep = attributes.first_in_cluster(np.concatenate([[vector_id], ids]))[1:]
+            scores, ids = scores[keep][:k], ids[keep][:k]
+        response = QueryResponse(results=_hits_to_results(scores, ids, store), mode="semantic")
+        logging.info(f"Similar agents for '{agent_id}': returning {len(response.results)} results.")
+        response = await _maybe_hydrate(response, hydrate)
+        return SimilarAgentsResponse(agent_id=agent_id, results=response.results)
+    except SearchSaturated as e:
+        logging.warning(f"Search executor saturated; rejecting similar agents request for '{agent_id}'.")
+        raise HTTPException(
+            status_code=503,
+            detail="Search service is busy. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except Exception as e:
+        logging.error(f"Error finding agents similar to '{agent_id}': {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error occurred during search processing.")
 
+@router.get("/search/metrics", tags=["Search"])
+def search_metrics(request: Request) -> Dict[str, Any]:
+    """
+    Returns runtime metrics for the search stack: the micro-batching encoder's
+    batch-size and queue-wait histograms, the search executor's admission counters,
+    the query/result cache hit counters, the artifact version being served and this
+    worker's resident vs shared memory.
+    """
+    encoder = getattr(request.app.state, 'query_encoder', None)
+    executor = getattr(request.app.state, 'search_executor', None)
+    cache = getattr(request.app.state, 'search_cache', None)
+    manager = getattr(request.app.state, 'search_artifacts', None)
+    return {
+        "search_enabled": getattr(request.app.state, 'search_enabled', False),
+        "artifacts": manager.stats() if manager is not None else None,
+        "encoder": encoder.stats() if encoder is not None else None,
+        "executor": executor.stats() if executor is not None else None,
+        "cache": cache.stats() if cache is not None else None,
+        "memory": process_memory(),
+    }
+
+@router.post("/admin/search/reload", tags=["Admin"])
+def reload_search_artifacts(
+    request: Request,
+    force: bool = Query(False, description="Reload even if CURRENT still names the served version."),
+    x_admin_token: Optional[str] = Header(None, description="Must match SEARCH_ADMIN_TOKEN."),
+) -> Dict[str, Any]:
+    """
+    Loads the artifact version named by search_model/CURRENT, validates it (vector
+    count == agent count, embedding dim and model name match the running encoder)
+    and atomically swaps it in. Runs on the threadpool, so searches keep being served
+    from the old version while the new one loads; a rejected version is never served.
+    Disabled (403) unless SEARCH_ADMIN_TOKEN is set; callers send it as X-Admin-Token.
+    """
+    admin_token = os.getenv("SEARCH_ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (SEARCH_ADMIN_TOKEN is not set).")
+    if not hmac.compare_digest((x_admin_token or "").encode("utf-8"), admin_token.encode("utf-8")): # Constant time
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    manager = getattr(request.app.state, 'search_artifacts', None)
+    if manager is None:
+        raise HTTPException(status_code=503, detail="Semantic search service is currently unavailable.")
+    logging.info(f"Request received for POST /admin/search/reload (force={force})")
+    result = manager.reload(force=force)
+    if result["status"] == "rejected":
+        raise HTTPException(status_code=409, detail=result)
+    return result
+
 # --- Recommendations Endpoints (using recommend.db for storage, main DB for checks) ---
 
 @router.post("/recommendations", response_model=RecommendationStatus, status_code=201, tags=["Recommendations"])
@@ -0,0 +1 @@
+# backend/search/__init__.py
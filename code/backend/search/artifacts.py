@@ -0,0 +1,207 @@
+# backend/search/artifacts.py
+"""
+Zero-downtime hot swap of search artifacts.
+
+`SearchArtifactManager.current` always points at one fully loaded, validated
+`SearchArtifacts` bundle. A reload loads the version named by search_model/CURRENT
+off to the side, validates it against the running encoder, and only then swaps the
+reference. Requests grab `manager.current` once and keep using that bundle, so
+in-flight searches finish on the old version while new ones see the new one.
+
+Before anything is loaded, the version's files are checked against its manifest
+(model name, sizes and sampled checksums; constant time per file), so a truncated,
+mixed or incompatible artifact set is rejected instead of being served.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from ml.search_model.vector_store import AgentVectorStore, INDEX_FILE_NAME
+from ml.search_model.versions import read_manifest, resolve_current, verify_files
+
+ARTIFACT_VERIFY_MODES = ("sampled", "full", "off")
+
+
+class ArtifactValidationError(Exception):
+    """Raised when a candidate artifact version is inconsistent or incompatible."""
+
+
+@dataclass
+class SearchArtifacts:
+    """One immutable, validated version of the search artifacts."""
+    version: str
+    path: Path
+    store: AgentVectorStore
+    manifest: Optional[Dict[str, Any]] = None
+    attributes: Any = None # AgentAttributes (filterable, row-aligned with `store`), when an attributes loader is configured
+    loaded_at: float = field(default_factory=time.time)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "path": str(self.path),
+            "index_type": self.store.index_type,
+            "vectors": self.store.index.ntotal,
+            "live_agents": self.store.live_count,
+            "dim": self.store.dim,
+            "mmap": self.store.read_only,
+            "model_name": (self.manifest or {}).get("model_name"),
+            "source_rows": (self.manifest or {}).get("source_rows"),
+            "created_at": (self.manifest or {}).get("created_at"),
+            "loaded_at": self.loaded_at,
+        }
+
+
+def legacy_version_of(directory: Path) -> str:
+    """Identify an unversioned artifact set by index mtime + size, so every worker derives the same version."""
+    st = (directory / INDEX_FILE_NAME).stat()
+    return f"legacy-{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+class SearchArtifactManager:
+    """Loads, validates and atomically swaps search artifact versions."""
+
+    def __init__(self, root: Path, model_name: str, dim: int, cache: Any = None,
+                 nprobe: Optional[int] = None, ef_search: Optional[int] = None, mmap: bool = True,
+                 attributes_loader: Optional[Callable[[AgentVectorStore], Any]] = None, verify: str = "sampled"):
+        self.root = Path(root)
+        self.model_name = model_name
+        self.dim = int(dim)
+        self.cache = cache
+        # Deployment-wide ANN query defaults, applied to every version that gets loaded
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.mmap = mmap  # Map index + embeddings read-only so workers share one page-cache copy
+        self.attributes_loader = attributes_loader  # Builds live per-agent filter attributes for a store
+        self.verify = verify  # File check against the manifest before loading: sampled | full | off
+        self.current: Optional[SearchArtifacts] = None
+        self._reload_lock = threading.Lock()
+        self.swaps = 0
+        self.rejections = 0
+        self.last_error: Optional[str] = None
+
+    def pending_version(self) -> Optional[str]:
+        """Version that CURRENT points at, if it differs from the one being served."""
+        version, directory = resolve_current(self.root)
+        if version is None:
+            if not (directory / INDEX_FILE_NAME).is_file():
+                return None
+            version = legacy_version_of(directory)
+        if self.current is not None and self.current.version == version:
+            return None
+        return version
+
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Load + validate the version named by CURRENT and swap it in.
+        Returns a status dict: swapped / unchanged / busy / rejected.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return {"status": "busy", "version": self.current.version if self.current else None}
+        try:
+            version, directory = resolve_current(self.root)
+            if version is None:
+                version = legacy_version_of(directory)
+            previous = self.current.version if self.current else None
+            if not force and previous == version:
+                return {"status": "unchanged", "version": version}
+
+            started = time.perf_counter()
+            try:
+                candidate = self._load(version, directory)
+                self._validate(candidate)
+            except Exception as e:
+                self.rejections += 1
+                self.last_error = f"{version}: {e}"
+                logging.error(f"Rejected search artifacts version '{version}': {e}", exc_info=True)
+                return {"status": "rejected", "version": version, "serving": previous, "error": str(e)}
+
+            # Atomic swap: a single reference assignment. In-flight requests keep their bundle.
+            self.current = candidate
+            if self.cache is not None:
+                self.cache.bind_index(candidate.version)
+            self.swaps += 1
+            self.last_error = None
+            logging.info(
+                f"Search artifacts swapped in: version '{version}' (previous: '{previous}'), "
+                f"{candidate.store.live_count} agents, loaded in {time.perf_counter() - started:.2f}s."
+            )
+            return {"status": "swapped", "version": version, "previous": previous}
+        finally:
+            self._reload_lock.release()
+
+    def check_for_update(self) -> None:
+        """File-watch hook (scheduled job): reload when CURRENT points at a new version."""
+        try:
+            if self.pending_version() is not None:
+                self.reload()
+        except Exception as e:
+            logging.error(f"Search artifact watch failed: {e}", exc_info=True)
+
+    def _load(self, version: str, directory: Path) -> SearchArtifacts:
+        logging.info(f"Loading search artifacts version '{version}' from {directory}...")
+        manifest = read_manifest(directory)
+        self._check_manifest(version, directory, manifest) # Cheap checks first: never map a mismatched file
+        store = AgentVectorStore.load(directory, mmap=self.mmap)
+        store.default_nprobe = self.nprobe
+        store.default_ef_search = self.ef_search
+        attributes = self.attributes_loader(store) if self.attributes_loader is not None else None
+        return SearchArtifacts(version=version, path=directory, store=store, manifest=manifest, attributes=attributes)
+
+    def refresh_attributes(self) -> None:
+        """Scheduled job: reload the served version's filter attributes from the database."""
+        current = self.current
+        if current is None or self.attributes_loader is None:
+            return
+        try:
+            current.attributes = self.attributes_loader(current.store) # Swapped as one reference
+        except Exception as e:
+            logging.error(f"Search attribute refresh failed: {e}", exc_info=True)
+
+    def _check_manifest(self, version: str, directory: Path, manifest: Optional[Dict[str, Any]]) -> None:
+        """Pre-load checks: model compatibility and file integrity (size + checksum) against the manifest."""
+        if manifest is None:
+            return  # Legacy / pre-manifest builds; _validate logs it
+        if manifest.get("model_name") != self.model_name:
+            raise ArtifactValidationError(f"built with model '{manifest.get('model_name')}', serving '{self.model_name}'")
+        if manifest.get("dim") not in (None, self.dim):
+            raise ArtifactValidationError(f"manifest dim {manifest.get('dim')} does not match the encoder's dim {self.dim}")
+        if self.verify == "off":
+            return
+        if not manifest.get("files"):
+            logging.warning(f"Search artifacts version '{version}' has no file checksums; integrity not verified.")
+            return
+        started = time.perf_counter()
+        problems = verify_files(directory, manifest, full=self.verify == "full")
+        if problems:
+            raise ArtifactValidationError(f"artifact files do not match the manifest: {'; '.join(problems)}")
+        logging.info(f"Verified {len(manifest['files'])} artifact files ({self.verify}) in {(time.perf_counter() - started) * 1000:.1f} ms.")
+
+    def _validate(self, candidate: SearchArtifacts) -> None:
+        store = candidate.store
+        if store.index.ntotal != len(store.agents):
+            raise ArtifactValidationError(f"index holds {store.index.ntotal} vectors but metadata lists {len(store.agents)} agents")
+        if store.dim != self.dim:
+            raise ArtifactValidationError(f"embedding dim {store.dim} does not match the encoder's dim {self.dim}")
+        manifest = candidate.manifest
+        if manifest is None:
+            logging.warning(f"Search artifacts version '{candidate.version}' has no manifest; model name not verified.")
+            return
+        if manifest.get("dim") not in (None, store.dim):
+            raise ArtifactValidationError(f"manifest dim {manifest.get('dim')} != stored dim {store.dim}")
+        if manifest.get("vector_count") not in (None, store.index.ntotal):
+            raise ArtifactValidationError(f"manifest lists {manifest.get('vector_count')} vectors, index holds {store.index.ntotal}")
+        if manifest.get("agent_count") not in (None, len(store.agents)):
+            raise ArtifactValidationError(f"manifest lists {manifest.get('agent_count')} agents, metadata holds {len(store.agents)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "current": self.current.describe() if self.current else None,
+            "swaps": self.swaps,
+            "rejections": self.rejections,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,196 @@
+# backend/search/attributes.py
+"""
+Per-agent attribute arrays for filtered search.
+
+`AgentAttributes` holds category / price_usd / avg_score / num_ratings as numpy
+arrays aligned with the rows of one vector store version, so a structured filter
+becomes a vectorized boolean mask and then a set of allowed vector ids that the
+Faiss search evaluates through an ID selector (top-k is exact under the filter).
+
+The arrays come from the `agents` table, not the build snapshot: they are loaded
+with every artifact version, refreshed periodically, and patched in place when a
+rating changes an agent's aggregates. Every change bumps `generation`, which is
+part of the result-cache key for filtered and re-ranked queries.
+
+The same arrays feed rating-aware re-ranking: `ranking_features` derives a
+confidence-adjusted (Bayesian average) rating and a price signal per agent,
+recomputed lazily whenever the generation changes.
+
+Near-duplicate clusters (the `agent_duplicates` table, written by the
+find_duplicates batch job) are loaded alongside, so de-duplicating a ranked hit
+list is one vectorized "first hit per cluster" pass.
+"""
+
+import itertools
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend.database.models import Agent, AgentDuplicate
+from ml.search_model.vector_store import vector_id_for
+
+# Process-wide, so a refreshed AgentAttributes object never reuses an old generation
+_generations = itertools.count(1)
+
+RATING_MIN, RATING_MAX = 1.0, 5.0  # RatingIn.score bounds
+
+
+class AgentAttributes:
+    """Filterable agent attributes, row-aligned with a vector store."""
+
+    def __init__(self, vector_ids: np.ndarray, rows: Iterable[Tuple[str, Optional[str], Any, Any, Any]],
+                 clusters: Iterable[Tuple[str, str]] = ()):
+        """
+        `vector_ids`: the store's ids in row order; `rows`: (agent id, category, price_usd,
+        avg_score, num_ratings); `clusters`: (agent id, near-duplicate cluster id).
+        """
+        self.vector_ids = np.asarray(vector_ids, dtype=np.int64)
+        n = len(self.vector_ids)
+        order = np.argsort(self.vector_ids)
+        self._sorted_ids, self._sorted_rows = self.vector_ids[order], order
+        self.category_codes = np.full(n, -1, dtype=np.int32)  # -1 = no category / agent not in the DB
+        self.price_usd = np.full(n, np.nan, dtype=np.float32)
+        self.avg_score = np.full(n, np.nan, dtype=np.float32)
+        self.num_ratings = np.zeros(n, dtype=np.int32)
+        self.cluster_codes = np.full(n, -1, dtype=np.int32)  # -1 = not part of a near-duplicate cluster
+        self.categories: Dict[str, int] = {}  # case-folded category -> code
+        self._lock = threading.Lock()
+        self.generation = next(_generations)
+        self._features: Optional[tuple] = None  # (generation, prior, rating, price, neutral rating)
+        for agent_id, category, price_usd, avg_score, num_ratings in rows:
+            row = self.row_of(agent_id)
+            if row >= 0:
+                self._set(row, category=category, price_usd=price_usd, avg_score=avg_score, num_ratings=num_ratings)
+        cluster_codes: Dict[str, int] = {}
+        for agent_id, cluster_id in clusters:
+            row = self.row_of(agent_id)
+            if row >= 0:
+                self.cluster_codes[row] = cluster_codes.setdefault(cluster_id, len(cluster_codes))
+        self.cluster_count = len(cluster_codes)
+
+    @classmethod
+    def from_db(cls, session_factory: Callable, vector_ids: np.ndarray) -> "AgentAttributes":
+        """Load current attributes for every agent in the store from the main database."""
+        with session_factory() as db:
+            rows = db.execute(select(Agent.id, Agent.category, Agent.price_usd, Agent.avg_score, Agent.num_ratings)).all()
+            try:
+                clusters = db.execute(select(AgentDuplicate.agent_id, AgentDuplicate.cluster_id)).all()
+            except SQLAlchemyError as e:
+                # Clusters only enable de-duplication; search works without them
+                logging.warning(f"Near-duplicate clusters unavailable ({e.__class__.__name__}); de-duplication disabled.")
+                clusters = []
+        attributes = cls(vector_ids, rows, clusters)
+        logging.info(f"Loaded search filter attributes for {len(rows)} agents ({len(attributes.categories)} categories, "
+                     f"{attributes.cluster_count} near-duplicate clusters).")
+        return attributes
+
+    def row_of(self, agent_id: str) -> int:
+        """Store row of an agent id, or -1 if the agent is not indexed."""
+        vid = vector_id_for(agent_id)
+        pos = int(np.searchsorted(self._sorted_ids, vid))
+        if pos < len(self._sorted_ids) and self._sorted_ids[pos] == vid:
+            return int(self._sorted_rows[pos])
+        return -1
+
+    def rows_of(self, vector_ids: np.ndarray) -> np.ndarray:
+        """Store rows of many vector ids at once (-1 for ids that are not indexed)."""
+        vector_ids = np.asarray(vector_ids, dtype=np.int64)
+        if not len(self._sorted_ids):
+            return np.full(len(vector_ids), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._sorted_ids, vector_ids), len(self._sorted_ids) - 1)
+        return np.where(self._sorted_ids[pos] == vector_ids, self._sorted_rows[pos], -1)
+
+    def update(self, agent_id: str, **fields: Any) -> bool:
+        """Patch one agent's attributes in place (e.g. after a rating). Returns False if it is not indexed."""
+        row = self.row_of(agent_id)
+        if row < 0:
+            return False
+        with self._lock:
+            self._set(row, **fields)
+            self.generation = next(_generations)
+        return True
+
+    def _set(self, row: int, **fields: Any) -> None:
+        if "category" in fields:
+            category = fields["category"]
+            self.category_codes[row] = -1 if not category else self.categories.setdefault(category.casefold(), len(self.categories))
+        for name in ("price_usd", "avg_score"):
+            if name in fields:
+                getattr(self, name)[row] = np.nan if fields[name] is None else fields[name]
+        if "num_ratings" in fields:
+            self.num_ratings[row] = fields["num_ratings"] or 0
+
+    def mask(self, category: Optional[Sequence[str]] = None, price_min: Optional[float] = None,
+             price_max: Optional[float] = None, min_avg_score: Optional[float] = None,
+             min_num_ratings: Optional[int] = None) -> np.ndarray:
+        """Boolean row mask for a structured filter (unset conditions match everything)."""
+        mask = np.ones(len(self.vector_ids), dtype=bool)
+        if category:
+            codes = [self.categories[c.casefold()] for c in category if c.casefold() in self.categories]
+            mask &= np.isin(self.category_codes, codes)
+        if price_min is not None:
+            mask &= self.price_usd >= price_min  # NaN (unknown price) never matches a bound
+        if price_max is not None:
+            mask &= self.price_usd <= price_max
+        if min_avg_score is not None:
+            mask &= self.avg_score >= min_avg_score
+        if min_num_ratings is not None:
+            mask &= self.num_ratings >= min_num_ratings
+        return mask
+
+    @property
+    def has_clusters(self) -> bool:
+        return self.cluster_count > 0
+
+    def first_in_cluster(self, vector_ids: np.ndarray) -> np.ndarray:
+        """Mask over ranked vector ids keeping each near-duplicate cluster's first (best-ranked) hit only."""
+        rows = self.rows_of(vector_ids)
+        codes = np.where(rows >= 0, self.cluster_codes[rows], -1)
+        keep = codes < 0
+        _, first = np.unique(codes, return_index=True)
+        keep[first] = True
+        return keep
+
+    def allowed_ids(self, **conditions: Any) -> np.ndarray:
+        """Vector ids of the agents matching a structured filter."""
+        return self.vector_ids[self.mask(**conditions)]
+
+    def ranking_features(self, vector_ids: np.ndarray, rating_prior: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (rating, price) re-ranking signals in [0, 1] for the given vector ids.
+
+        rating: Bayesian average (prior * m + n * avg) / (prior + n), where m is the mean of
+                all ratings, so a single 5-star vote does not outrank a long 4.5 track record.
+        price:  1 for free agents, falling with log(price) to 0 for the most expensive one.
+        Agents without ratings get m; agents with unknown prices or missing from the DB get 0.
+        """
+        features = self._features
+        if features is None or features[0] != self.generation or features[1] != rating_prior:
+            features = self._features = self._compute_features(rating_prior)
+        _, _, rating, price, neutral = features
+        rows = self.rows_of(vector_ids)
+        known = rows >= 0
+        return np.where(known, rating[rows], neutral), np.where(known, price[rows], 0.0)
+
+    def _compute_features(self, rating_prior: float) -> tuple:
+        with self._lock:  # Consistent snapshot against concurrent rating patches
+            generation = self.generation
+            avg = self.avg_score.astype(np.float64)
+            n = self.num_ratings.astype(np.float64)
+            price = self.price_usd.astype(np.float64)
+        rated = (n > 0) & np.isfinite(avg)
+        mean = float(np.average(avg[rated], weights=n[rated])) if rated.any() else (RATING_MIN + RATING_MAX) / 2
+        n = np.where(rated, n, 0.0)
+        bayes = (rating_prior * mean + n * np.where(rated, avg, 0.0)) / np.maximum(rating_prior + n, 1e-9)
+        scale = RATING_MAX - RATING_MIN
+        rating = np.clip((bayes - RATING_MIN) / scale, 0.0, 1.0).astype(np.float32)
+        log_price = np.log1p(np.where(np.isfinite(price), np.maximum(price, 0.0), np.nan))
+        priced = np.isfinite(log_price)
+        top = float(log_price[priced].max()) if priced.any() else 0.0
+        price_signal = np.where(priced, 1.0 - log_price / top if top > 0 else 1.0, 0.0).astype(np.float32)
+        neutral = float(np.clip((mean - RATING_MIN) / scale, 0.0, 1.0))
+        return generation, rating_prior, rating, price_signal, neutral
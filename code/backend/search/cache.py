@@ -0,0 +1,145 @@
+# backend/search/cache.py
+"""
+Two-level LRU+TTL cache for semantic search.
+
+* Level 1: normalized query text -> query embedding (skips the transformer).
+* Level 2: (embedding key, top_k, filters, index version) -> result list (skips Faiss).
+
+Both levels are bounded LRU maps with a per-entry TTL and hit/miss counters.
+The cache is bound to the version of the Faiss index currently served; binding
+a different version (i.e. `load_search_models` replaced the index) drops every
+entry, so stale vectors or result lists are never returned.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+import numpy as np
+
+
+class TTLCache:
+    """Size-bounded LRU map whose entries also expire `ttl_s` seconds after insertion."""
+
+    def __init__(self, maxsize: int, ttl_s: float):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl_s = float(ttl_s)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl_s > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def normalize_query(text: str) -> str:
+    """Case-fold and collapse whitespace so trivially different spellings share an entry."""
+    return " ".join(text.casefold().split())
+
+
+def embedding_key(vector: np.ndarray) -> str:
+    """Stable digest of a query embedding, used as the level-2 key component."""
+    return hashlib.blake2b(np.ascontiguousarray(vector, dtype=np.float32).tobytes(), digest_size=16).hexdigest()
+
+
+class SearchCache:
+    """Query-embedding and result caches bound to one index version."""
+
+    def __init__(self, embedding_size: int = 4096, embedding_ttl_s: float = 3600.0,
+                 result_size: int = 4096, result_ttl_s: float = 300.0):
+        self.embeddings = TTLCache(embedding_size, embedding_ttl_s)
+        self.results = TTLCache(result_size, result_ttl_s)
+        self.index_version: Optional[str] = None
+        self.invalidations = 0
+
+    def bind_index(self, index_version: str) -> None:
+        """Associate the cache with the served index; a new version invalidates everything."""
+        if index_version != self.index_version:
+            if self.index_version is not None:
+                self.invalidations += 1
+            self.embeddings.clear()
+            self.results.clear()
+            self.index_version = index_version
+
+    # --- Level 1 ---
+    def get_embedding(self, query: str) -> Optional[np.ndarray]:
+        return self.embeddings.get(normalize_query(query))
+
+    def put_embedding(self, query: str, vector: np.ndarray) -> None:
+        self.embeddings.put(normalize_query(query), vector)
+
+    # --- Level 2 ---
+    def result_key(self, vector: np.ndarray, top_k: int, filters: Hashable = None, params: Hashable = None) -> tuple:
+        # `params` = ANN search knobs (nprobe / efSearch): approximate results differ per setting
+        return (embedding_key(vector), top_k, filters, params, self.index_version)
+
+    def get_results(self, key: tuple) -> Optional[list]:
+        return self.results.get(key)
+
+    def put_results(self, key: tuple, results: list) -> None:
+        # Never store results computed against an index that has since been swapped out
+        if key[-1] == self.index_version:
+            self.results.put(key, results)
+
+    def stats(self) -> dict:
+        return {
+            "index_version": self.index_version,
+            "invalidations": self.invalidations,
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+        }
@@ -0,0 +1,148 @@
+# backend/search/encoder.py
+"""
+Micro-batching query encoder for the semantic search endpoints.
+
+Concurrent search requests each await `MicroBatchEncoder.encode(text)`. A single
+background task collects queued queries for up to `max_wait_ms` (or until
+`max_batch_size` queries are waiting), runs ONE `SentenceTransformer.encode`
+call for the whole batch and hands every caller back its own (L2-normalized)
+row. Under load this turns N batch-size-1 forward passes into one batched pass,
+at the cost of at most `max_wait_ms` extra latency per query.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import faiss
+
+from backend.search.metrics import Histogram
+
+# Bucket boundaries for the exported histograms
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+WAIT_MS_BUCKETS = (0.5, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+
+class MicroBatchEncoder:
+    """Coalesces concurrent single-query encode calls into batched model calls."""
+
+    def __init__(self, model: Any, max_batch_size: int = 32, max_wait_ms: float = 3.0, executor: Any = None):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self.executor = executor  # None -> the event loop's default executor
+
+        self.batch_size_hist = Histogram("search_encoder_batch_size", BATCH_SIZE_BUCKETS)
+        self.wait_ms_hist = Histogram("search_encoder_queue_wait_ms", WAIT_MS_BUCKETS)
+        self.encode_ms_hist = Histogram("search_encoder_encode_ms", WAIT_MS_BUCKETS)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ---------------- Public API ----------------
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Encode one query; returns a normalized float32 vector of shape (dim,)."""
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+        future = loop.create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    def encode_now(self, texts: List[str]) -> np.ndarray:
+        """Synchronously encode a list of texts as one batch (caller picks the thread)."""
+        embeddings = self.model.encode(
+            texts, batch_size=max(1, len(texts)), convert_to_numpy=True, show_progress_bar=False
+        )
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        # Normalize for cosine similarity via inner product (IndexFlatIP)
+        faiss.normalize_L2(embeddings)
+        return embeddings
+
+    def close(self) -> None:
+        """Stop the background batching task (pending callers receive CancelledError)."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+        self._worker = None
+        self._queue = None
+        self._loop = None
+
+    def stats(self) -> dict:
+        """Configuration plus histogram snapshots for the metrics endpoint."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_s * 1000.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_size_hist.snapshot(),
+            "queue_wait_ms": self.wait_ms_hist.snapshot(),
+            "encode_ms": self.encode_ms_hist.snapshot(),
+        }
+
+    # ---------------- Internals ----------------
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start the batching task lazily, on the loop that is actually serving requests."""
+        if self._worker is not None and not self._worker.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._run(), name="search-micro-batcher")
+        logging.info(
+            f"Micro-batching encoder started (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait_s * 1000.0:g})."
+        )
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future, float]]:
+        """Block for the first query, then gather more until the window closes or the batch is full."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        # Anything that arrived while we were waiting rides along for free
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            # Drop callers that gave up (e.g. client disconnect) before spending compute on them
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            dispatched_at = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                self.wait_ms_hist.observe((dispatched_at - enqueued_at) * 1000.0)
+            self.batch_size_hist.observe(len(batch))
+
+            texts = [text for text, _, _ in batch]
+            try:
+                embeddings = await loop.run_in_executor(self.executor, self.encode_now, texts)
+            except asyncio.CancelledError:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.cancel()
+                raise
+            except Exception as e:
+                logging.error(f"Batched query encoding failed for {len(texts)} queries: {e}", exc_info=True)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.encode_ms_hist.observe((time.perf_counter() - dispatched_at) * 1000.0)
+            for row, (_, future, _) in enumerate(batch):
+                if not future.done():
+                    future.set_result(embeddings[row])
@@ -0,0 +1,109 @@
+# backend/search/executor.py
+"""
+Dedicated, bounded executor for search inference (query encoding + Faiss search).
+
+Keeping the CPU-heavy work on its own small thread pool means the asyncio event
+loop (and the catalog endpoints / static image mount, which run on Starlette's
+default threadpool) never stalls behind a burst of searches. Admission is capped
+by `max_queue_depth`: once that many search requests are in flight, new ones are
+rejected with `SearchSaturated`, which the routes surface as 503 + Retry-After.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Iterator, Optional
+
+import faiss
+
+
+class SearchSaturated(Exception):
+    """Raised when the search executor's queue-depth limit has been reached."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Search executor saturated; retry after {retry_after}s.")
+        self.retry_after = retry_after
+
+
+def configure_thread_budget(torch_threads: Optional[int], omp_threads: Optional[int]) -> None:
+    """
+    Pin the intra-op thread budgets of torch and Faiss (OpenMP).
+
+    Each search worker thread runs one inference at a time, so total CPU use is
+    roughly `workers x max(torch_threads, omp_threads)`. Values <= 0 / None leave
+    the library default untouched.
+    """
+    if torch_threads and torch_threads > 0:
+        try:
+            import torch  # Pulled in by sentence-transformers
+            torch.set_num_threads(torch_threads)
+            logging.info(f"torch intra-op threads set to {torch_threads}.")
+        except ImportError:
+            logging.warning("torch not importable; SEARCH_TORCH_THREADS ignored.")
+    if omp_threads and omp_threads > 0:
+        faiss.omp_set_num_threads(omp_threads)
+        logging.info(f"Faiss OpenMP threads set to {omp_threads}.")
+
+
+class SearchExecutor:
+    """Thread pool with admission control for search requests."""
+
+    def __init__(self, max_workers: int = 2, max_queue_depth: int = 64, retry_after_s: int = 1):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue_depth = max(1, int(max_queue_depth))
+        self.retry_after_s = max(1, int(retry_after_s))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="search-inference")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._admitted = 0
+        self._rejected = 0
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """
+        Reserve an in-flight slot for one search request for the duration of the block.
+        Raises SearchSaturated immediately (no queueing) when the limit is reached.
+        """
+        with self._lock:
+            if self._in_flight >= self.max_queue_depth:
+                self._rejected += 1
+                raise SearchSaturated(self.retry_after_s)
+            self._in_flight += 1
+            self._admitted += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    @property
+    def saturated(self) -> bool:
+        """True if admit() would reject right now (advisory: nothing is reserved)."""
+        with self._lock:
+            return self._in_flight >= self.max_queue_depth
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run `fn(*args, **kwargs)` on the search pool and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        """Underlying pool, for components (e.g. the micro-batcher) that schedule work themselves."""
+        return self._pool
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+                "in_flight": self._in_flight,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+            }
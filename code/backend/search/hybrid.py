@@ -0,0 +1,66 @@
+# backend/search/hybrid.py
+"""
+Hybrid lexical + semantic retrieval.
+
+Search runs in one of three modes:
+
+    semantic   Faiss over MiniLM embeddings (the original behaviour)
+    lexical    BM25 over name/description/tags/capability/author; no encoder involved
+    hybrid     both, fused with reciprocal rank fusion (RRF)
+
+RRF only looks at ranks, so cosine similarities and BM25 scores never have to be
+put on a common scale: an agent's fused score is sum(1 / (rrf_k + rank)) over the
+rankings it appears in.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.search.rerank import DEFAULT_RATING_PRIOR, RerankParams
+
+SEARCH_MODES = ("hybrid", "semantic", "lexical")
+DEFAULT_RRF_K = 60  # Standard RRF damping constant (Cormack et al.)
+DEFAULT_DEDUPE_OVERFETCH = 3
+
+
+@dataclass(frozen=True)
+class SearchOptions:
+    """Deployment-wide search behaviour (set in main.py from the environment)."""
+    default_mode: str = "semantic"
+    hybrid_candidates: int = 50     # Depth of each ranking fed into the fusion
+    rrf_k: int = DEFAULT_RRF_K
+    lexical_fallback: bool = True   # Answer lexically instead of 503 when the search executor is saturated
+    rerank: RerankParams = RerankParams()  # Default blend weights (no re-ranking unless rating/price weights are set)
+    rating_prior: float = DEFAULT_RATING_PRIOR
+    dedupe: bool = False            # Collapse near-duplicate agents to their best-ranked hit by default
+    dedupe_overfetch: int = DEFAULT_DEDUPE_OVERFETCH  # Retrieve top_k * N candidates when de-duplicating
+
+    def mode_for(self, requested: Optional[str]) -> str:
+        return requested or self.default_mode
+
+    def dedupe_depth(self, top_k: int) -> int:
+        return top_k * max(self.dedupe_overfetch, 1)
+
+    def candidate_depth(self, top_k: int) -> int:
+        return max(top_k, self.hybrid_candidates)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], k: int, rrf_k: int = DEFAULT_RRF_K) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fuse ranked vector-id lists (best first, -1 = padding) into the top-k
+    (scores, vector_ids), padded with (0, -1). Ties keep first-seen order.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, vector_id in enumerate(int(v) for v in ranking):
+            if vector_id != -1:
+                fused[vector_id] = fused.get(vector_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+    best = sorted(fused.items(), key=lambda item: -item[1])[:k]
+    scores = np.zeros(k, dtype=np.float32)
+    ids = np.full(k, -1, dtype=np.int64)
+    for i, (vector_id, score) in enumerate(best):
+        scores[i] = score
+        ids[i] = vector_id
+    return scores, ids
@@ -0,0 +1,70 @@
+# backend/search/metrics.py
+"""
+Lightweight in-process metrics for the search stack.
+
+Histograms use fixed, cumulative ("le") buckets in the same shape Prometheus
+expects, so the JSON returned by the metrics endpoint can be scraped or
+translated without re-bucketing.
+"""
+
+import os
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Optional, Sequence
+
+
+class Histogram:
+    """Fixed-bucket histogram. Safe to observe from multiple threads."""
+
+    def __init__(self, name: str, buckets: Sequence[float]):
+        self.name = name
+        self.buckets = sorted(float(b) for b in buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record a single observation."""
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[slot] += 1
+            self._count += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return cumulative bucket counts plus count/sum/mean."""
+        with self._lock:
+            counts = list(self._counts)
+            total, value_sum = self._count, self._sum
+        cumulative, running = {}, 0
+        for bound, c in zip(self.buckets, counts):
+            running += c
+            cumulative[f"{bound:g}"] = running
+        cumulative["+Inf"] = total
+        return {
+            "buckets": cumulative,
+            "count": total,
+            "sum": round(value_sum, 6),
+            "mean": round(value_sum / total, 6) if total else 0.0,
+        }
+
+
+def process_memory() -> Optional[Dict[str, float]]:
+    """
+    Resident vs shared memory of this process in MiB, from /proc/self/statm (Linux only).
+    `shared_mb` counts file-backed pages (e.g. memory-mapped search artifacts) that other
+    workers on the host can share; `private_mb` is what this worker alone pays for.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            size, resident, shared = (int(v) for v in f.read().split()[:3])
+    except (OSError, ValueError):
+        return None
+    page_mb = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    return {
+        "virtual_mb": round(size * page_mb, 1),
+        "rss_mb": round(resident * page_mb, 1),
+        "shared_mb": round(shared * page_mb, 1),
+        "private_mb": round((resident - shared) * page_mb, 1),
+    }
@@ -0,0 +1,59 @@
+# backend/search/rerank.py
+"""
+Rating-aware re-ranking of search candidates.
+
+Retrieval (semantic, lexical or hybrid) only measures relevance. The re-ranking
+stage blends it with what users told us through /api/ratings, and optionally
+with price:
+
+    blended = relevance_w * relevance + rating_w * rating + price_w * price
+
+`relevance` is the candidate's retrieval score min-max scaled over the candidate
+set (so cosine, BM25 and RRF scores all land in [0, 1]); `rating` and `price`
+come from AgentAttributes.ranking_features. Retrieval over-fetches
+`top_k * overfetch` candidates first, so a well-rated agent just below the
+original top_k cut can still be promoted.
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+DEFAULT_RATING_PRIOR = 5.0  # Pseudo-ratings at the global mean that every agent starts with
+DEFAULT_RERANK_OVERFETCH = 3
+
+
+@dataclass(frozen=True)
+class RerankParams:
+    """Blend weights and over-fetch factor (deployment defaults, overridable per request)."""
+    relevance: float = 1.0
+    rating: float = 0.0
+    price: float = 0.0
+    overfetch: int = DEFAULT_RERANK_OVERFETCH
+
+    @property
+    def active(self) -> bool:
+        """Re-ranking only changes anything when a non-relevance signal has weight."""
+        return self.rating > 0 or self.price > 0
+
+    def depth(self, top_k: int) -> int:
+        """Candidates to retrieve for a top_k re-ranked answer."""
+        return top_k * max(self.overfetch, 1)
+
+
+def rerank(scores: np.ndarray, ids: np.ndarray, attributes, params: RerankParams, k: int,
+           rating_prior: float = DEFAULT_RATING_PRIOR) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Re-orders 1-D candidate (scores, vector ids) by blended score and keeps the top k.
+    Returns (relevance scores, vector ids, blended scores), all in the new order.
+    """
+    if len(ids) == 0:
+        return scores, ids, np.zeros(0, dtype=np.float32)
+    scores = np.asarray(scores, dtype=np.float32)
+    lo, hi = float(scores.min()), float(scores.max())
+    relevance = (scores - lo) / (hi - lo) if hi > lo else np.ones_like(scores)
+    rating, price = attributes.ranking_features(ids, rating_prior)
+    blended = (params.relevance * relevance + params.rating * rating + params.price * price).astype(np.float32)
+    order = np.argsort(-blended, kind="stable")[:k] # Stable: ties keep retrieval order
+    return scores[order], ids[order], blended[order]
@@ -0,0 +1,163 @@
+# backend/tests/conftest.py
+"""
+Shared pytest fixtures.
+
+Tests import the application the way the server does (`backend.*`, `ml.*` with
+`code/` on sys.path) and never touch masumi.db: database tests get a fresh SQLite
+file per test, and API tests mount the router on a bare FastAPI app bound to it
+(no model loading, no startup hooks).
+
+    python -m pytest code/backend/tests
+"""
+
+import sys
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+CODE_DIR = Path(__file__).resolve().parents[2]
+if str(CODE_DIR) not in sys.path:
+    sys.path.insert(0, str(CODE_DIR))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database.database import Base
+from backend.database.models import Agent, Rating, create_missing_indexes
+
+
+class HashingModel:
+    """
+    Deterministic stand-in for the Sentence Transformer: bag-of-words counts hashed
+    into `dim` buckets, so texts sharing words are similar. Records every call.
+    """
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in text.lower().split():
+                vectors[row, zlib.crc32(token.encode()) % self.dim] += 1.0
+        return vectors
+
+
+def agent_row(i: int, **fields) -> dict:
+    """Column values of a synthetic agent (`fields` override)."""
+    row = {"id": f"agent-{i:05d}", "name": f"Agent {i}", "category": ("finance", "coding")[i % 2],
+           "description": f"Synthetic agent {i}", "did": f"did:masumi:{i:05d}", "url": f"https://agents.example/{i}",
+           "img_url": f"dataset/image/agent_{i}.png", "price_usd": 1.0, "avg_score": float(i % 5),
+           "num_ratings": i % 3}
+    row.update(fields)
+    return row
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Session factory of an empty main database (all tables and indexes) in a temp file."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'masumi.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    create_missing_indexes(engine)
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def add_agents(session_factory):
+    """Insert agent rows (dicts from `agent_row`) and optional rating rows."""
+    def add(agents, ratings=()):
+        with session_factory() as db:
+            if agents:
+                db.execute(Agent.__table__.insert(), list(agents))
+            if ratings:
+                db.execute(Rating.__table__.insert(), list(ratings))
+            db.commit()
+    return add
+
+
+@pytest.fixture
+def api_client(session_factory, monkeypatch):
+    """TestClient for the API router on the temp database, with the catalog cache disabled."""
+    from backend.routes import route
+
+    monkeypatch.setattr(route, "SessionLocal", session_factory)  # Sessions opened outside get_db (hydration, caches)
+
+    app = FastAPI()
+    app.include_router(route.router, prefix="/api")
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[route.get_db] = get_db
+    app.state.catalog_cache = None
+    with TestClient(app) as client:
+        yield client
+
+
+ARTIFACT_MODEL_NAME = "test-model"
+ARTIFACT_DIM = 8
+
+
+def write_version(root, n_agents: int, dim: int = ARTIFACT_DIM, model_name: str = ARTIFACT_MODEL_NAME,
+                  publish: bool = True) -> str:
+    """Write an artifact version with `n_agents` agents and a manifest under `root`; point CURRENT at it."""
+    from ml.search_model.vector_store import AgentVectorStore
+    from ml.search_model.versions import new_version_dir, publish_version, write_manifest
+
+    agents = [{"id": f"agent-{i}", "name": f"Agent {i}", "description": f"topic {i}"} for i in range(n_agents)]
+    version, directory = new_version_dir(root)
+    AgentVectorStore.from_agents(agents, np.eye(n_agents, dim, dtype=np.float32), index_type="flat").save(directory)
+    write_manifest(directory, {"model_name": model_name, "dim": dim, "vector_count": n_agents, "agent_count": n_agents})
+    if publish:
+        publish_version(root, version)
+    return version
+
+
+SEARCH_TOPICS = ("invoice accounting tax", "python code review", "travel flight booking", "medical symptom triage",
+                 "legal contract drafting", "music playlist curation")
+
+
+@pytest.fixture
+def search_agents():
+    """One DB row per search topic (agent i is about SEARCH_TOPICS[i])."""
+    return [agent_row(i, name=f"{topic.split()[0].title()} Agent", description=topic) for i, topic in enumerate(SEARCH_TOPICS)]
+
+
+@pytest.fixture
+def search_client(api_client, add_agents, search_agents):
+    """api_client with search enabled over `search_agents` (hashing model, flat index, real executor)."""
+    from backend.search.artifacts import SearchArtifacts
+    from backend.search.encoder import MicroBatchEncoder
+    from backend.search.executor import SearchExecutor
+    from backend.search.hybrid import SearchOptions
+    from ml.search_model.vector_store import AgentVectorStore
+
+    add_agents(search_agents)
+    encoder = MicroBatchEncoder(HashingModel(), max_wait_ms=1)
+    agents = [{"id": a["id"], "did": a["did"], "name": a["name"], "description": a["description"]} for a in search_agents]
+    store = AgentVectorStore.from_agents(agents, encoder.encode_now([a["description"] for a in agents]), index_type="flat")
+    executor = SearchExecutor(max_workers=1, max_queue_depth=4)
+    state = api_client.app.state
+    state.search_enabled = True
+    state.query_encoder = encoder
+    state.search_executor = executor
+    state.search_options = SearchOptions()
+    state.search_artifacts = SimpleNamespace(current=SearchArtifacts(version="test", path=Path("."), store=store))
+    yield api_client
+    encoder.close()
+    executor.shutdown()
@@ -0,0 +1,96 @@
+# backend/tests/test_agents_pagination.py
+"""GET /api/agents: keyset cursors page through exactly the offset listing, with and without the catalog cache."""
+
+import base64
+import json
+
+import pytest
+
+from backend.routes import route
+from backend.routes.route import encode_cursor
+from conftest import agent_row
+
+N_AGENTS = 53
+
+
+@pytest.fixture(params=["sql", "catalog_cache"])
+def listing_client(request, api_client, add_agents):
+    # Ties on every score and a NULL tail exercise the id tie-break and the separate NULL seek
+    add_agents([agent_row(i, avg_score=None if i % 7 == 0 else float(i % 4), num_ratings=i % 5) for i in range(N_AGENTS)])
+    if request.param == "catalog_cache":
+        api_client.app.state.catalog_cache = route.create_catalog_cache(check_interval_s=0)
+    return api_client
+
+
+def expected_ids(sort_by, category=None):
+    rows = [agent_row(i, avg_score=None if i % 7 == 0 else float(i % 4), num_ratings=i % 5) for i in range(N_AGENTS)]
+    rows = [r for r in rows if category is None or r["category"] == category]
+    # value DESC, id DESC, NULLs last
+    rows.sort(key=lambda r: (r[sort_by] is not None, r[sort_by] or 0, r["id"]), reverse=True)
+    return [r["id"] for r in rows]
+
+
+def walk_cursor(client, **params):
+    ids, cursor, pages = [], None, 0
+    while True:
+        body = client.get("/api/agents", params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        ids += [item["id"] for item in body["items"]]
+        pages += 1
+        assert body["total_items"] is None or pages == 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def walk_offset(client, page_size, **params):
+    ids, page = [], 1
+    while True:
+        items = client.get("/api/agents", params={**params, "page": page, "page_size": page_size}).json()["items"]
+        if not items:
+            return ids
+        ids += [item["id"] for item in items]
+        page += 1
+
+
+@pytest.mark.parametrize("sort_by", ["avg_score", "num_ratings"])
+@pytest.mark.parametrize("category", [None, "coding"])
+def test_cursor_pages_equal_offset_pages(listing_client, sort_by, category):
+    params = {"sort_by": sort_by, **({"category": category} if category else {})}
+
+    cursor_ids = walk_cursor(listing_client, page_size=5, **params)
+    assert cursor_ids == walk_offset(listing_client, 5, **params) == expected_ids(sort_by, category)
+
+
+def test_totals_are_exact_on_numbered_pages_and_opt_in_on_cursor_pages(listing_client):
+    first = listing_client.get("/api/agents", params={"page_size": 10}).json()
+    assert first["total_items"] == N_AGENTS
+
+    cursor = first["next_cursor"]
+    assert listing_client.get("/api/agents", params={"page_size": 10, "cursor": cursor}).json()["total_items"] is None
+    counted = listing_client.get("/api/agents", params={"page_size": 10, "cursor": cursor, "total": "exact"}).json()
+    assert counted["total_items"] == N_AGENTS
+    assert listing_client.get("/api/agents", params={"page_size": 10, "total": "none"}).json()["total_items"] is None
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 at all!",
+    raw_cursor([1, 2]),
+    raw_cursor({"sort_by": "avg_score", "category": None, "dedupe": False, "id": "agent-00001"}),  # No value
+    raw_cursor({"sort_by": "avg_score", "category": None, "dedupe": False, "value": "3", "id": "agent-00001"}),
+    raw_cursor({"sort_by": "avg_score", "category": None, "dedupe": False, "value": True, "id": "agent-00001"}),
+    raw_cursor({"sort_by": "avg_score", "category": None, "dedupe": False, "value": 3.0, "id": 1}),
+])
+def test_malformed_cursors_are_rejected(listing_client, cursor):
+    response = listing_client.get("/api/agents", params={"cursor": cursor})
+    assert response.status_code == 400 and response.json()["detail"] == "Invalid cursor."
+
+
+def test_cursor_is_bound_to_its_query_parameters(listing_client):
+    cursor = encode_cursor({"sort_by": "avg_score", "category": None, "dedupe": False, "value": 3.0, "id": "agent-00003"})
+    assert listing_client.get("/api/agents", params={"cursor": cursor}).status_code == 200
+    response = listing_client.get("/api/agents", params={"cursor": cursor, "sort_by": "num_ratings"})
+    assert response.status_code == 400 and "does not match" in response.json()["detail"]
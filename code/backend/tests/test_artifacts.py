@@ -0,0 +1,91 @@
+# backend/tests/test_artifacts.py
+"""SearchArtifactManager: versioned loads, atomic swaps and rejection of incompatible versions."""
+
+import numpy as np
+import pytest
+
+from backend.search.artifacts import SearchArtifactManager
+from conftest import ARTIFACT_DIM, ARTIFACT_MODEL_NAME, write_version
+from ml.search_model.vector_store import AgentVectorStore
+
+
+class RecordingCache:
+    def __init__(self):
+        self.bound = []
+
+    def bind_index(self, version):
+        self.bound.append(version)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return SearchArtifactManager(tmp_path, ARTIFACT_MODEL_NAME, ARTIFACT_DIM, cache=RecordingCache(), mmap=False)
+
+
+def test_reload_swaps_in_the_published_version_once(manager, tmp_path):
+    version = write_version(tmp_path, 3)
+
+    assert manager.reload() == {"status": "swapped", "version": version, "previous": None}
+    assert manager.reload() == {"status": "unchanged", "version": version}
+    assert manager.current.version == version and manager.current.store.live_count == 3
+    assert manager.cache.bound == [version]
+
+
+def test_in_flight_reference_keeps_the_old_bundle_after_a_swap(manager, tmp_path):
+    write_version(tmp_path, 3)
+    manager.reload()
+    held = manager.current
+
+    new_version = write_version(tmp_path, 5)
+    assert manager.pending_version() == new_version
+    manager.check_for_update()
+
+    assert manager.current.version == new_version and manager.current.store.live_count == 5
+    assert held.store.live_count == 3
+    assert manager.pending_version() is None and manager.swaps == 2
+
+
+@pytest.mark.parametrize("bad", [{"dim": ARTIFACT_DIM + 4}, {"model_name": "other-model"}])
+def test_incompatible_version_is_rejected_and_the_old_one_keeps_serving(manager, tmp_path, bad):
+    good = write_version(tmp_path, 3)
+    manager.reload()
+
+    rejected = write_version(tmp_path, 4, **bad)
+    status = manager.reload()
+
+    assert status["status"] == "rejected" and status["version"] == rejected and status["serving"] == good
+    assert manager.current.version == good
+    assert manager.rejections == 1 and rejected in manager.last_error
+
+
+def test_legacy_flat_layout_is_served_under_a_derived_version(manager, tmp_path):
+    AgentVectorStore.from_agents([{"id": "agent-0", "name": "A", "description": "d"}],
+                                 np.eye(1, ARTIFACT_DIM, dtype=np.float32), index_type="flat").save(tmp_path)
+
+    status = manager.reload()
+    assert status["status"] == "swapped" and status["version"].startswith("legacy-")
+    assert manager.pending_version() is None
+
+
+@pytest.fixture
+def admin_client(api_client, tmp_path):
+    write_version(tmp_path, 3)
+    api_client.app.state.search_artifacts = SearchArtifactManager(tmp_path, ARTIFACT_MODEL_NAME, ARTIFACT_DIM, mmap=False)
+    return api_client
+
+
+def test_reload_endpoint_is_disabled_without_a_configured_token(admin_client, monkeypatch):
+    monkeypatch.delenv("SEARCH_ADMIN_TOKEN", raising=False)
+    for headers in ({}, {"X-Admin-Token": ""}, {"X-Admin-Token": "anything"}):
+        response = admin_client.post("/api/admin/search/reload", headers=headers)
+        assert response.status_code == 403 and "disabled" in response.json()["detail"]
+    assert admin_client.app.state.search_artifacts.current is None
+
+
+def test_reload_endpoint_requires_the_configured_token(admin_client, monkeypatch):
+    monkeypatch.setenv("SEARCH_ADMIN_TOKEN", "s3cret")
+    for headers in ({}, {"X-Admin-Token": "wrong"}, {"X-Admin-Token": "s3cret-"}):
+        assert admin_client.post("/api/admin/search/reload", headers=headers).status_code == 403
+
+    response = admin_client.post("/api/admin/search/reload", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200 and response.json()["status"] == "swapped"
@@ -0,0 +1,50 @@
+# backend/tests/test_build_checkpoint.py
+"""BuildCheckpoint: shards persist across runs, resume after last_id, and assemble in build order."""
+
+import numpy as np
+
+from ml.search_model.build_checkpoint import BuildCheckpoint
+
+MODEL_NAME = "test-model"
+
+
+def page(start: int, n: int):
+    agents = [{"id": f"agent-{i:03d}"} for i in range(start, start + n)]
+    return agents, np.arange(start * 4, (start + n) * 4, dtype=np.float32).reshape(n, 4)
+
+
+def test_interrupted_build_resumes_after_the_last_completed_page(tmp_path):
+    checkpoint = BuildCheckpoint.open(tmp_path / "build", MODEL_NAME)
+    checkpoint.index_type = "flat"
+    checkpoint.add_shard(*page(0, 3), last_id="agent-002")
+    checkpoint.add_shard([], np.zeros((0, 4), dtype=np.float32), last_id="agent-005")  # Page fully skipped
+
+    resumed = BuildCheckpoint.open(tmp_path / "build", MODEL_NAME)
+    assert (resumed.last_id, resumed.encoded, resumed.index_type) == ("agent-005", 3, "flat")
+    assert len(resumed.state["shards"]) == 1
+
+
+def test_assemble_concatenates_shards_in_build_order(tmp_path):
+    checkpoint = BuildCheckpoint.open(tmp_path / "build", MODEL_NAME)
+    for start, n in ((0, 2), (2, 3)):
+        checkpoint.add_shard(*page(start, n), last_id=f"agent-{start + n - 1:03d}")
+
+    agents, vectors = checkpoint.assemble()
+    assert [a["id"] for a in agents] == [f"agent-{i:03d}" for i in range(5)]
+    np.testing.assert_array_equal(vectors, np.arange(20, dtype=np.float32).reshape(5, 4))
+
+
+def test_other_model_or_no_resume_starts_fresh(tmp_path):
+    BuildCheckpoint.open(tmp_path / "build", MODEL_NAME).add_shard(*page(0, 2), last_id="agent-001")
+
+    assert BuildCheckpoint.open(tmp_path / "build", MODEL_NAME, resume=False).encoded == 0
+    BuildCheckpoint.open(tmp_path / "build", MODEL_NAME).add_shard(*page(0, 2), last_id="agent-001")
+    fresh = BuildCheckpoint.open(tmp_path / "build", "other-model")
+    assert fresh.encoded == 0 and fresh.last_id is None and list(fresh.directory.iterdir()) == []
+
+
+def test_discard_removes_the_build_directory(tmp_path):
+    checkpoint = BuildCheckpoint.open(tmp_path / "build", MODEL_NAME)
+    checkpoint.add_shard(*page(0, 1), last_id="agent-000")
+    checkpoint.discard()
+    assert not (tmp_path / "build").exists()
@@ -0,0 +1,95 @@
+# backend/tests/test_catalog_cache.py
+"""CatalogCache: reload on a catalog version bump, copy-on-write rating patches, read-through endpoints."""
+
+import pytest
+from sqlalchemy import update
+
+from backend.database.catalog import bump_catalog_version, sort_key
+from backend.database.models import Agent
+from backend.routes import route
+from conftest import agent_row
+
+N_AGENTS = 12
+
+
+@pytest.fixture
+def catalog(api_client, add_agents):
+    # agent-00005 is unrated (NULL avg_score, sorted last)
+    add_agents([agent_row(i, avg_score=None if i == 5 else float(i % 4), num_ratings=0 if i == 5 else i % 3)
+                for i in range(N_AGENTS)])
+    return route.create_catalog_cache(check_interval_s=0)
+
+
+def commit_write(session_factory, agent_id, **values) -> int:
+    """An agent write plus its catalog version bump, in one transaction (as every writer does it)."""
+    with session_factory() as db:
+        db.execute(update(Agent).where(Agent.id == agent_id).values(**values))
+        version = bump_catalog_version(db)
+        db.commit()
+    return version
+
+
+def fresh_view(snapshot, sort_by, category, dedupe):
+    column = route.AGENT_SORT_COLUMNS[sort_by].key
+    ids = [i for i, item in snapshot.items.items() if category is None or item["category"] == category]
+    return sorted(ids, key=lambda i: sort_key(snapshot.items[i][column], i))
+
+
+def test_reloads_when_the_catalog_version_moves(catalog, session_factory):
+    assert catalog.get("agent-00003")["avg_score"] == 3.0
+    version = commit_write(session_factory, "agent-00003", avg_score=0.5)
+
+    assert catalog.get("agent-00003")["avg_score"] == 0.5
+    assert catalog.snapshot().version == version and catalog.loads == 2
+
+
+def test_version_is_only_checked_every_interval(catalog, session_factory):
+    catalog.check_interval_s = 3600
+    catalog.get("agent-00003")
+    commit_write(session_factory, "agent-00003", avg_score=0.5)
+
+    assert catalog.get("agent-00003")["avg_score"] == 3.0  # Still within the interval
+    catalog._checked_at = 0.0
+    assert catalog.get("agent-00003")["avg_score"] == 0.5
+
+
+def test_patch_is_copy_on_write_and_keeps_views_sorted(catalog, session_factory):
+    before = catalog.snapshot()
+    listings = [(s, c, False) for s in ("avg_score", "num_ratings") for c in (None, "coding", "finance")]
+    views = {key: before.view(*key) for key in listings}
+
+    version = commit_write(session_factory, "agent-00005", avg_score=4.5, num_ratings=9)
+    assert catalog.patch("agent-00005", version, avg_score=4.5, num_ratings=9)
+    after = catalog.snapshot()
+
+    assert after is not before and after.version == version and catalog.loads == 1
+    assert before.items["agent-00005"]["avg_score"] is None and before.views == views  # Old snapshot untouched
+    assert after.items["agent-00005"]["avg_score"] == 4.5
+    for key in listings:
+        assert after.views[key][1] == fresh_view(after, *key)
+        assert after.views[key][0] == sorted(after.views[key][0])
+
+
+def test_patch_shares_views_on_unchanged_sort_fields(catalog, session_factory):
+    by_count = catalog.snapshot().view("num_ratings", None, False)
+    catalog.patch("agent-00001", commit_write(session_factory, "agent-00001", avg_score=0.0), avg_score=0.0)
+    assert catalog.snapshot().views[("num_ratings", None, False)] is by_count
+
+
+def test_patch_is_refused_after_someone_elses_write(catalog, session_factory):
+    version = catalog.snapshot().version
+    assert not catalog.patch("agent-00001", version + 2, avg_score=1.0)
+    assert not catalog.patch("agent-unknown", version + 1, avg_score=1.0)
+    assert catalog.patches == 0
+
+
+def test_rating_submission_patches_this_workers_cache(api_client, catalog):
+    api_client.app.state.catalog_cache = catalog
+    top = api_client.get("/api/agents", params={"page_size": 1}).json()["items"][0]["id"]
+    for _ in range(3):
+        assert api_client.post("/api/ratings", json={"agent_id": "agent-00005", "score": 5}).status_code == 201
+
+    assert api_client.get("/api/agents/agent-00005").json()["num_ratings"] == 3
+    listing = api_client.get("/api/agents", params={"page_size": 2}).json()["items"]
+    assert [a["id"] for a in listing] == ["agent-00005", top]
+    assert (catalog.loads, catalog.patches) == (1, 3)
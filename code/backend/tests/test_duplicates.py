@@ -0,0 +1,74 @@
+# backend/tests/test_duplicates.py
+"""Near-duplicate clusters: blocked pair scan, union-find clustering and query-time de-duplication."""
+
+import numpy as np
+import pytest
+
+from backend.database.models import AgentDuplicate
+from backend.search.attributes import AgentAttributes
+from conftest import SEARCH_TOPICS, agent_row
+from ml.search_model.duplicates import cluster_labels, duplicate_pairs, find_duplicate_clusters
+
+
+def test_pairs_are_scored_once_across_blocks():
+    vectors = np.asarray([[1, 0], [1, 0], [0, 1], [0.6, 0.8], [1, 0]], dtype=np.float32)
+    for block in (2, 4096):
+        a, b, sims = duplicate_pairs(vectors, threshold=0.99, block=block)
+        assert sorted(zip(a.tolist(), b.tolist())) == [(0, 1), (0, 4), (1, 4)]
+        assert np.allclose(sims, 1.0)
+    assert len(duplicate_pairs(vectors, threshold=0.99, exclude_rows=[0])[0]) == 1
+
+
+def test_clusters_are_transitive_and_labelled_by_their_smallest_row():
+    labels = cluster_labels(6, np.asarray([4, 1]), np.asarray([5, 4]))
+    assert labels.tolist() == [-1, 1, -1, -1, 1, 1]
+
+
+def test_find_duplicate_clusters_reports_best_similarity():
+    vectors = np.asarray([[1, 0], [0.99, 0.141], [0, 1]], dtype=np.float32)
+    labels, best = find_duplicate_clusters(vectors, threshold=0.95)
+    assert labels.tolist() == [0, 0, -1]
+    assert best[0] == best[1] == pytest.approx(0.99, abs=1e-3) and np.isnan(best[2])
+
+
+CLONE = len(SEARCH_TOPICS)  # Agent 6 is a clone of agent 0
+
+
+@pytest.fixture
+def search_agents():
+    agents = [agent_row(i, description=topic) for i, topic in enumerate(SEARCH_TOPICS)]
+    return agents + [agent_row(CLONE, description=SEARCH_TOPICS[0])]
+
+
+@pytest.fixture
+def dedupe_client(search_client, session_factory, search_agents):
+    original, clone = search_agents[0]["id"], search_agents[CLONE]["id"]
+    with session_factory() as db:
+        db.add_all([AgentDuplicate(agent_id=original, cluster_id=original, similarity=1.0),
+                    AgentDuplicate(agent_id=clone, cluster_id=original, similarity=1.0)])
+        db.commit()
+    current = search_client.app.state.search_artifacts.current
+    current.attributes = AgentAttributes.from_db(session_factory, current.store.vector_ids())
+    return search_client
+
+
+def test_search_dedupe_keeps_one_hit_per_cluster(dedupe_client, search_agents):
+    body = {"query": SEARCH_TOPICS[0], "top_k": 2}
+    both = [hit["id"] for hit in dedupe_client.post("/api/search", json=body).json()["results"]]
+    collapsed = [hit["id"] for hit in dedupe_client.post("/api/search", json={**body, "dedupe": True}).json()["results"]]
+
+    assert set(both) == {search_agents[0]["id"], search_agents[CLONE]["id"]}
+    assert collapsed[0] == both[0] and len(collapsed) == 2 and both[1] not in collapsed
+
+
+def test_similar_dedupe_skips_the_agents_own_clones(dedupe_client, search_agents):
+    path = f"/api/agents/{search_agents[0]['id']}/similar"
+    assert dedupe_client.get(path, params={"k": 1}).json()["results"][0]["id"] == search_agents[CLONE]["id"]
+    hits = dedupe_client.get(path, params={"k": 3, "dedupe": True}).json()["results"]
+    assert search_agents[CLONE]["id"] not in [hit["id"] for hit in hits]
+
+
+def test_agent_listing_dedupe_hides_non_representatives(dedupe_client, search_agents):
+    ids = [a["id"] for a in dedupe_client.get("/api/agents", params={"dedupe": True, "page_size": 50}).json()["items"]]
+    assert search_agents[0]["id"] in ids and search_agents[CLONE]["id"] not in ids
+    assert len(ids) == len(search_agents) - 1
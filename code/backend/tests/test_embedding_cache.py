@@ -0,0 +1,41 @@
+# backend/tests/test_embedding_cache.py
+"""EmbeddingCache: bit-identical round trips keyed by (model, text hash), persisted across opens."""
+
+import numpy as np
+
+from ml.search_model import embedding_cache
+from ml.search_model.embedding_cache import EmbeddingCache
+from ml.search_model.vector_store import text_hash
+
+
+def test_vectors_round_trip_bit_identically_and_persist(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    vector = np.random.default_rng(0).standard_normal(16).astype(np.float32)
+    cache = EmbeddingCache(path, "model-a")
+    cache.put_many({text_hash("hello"): vector})
+    cache.close()
+
+    reopened = EmbeddingCache(path, "model-a")
+    found = reopened.get_many([text_hash("hello"), text_hash("missing"), text_hash("hello")])
+    assert list(found) == [text_hash("hello")]
+    assert found[text_hash("hello")].tobytes() == vector.tobytes()
+    assert (reopened.hits, reopened.misses, len(reopened)) == (1, 1, 1)
+    reopened.close()
+
+
+def test_entries_are_scoped_to_the_model(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    EmbeddingCache(path, "model-a").put_many({"h": np.ones(4, dtype=np.float32)})
+
+    other = EmbeddingCache(path, "model-b")
+    assert other.get_many(["h"]) == {} and len(other) == 0
+
+
+def test_lookups_are_chunked_below_the_parameter_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "SQLITE_IN_CHUNK", 3)
+    cache = EmbeddingCache(tmp_path / "cache.sqlite", "model-a")
+    cache.put_many({f"h{i}": np.full(2, i, dtype=np.float32) for i in range(10)})
+
+    found = cache.get_many(f"h{i}" for i in range(12))
+    assert sorted(found, key=lambda h: int(h[1:])) == [f"h{i}" for i in range(10)]
+    assert found["h7"].tolist() == [7.0, 7.0]
@@ -0,0 +1,59 @@
+# backend/tests/test_encoder.py
+"""MicroBatchEncoder: concurrent queries share one model call and get their own rows back."""
+
+import asyncio
+
+import numpy as np
+
+from backend.search.encoder import MicroBatchEncoder
+
+
+class RecordingModel:
+    """Model double: one deterministic row per text, records every encode call."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model failed")
+        return np.array([[len(text), 1.0, 0.0] for text in texts], dtype=np.float32)
+
+
+def encode_concurrently(encoder, texts):
+    async def run():
+        try:
+            return await asyncio.gather(*(encoder.encode(text) for text in texts), return_exceptions=True)
+        finally:
+            encoder.close()
+    return asyncio.run(run())
+
+
+def test_concurrent_queries_are_encoded_in_one_batch():
+    model = RecordingModel()
+    encoder = MicroBatchEncoder(model, max_batch_size=8, max_wait_ms=50)
+    texts = ["a", "bb", "ccc", "dddd"]
+    vectors = encode_concurrently(encoder, texts)
+
+    assert model.calls == [texts]
+    for text, vector in zip(texts, vectors):
+        expected = np.array([len(text), 1.0, 0.0], dtype=np.float32)
+        np.testing.assert_allclose(vector, expected / np.linalg.norm(expected), rtol=1e-6)
+    assert encoder.batch_size_hist.snapshot()["count"] == 1
+
+
+def test_batches_are_capped_at_max_batch_size():
+    model = RecordingModel()
+    encoder = MicroBatchEncoder(model, max_batch_size=2, max_wait_ms=50)
+    encode_concurrently(encoder, ["a", "b", "c", "d", "e"])
+
+    assert [len(call) for call in model.calls] == [2, 2, 1]
+
+
+def test_model_failure_reaches_every_caller_of_the_batch():
+    encoder = MicroBatchEncoder(RecordingModel(fail=True), max_batch_size=8, max_wait_ms=50)
+    results = encode_concurrently(encoder, ["a", "b"])
+
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,58 @@
+# backend/tests/test_etag.py
+"""ETag / If-None-Match on catalog and ratings reads: 304 until submit_rating changes the catalog."""
+
+import pytest
+
+from backend.routes import route
+from conftest import agent_row
+
+AGENT_ID = agent_row(1)["id"]
+
+
+@pytest.fixture(params=["sql", "catalog_cache"])
+def client(request, api_client, add_agents):
+    add_agents([agent_row(i) for i in range(5)])
+    if request.param == "catalog_cache":
+        api_client.app.state.catalog_cache = route.create_catalog_cache(check_interval_s=0)
+    return api_client
+
+
+READS = [("/api/agents", {"page_size": 5}), (f"/api/agents/{AGENT_ID}", {}),
+         ("/api/ratings/by-agent", {"agent_id": AGENT_ID}), ("/api/ratings/by-did", {"did": agent_row(1)["did"]})]
+
+
+@pytest.mark.parametrize("path, params", READS)
+def test_matching_etag_gets_a_bodiless_304(client, path, params):
+    first = client.get(path, params=params)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["cache-control"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        again = client.get(path, params=params, headers={"If-None-Match": if_none_match})
+        assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+    assert client.get(path, params=params, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+@pytest.mark.parametrize("path, params", READS)
+def test_etag_changes_after_submit_rating(client, path, params):
+    first = client.get(path, params=params)
+    assert client.post("/api/ratings", json={"agent_id": AGENT_ID, "score": 5, "comment": "new"}).status_code == 201
+
+    after = client.get(path, params=params, headers={"If-None-Match": first.headers["etag"]})
+    assert after.status_code == 200 and after.headers["etag"] != first.headers["etag"]
+    assert after.json() != first.json()
+    assert client.get(path, params=params, headers={"If-None-Match": after.headers["etag"]}).status_code == 304
+
+
+def test_etag_is_specific_to_the_url(client):
+    page_1 = client.get("/api/agents", params={"page_size": 2}).headers["etag"]
+    page_2 = client.get("/api/agents", params={"page_size": 2, "page": 2})
+    assert page_2.headers["etag"] != page_1
+    assert client.get("/api/agents", params={"page_size": 2, "page": 2},
+                      headers={"If-None-Match": page_1}).status_code == 200
+
+
+@pytest.mark.parametrize("path, params", [("/api/agents/agent-unknown", {}), ("/api/ratings/by-agent", {"agent_id": "nope"}),
+                                          ("/api/ratings/by-did", {"did": "did:nope"})])
+def test_unknown_resources_are_404_even_for_wildcard_conditionals(client, path, params):
+    assert client.get(path, params=params, headers={"If-None-Match": "*"}).status_code == 404
@@ -0,0 +1,42 @@
+# backend/tests/test_executor.py
+"""SearchExecutor: bounded admission and off-loop execution."""
+
+import asyncio
+import threading
+
+import pytest
+
+from backend.search.executor import SearchExecutor, SearchSaturated
+
+
+@pytest.fixture
+def executor():
+    executor = SearchExecutor(max_workers=1, max_queue_depth=2, retry_after_s=3)
+    yield executor
+    executor.shutdown()
+
+
+def test_admission_is_rejected_at_queue_depth_and_freed_on_exit(executor):
+    with executor.admit(), executor.admit():
+        assert executor.saturated
+        with pytest.raises(SearchSaturated) as excinfo:
+            with executor.admit():
+                pass
+        assert excinfo.value.retry_after == 3
+    assert not executor.saturated
+    stats = executor.stats()
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == 2
+    assert stats["rejected"] == 1
+
+
+def test_slot_is_released_when_the_block_raises(executor):
+    with pytest.raises(ValueError):
+        with executor.admit():
+            raise ValueError
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_run_executes_on_the_search_pool(executor):
+    thread_name = asyncio.run(executor.run(lambda: threading.current_thread().name))
+    assert thread_name.startswith("search-inference")
@@ -0,0 +1,84 @@
+# backend/tests/test_filters.py
+"""Structured search filters: attribute masks, filtered vector search and the /search filters field."""
+
+import numpy as np
+import pytest
+
+from backend.search.attributes import AgentAttributes
+from ml.search_model.vector_store import AgentVectorStore, vector_id_for
+
+ROWS = [("agent-0", "Finance", 0.0, 4.5, 10), ("agent-1", "coding", 5.0, 3.0, 2),
+        ("agent-2", None, None, None, 0), ("agent-3", "finance", 20.0, 5.0, 1)]
+
+
+@pytest.fixture
+def attributes():
+    return AgentAttributes([vector_id_for(f"agent-{i}") for i in range(5)], ROWS)  # agent-4 is not in the DB
+
+
+def test_mask_combines_conditions_and_unknown_values_never_match(attributes):
+    assert attributes.mask().tolist() == [True] * 5
+    assert attributes.mask(category=["FINANCE"]).tolist() == [True, False, False, True, False]
+    assert attributes.mask(category=["unknown"]).tolist() == [False] * 5
+    assert attributes.mask(price_max=5.0).tolist() == [True, True, False, False, False]
+    assert attributes.mask(category=["finance", "Coding"], min_avg_score=4.0, min_num_ratings=2).tolist() == \
+        [True, False, False, False, False]
+
+
+def test_update_patches_one_agent_and_bumps_the_generation(attributes):
+    generation = attributes.generation
+    assert attributes.update("agent-2", avg_score=4.0, num_ratings=1)
+    assert not attributes.update("agent-unknown", avg_score=1.0)
+
+    assert attributes.generation > generation
+    assert attributes.allowed_ids(min_avg_score=4.0).tolist() == [vector_id_for(f"agent-{i}") for i in (0, 2, 3)]
+
+
+def test_filtered_vector_search_is_exact_within_the_allowed_ids():
+    agents = [{"id": f"agent-{i}", "name": f"A{i}", "description": ""} for i in range(6)]
+    store = AgentVectorStore.from_agents(agents, np.eye(6, 8, dtype=np.float32), index_type="hnsw")
+    allowed = np.asarray([vector_id_for("agent-4"), vector_id_for("agent-5")])
+
+    _, ids = store.search(np.eye(1, 8, dtype=np.float32), 3, allowed_ids=allowed)
+    assert set(ids[0][:2]) == set(allowed) and ids[0][2] == -1
+
+
+@pytest.fixture
+def filtered_client(search_client, session_factory):
+    store = search_client.app.state.search_artifacts.current.store
+    search_client.app.state.search_artifacts.current.attributes = AgentAttributes.from_db(session_factory, store.vector_ids())
+    return search_client
+
+
+def test_filters_without_attributes_are_unavailable(search_client):
+    response = search_client.post("/api/search", json={"query": "code", "filters": {"category": "coding"}})
+    assert response.status_code == 503
+
+
+def test_search_only_returns_agents_matching_the_filter(filtered_client, search_agents):
+    response = filtered_client.post("/api/search", json={"query": "python code review", "top_k": 5,
+                                                         "filters": {"category": "FINANCE"}})
+    finance = {a["id"] for a in search_agents if a["category"] == "finance"}
+
+    assert {hit["id"] for hit in response.json()["results"]} == finance
+
+
+def test_rating_is_visible_to_filters_immediately(filtered_client, search_agents):
+    body = {"query": "invoice", "top_k": 5, "filters": {"min_num_ratings": 3}}
+    assert filtered_client.post("/api/search", json=body).json()["results"] == []
+
+    target = search_agents[0]["id"]
+    for _ in range(3):
+        assert filtered_client.post("/api/ratings", json={"agent_id": target, "score": 5}).status_code == 201
+    assert [hit["id"] for hit in filtered_client.post("/api/search", json=body).json()["results"]] == [target]
+
+
+@pytest.mark.parametrize("filters", [{}, {"category": None, "price_max": None}, {"category": []}])
+def test_empty_filters_mean_no_filters(search_client, filters):
+    # No attributes loaded: real filters would be a 503
+    single = search_client.post("/api/search", json={"query": "code", "top_k": 2, "filters": filters})
+    batch = search_client.post("/api/search/batch", json={"queries": [{"query": "code", "top_k": 2, "filters": filters}]})
+    streamed = search_client.post("/api/search/batch?stream=true", json={"queries": [{"query": "code", "filters": filters}]})
+
+    assert single.status_code == batch.status_code == streamed.status_code == 200
+    assert batch.json()["results"][0]["results"] == single.json()["results"]
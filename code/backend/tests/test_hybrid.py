@@ -0,0 +1,69 @@
+# backend/tests/test_hybrid.py
+"""BM25 lexical index, reciprocal rank fusion and the lexical/hybrid search modes."""
+
+import numpy as np
+import pytest
+
+from backend.search.hybrid import reciprocal_rank_fusion
+from ml.search_model.lexical import BM25Index, tokenize
+
+AGENTS = [
+    {"vector_id": 10, "name": "Invoice Bot", "description": "reads invoices"},
+    {"vector_id": 20, "name": "Helper", "description": "invoice tax questions and more tax"},
+    {"vector_id": 30, "name": "Market-Analysis Agent", "description": "stock charts"},
+    {"vector_id": 40, "name": "Travel", "description": "flight booking", "tags": ["travel", "flights"]},
+]
+
+
+@pytest.fixture(scope="module")
+def bm25():
+    return BM25Index.build(AGENTS)
+
+
+def test_tokenize_folds_case_dashes_and_splits_compounds():
+    assert tokenize("Real‑Time MARKET-analysis!") == ["real-time", "real", "time", "market-analysis", "market", "analysis"]
+
+
+def test_search_ranks_weighted_name_matches_first(bm25):
+    scores, ids = bm25.search("invoice", 3)
+    assert ids.tolist() == [10, 20, -1]
+    assert scores[0] > scores[1] > 0 and scores[2] == -np.inf
+
+
+def test_search_matches_compound_parts(bm25):
+    assert bm25.search("market", 1)[1].tolist() == [30]
+    assert bm25.search("nothing matches", 2)[1].tolist() == [-1, -1]
+
+
+def test_search_honours_exclude_and_allowed_ids(bm25):
+    assert bm25.search("invoice", 2, exclude_ids=np.asarray([10]))[1].tolist() == [20, -1]
+    assert bm25.search("invoice tax", 2, allowed_ids=np.asarray([20, 40]))[1].tolist() == [20, -1]
+
+
+def test_save_and_load_round_trip(bm25, tmp_path):
+    path = tmp_path / "lexical.npz"
+    bm25.save(path)
+    loaded = BM25Index.load(path)
+    for query in ("invoice", "tax flight", "stock market"):
+        np.testing.assert_array_equal(loaded.search(query, 4)[1], bm25.search(query, 4)[1])
+
+
+def test_reciprocal_rank_fusion_sums_inverse_ranks():
+    scores, ids = reciprocal_rank_fusion([np.asarray([1, 2, 3]), np.asarray([3, 1, -1])], k=4, rrf_k=60)
+
+    assert ids.tolist() == [1, 3, 2, -1]
+    np.testing.assert_allclose(scores[:3], [1 / 61 + 1 / 62, 1 / 63 + 1 / 61, 1 / 62], rtol=1e-6)
+    assert scores[3] == 0
+
+
+def test_reciprocal_rank_fusion_ties_keep_first_seen_order():
+    assert reciprocal_rank_fusion([np.asarray([5]), np.asarray([7])], k=2)[1].tolist() == [5, 7]
+
+
+@pytest.mark.parametrize("mode", ["lexical", "hybrid"])
+def test_search_endpoint_modes_find_the_exact_word_match(search_client, search_agents, mode):
+    response = search_client.post("/api/search", json={"query": "flight", "top_k": 2, "mode": mode})
+
+    assert response.status_code == 200
+    assert response.json()["mode"] == mode
+    assert response.json()["results"][0]["id"] == search_agents[2]["id"]
@@ -0,0 +1,48 @@
+# backend/tests/test_hydrate.py
+"""?hydrate=true on /search and /search/batch: full, current agent records attached to hits."""
+
+import os
+
+from backend.search.cache import SearchCache
+
+
+def test_hits_carry_their_current_agent_record(search_client, search_agents):
+    response = search_client.post("/api/search?hydrate=true", json={"query": "travel flight booking", "top_k": 3})
+
+    results = response.json()["results"]
+    assert len(results) == 3
+    by_id = {a["id"]: a for a in search_agents}
+    for hit in results:
+        agent, row = hit["agent"], by_id[hit["id"]]
+        assert agent["id"] == hit["id"]
+        assert agent["url"] == row["url"] and agent["price_usd"] == row["price_usd"]
+        assert agent["img_url"] == f"/images/{os.path.basename(row['img_url'])}"
+
+
+def test_hits_are_not_hydrated_by_default(search_client):
+    results = search_client.post("/api/search", json={"query": "travel", "top_k": 2}).json()["results"]
+    assert all(hit["agent"] is None for hit in results)
+
+
+def test_hydration_does_not_leak_into_cached_results(search_client):
+    search_client.app.state.search_cache = SearchCache()
+    body = {"query": "medical symptom triage", "top_k": 2}
+
+    assert search_client.post("/api/search?hydrate=true", json=body).json()["results"][0]["agent"] is not None
+    assert search_client.post("/api/search", json=body).json()["results"][0]["agent"] is None
+
+
+def test_batch_hydrates_every_response(search_client):
+    queries = [{"query": "invoice", "top_k": 1}, {"query": "music playlist", "top_k": 1}]
+    results = search_client.post("/api/search/batch?hydrate=true", json={"queries": queries}).json()["results"]
+    assert [r["results"][0]["agent"]["id"] for r in results] == [r["results"][0]["id"] for r in results]
+
+
+def test_hit_deleted_from_the_database_is_kept_without_a_record(search_client, session_factory, search_agents):
+    from backend.database.models import Agent
+
+    with session_factory() as db:
+        db.delete(db.get(Agent, search_agents[2]["id"]))
+        db.commit()
+    hit = search_client.post("/api/search?hydrate=true", json={"query": "travel flight booking", "top_k": 1}).json()["results"][0]
+    assert hit["id"] == search_agents[2]["id"] and hit["agent"] is None
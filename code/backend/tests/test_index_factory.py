@@ -0,0 +1,64 @@
+# backend/tests/test_index_factory.py
+"""Index factory: size-based selection, id-keyed builds of every type and per-search knobs."""
+
+import faiss
+import numpy as np
+import pytest
+
+from ml.search_model import index_factory
+from ml.search_model.index_factory import (INDEX_TYPES, build_index, choose_index_type, index_type_of, is_id_keyed,
+                                           search_parameters, supports_remove)
+
+DIM = 16
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((400, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors, np.arange(1000, 1400, dtype=np.int64)
+
+
+@pytest.mark.parametrize("n, expected", [
+    (0, "flat"), (index_factory.FLAT_MAX_VECTORS, "flat"), (index_factory.FLAT_MAX_VECTORS + 1, "hnsw"),
+    (index_factory.HNSW_MAX_VECTORS + 1, "ivf_flat"), (index_factory.IVF_FLAT_MAX_VECTORS + 1, "ivf_pq"),
+])
+def test_choose_index_type_by_corpus_size(n, expected):
+    assert choose_index_type(n) == expected
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_every_type_returns_stable_vector_ids(corpus, index_type):
+    vectors, ids = corpus
+    index = build_index(index_type, DIM, vectors, ids)
+
+    assert index_type_of(index) == index_type and is_id_keyed(index)
+    assert supports_remove(index) is (index_type != "hnsw")
+    params = search_parameters(index, nprobe=64, ef_search=128)
+    _, found = index.search(vectors[:5], 1, params=params)
+    if index_type == "ivf_pq":  # Lossy codes: the query's own id need not be the top hit
+        assert set(found[:, 0]) <= set(ids)
+    else:
+        assert list(found[:, 0]) == list(ids[:5])
+
+
+def test_ivf_falls_back_to_flat_with_too_few_vectors(corpus):
+    vectors, ids = corpus
+    index = build_index("ivf_flat", DIM, vectors[:10], ids[:10])
+    assert index_type_of(index) == "flat"
+
+
+def test_unknown_index_type_is_rejected(corpus):
+    with pytest.raises(ValueError):
+        build_index("annoy", DIM, *corpus)
+
+
+def test_search_parameters_only_apply_to_matching_index_types(corpus):
+    vectors, ids = corpus
+    flat, ivf, hnsw = (build_index(t, DIM, vectors, ids) for t in ("flat", "ivf_flat", "hnsw"))
+
+    assert search_parameters(flat, nprobe=8, ef_search=32) is None
+    ivf_params = search_parameters(ivf, nprobe=10_000)
+    assert isinstance(ivf_params, faiss.SearchParametersIVF) and ivf_params.nprobe == faiss.extract_index_ivf(ivf).nlist
+    assert search_parameters(hnsw, ef_search=32).efSearch == 32
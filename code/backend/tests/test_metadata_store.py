@@ -0,0 +1,49 @@
+# backend/tests/test_metadata_store.py
+"""agents.meta: round trip of string columns (with NULLs and non-ASCII), id -> row lookup, partial hydration."""
+
+import pytest
+
+from ml.search_model.metadata_store import METADATA_FILE_NAME, AgentMetadata, write_metadata
+
+AGENTS = [
+    {"vector_id": 900, "id": "agent-a", "name": "Ägent Ä", "description": "", "category": None},
+    {"vector_id": 7, "id": "agent-b", "name": "Agent B", "description": "finance 📈", "category": "Finance"},
+    {"vector_id": 450, "id": "agent-c", "name": "Agent C", "description": "coding", "category": None},
+]
+COLUMNS = ("id", "name", "description", "category")
+
+
+@pytest.fixture
+def metadata(tmp_path):
+    write_metadata(tmp_path / METADATA_FILE_NAME, AGENTS, columns=COLUMNS)
+    return AgentMetadata.open(tmp_path)
+
+
+def test_rows_round_trip_like_a_list_of_dicts(metadata):
+    assert len(metadata) == 3
+    assert list(metadata) == AGENTS
+    assert metadata[-1] == AGENTS[2] and metadata[1:] == AGENTS[1:]
+    with pytest.raises(IndexError):
+        metadata[3]
+
+
+def test_rows_of_resolves_vector_ids_and_marks_unknown_ones(metadata):
+    assert metadata.rows_of([7, 900, 450, 8, 10_000]).tolist() == [1, 0, 2, -1, -1]
+
+
+def test_hydrate_decodes_only_requested_columns(metadata):
+    hits = metadata.hydrate([2, -1, 0], columns=["name", "unknown"])
+    assert hits == [{"name": "Agent C", "vector_id": 450}, None, {"name": "Ägent Ä", "vector_id": 900}]
+
+
+def test_open_returns_none_without_the_file_and_rejects_foreign_files(tmp_path):
+    assert AgentMetadata.open(tmp_path) is None
+    (tmp_path / METADATA_FILE_NAME).write_bytes(b"not a metadata file")
+    with pytest.raises(ValueError):
+        AgentMetadata.open(tmp_path)
+
+
+def test_empty_store(tmp_path):
+    write_metadata(tmp_path / METADATA_FILE_NAME, [], columns=COLUMNS)
+    metadata = AgentMetadata.open(tmp_path)
+    assert len(metadata) == 0 and metadata.rows_of([1]).tolist() == [-1]
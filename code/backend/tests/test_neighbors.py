@@ -0,0 +1,78 @@
+# backend/tests/test_neighbors.py
+"""Precomputed neighbour table: blocked top-K equals brute force and serves /similar without a search."""
+
+import numpy as np
+import pytest
+
+from ml.search_model.neighbors import NeighborTable, compute_neighbors
+from ml.search_model.vector_store import AgentVectorStore, vector_id_for
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((50, 8)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def brute_force(vectors, k, excluded=()):
+    sims = vectors @ vectors.T
+    np.fill_diagonal(sims, -np.inf)
+    sims[:, list(excluded)] = -np.inf
+    return np.argsort(-sims, axis=1, kind="stable")[:, :k]
+
+
+@pytest.mark.parametrize("query_block, column_block", [(1024, 16384), (7, 11)])
+def test_blocked_top_k_matches_brute_force(vectors, query_block, column_block):
+    rows, scores = compute_neighbors(vectors, 5, exclude_rows=[3, 4], query_block=query_block, column_block=column_block)
+
+    np.testing.assert_array_equal(rows, brute_force(vectors, 5, excluded=(3, 4)))
+    assert scores.dtype == np.float16 and np.all(np.diff(scores.astype(np.float32), axis=1) <= 0)
+
+
+def test_rows_are_padded_when_fewer_than_k_agents_remain(vectors):
+    rows, _ = compute_neighbors(vectors[:3], 4)
+    assert (rows[:, 2:] == -1).all() and set(rows[0, :2]) == {1, 2}
+
+    table = NeighborTable(*compute_neighbors(vectors[:3], 4))
+    scores, found = table.lookup(0, 4)
+    assert len(scores) == len(found) == 2
+
+
+def test_save_and_mmap_load_round_trip(vectors, tmp_path):
+    table = NeighborTable.build(vectors, k=3)
+    assert NeighborTable.load(tmp_path) is None
+    table.save(tmp_path)
+
+    loaded = NeighborTable.load(tmp_path, mmap=True)
+    assert isinstance(loaded.rows, np.memmap) and loaded.k == 3
+    np.testing.assert_array_equal(loaded.rows, table.rows)
+
+
+def test_store_similar_from_table_matches_the_index(vectors):
+    agents = [{"id": f"agent-{i}", "name": f"A{i}", "description": ""} for i in range(len(vectors))]
+    store = AgentVectorStore.from_agents(agents, vectors, index_type="flat")
+    vector_id = vector_id_for("agent-7")
+    _, from_index = store.similar(vector_id, 4)
+
+    store.build_neighbors(10)
+    assert store.has_neighbors(4) and not store.has_neighbors(11)
+    _, from_table = store.similar(vector_id, 4)
+    assert from_table.tolist() == from_index.tolist()
+
+
+def test_similar_endpoint_uses_the_table_without_an_executor_slot(search_client, search_agents):
+    state = search_client.app.state
+    state.search_artifacts.current.store.build_neighbors(4)
+    executor = state.search_executor
+    slots = [executor.admit() for _ in range(executor.max_queue_depth)]
+    for slot in slots:
+        slot.__enter__()
+    try:
+        response = search_client.get(f"/api/agents/{search_agents[0]['id']}/similar", params={"k": 3})
+        too_deep = search_client.get(f"/api/agents/{search_agents[0]['id']}/similar", params={"k": 5})
+    finally:
+        for slot in slots:
+            slot.__exit__(None, None, None)
+    assert response.status_code == 200 and len(response.json()["results"]) == 3
+    assert too_deep.status_code == 503  # Deeper than the table: needs a search, and the executor is full
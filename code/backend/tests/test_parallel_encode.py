@@ -0,0 +1,66 @@
+# backend/tests/test_parallel_encode.py
+"""ParallelEncoder: length-sorted batches, results scattered back into input order."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from conftest import HashingModel
+from ml.search_model import parallel_encode
+from ml.search_model.parallel_encode import ParallelEncoder, length_sorted_batches
+
+TEXTS = ["a", "a much longer text than the others", "mid length text", "", "bb", "some text"]
+
+
+def test_length_sorted_batches_cover_every_position_longest_first():
+    batches = length_sorted_batches(TEXTS, batch_size=4)
+
+    assert [b.tolist() for b in batches] == [[1, 2, 5, 4], [0, 3]]
+    lengths = [len(TEXTS[i]) for b in batches for i in b]
+    assert lengths == sorted(lengths, reverse=True)
+
+
+def test_encode_returns_rows_in_input_order(monkeypatch):
+    model = HashingModel()
+
+    def init_worker(model_name, torch_threads):
+        parallel_encode._worker_model = model
+
+    # Threads instead of spawned processes: the same batching and scatter code, without loading a real model
+    monkeypatch.setattr(parallel_encode, "_init_worker", init_worker)
+    monkeypatch.setattr(parallel_encode, "ProcessPoolExecutor",
+                        lambda max_workers, mp_context, initializer, initargs:
+                        ThreadPoolExecutor(max_workers, initializer=initializer, initargs=initargs))
+    encoder = ParallelEncoder("test-model", workers=2, batch_size=2)
+    try:
+        vectors = encoder.encode(TEXTS)
+    finally:
+        encoder.close()
+
+    np.testing.assert_array_equal(vectors, HashingModel().encode(TEXTS))
+    assert sorted(len(call) for call in model.calls) == [2, 2, 2]
+    assert encoder.texts == len(TEXTS) and encoder.rate > 0
+
+
+def test_startup_is_not_counted_as_encoding_time(monkeypatch):
+    loaded = []
+
+    def init_worker(model_name, torch_threads):
+        time.sleep(0.2)  # A slow model load
+        loaded.append(model_name)
+        parallel_encode._worker_model = HashingModel()
+
+    monkeypatch.setattr(parallel_encode, "_init_worker", init_worker)
+    monkeypatch.setattr(parallel_encode, "ProcessPoolExecutor",
+                        lambda max_workers, mp_context, initializer, initargs:
+                        ThreadPoolExecutor(max_workers, initializer=initializer, initargs=initargs))
+    encoder = ParallelEncoder("test-model", workers=2, batch_size=2)
+    try:
+        assert loaded == ["test-model", "test-model"]  # Every worker is up before the constructor returns
+        encoder.encode(TEXTS)
+    finally:
+        encoder.close()
+
+    assert encoder.startup_seconds >= 0.2
+    assert encoder.seconds < 0.2
@@ -0,0 +1,73 @@
+# backend/tests/test_ratings_pagination.py
+"""GET /api/ratings/by-agent and /by-did: newest-first keyset cursors, totals and 404s."""
+
+import pytest
+
+from backend.routes.route import RatingOut
+from conftest import agent_row
+
+AGENT = agent_row(1)
+N_RATINGS = 23
+
+
+def rating_rows():
+    # Duplicate timestamps (tie-break on id), a NULL-timestamp tail and NULL comments
+    return [{"id": i + 1, "agent_id": AGENT["id"], "user_id": f"user-{i}", "score": 1 + i % 5,
+             "comment": None if i % 4 == 0 else f"comment {i}",
+             "timestamp": None if i % 6 == 0 else f"2025-01-{1 + i % 5:02d}T00:00:00Z", "hash": f"h{i}"}
+            for i in range(N_RATINGS)]
+
+
+@pytest.fixture
+def ratings_client(api_client, add_agents):
+    add_agents([AGENT, agent_row(2)], rating_rows())
+    return api_client
+
+
+def expected_hashes():
+    # RatingOut has no id; hashes are unique here
+    rows = sorted(rating_rows(), key=lambda r: (r["timestamp"] is not None, r["timestamp"] or "", r["id"]), reverse=True)
+    return [r["hash"] for r in rows]
+
+
+def page_through(client, path, **params):
+    items, cursor = [], None
+    while True:
+        body = client.get(path, params={**params, "page_size": 4, **({"cursor": cursor} if cursor else {})}).json()
+        items += body["items"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+
+
+@pytest.mark.parametrize("path, params", [("/api/ratings/by-agent", {"agent_id": AGENT["id"]}),
+                                          ("/api/ratings/by-did", {"did": AGENT["did"]})])
+def test_cursor_pages_equal_offset_pages(ratings_client, path, params):
+    by_cursor = page_through(ratings_client, path, **params)
+    by_offset = [item for page in range(1, 8)
+                 for item in ratings_client.get(path, params={**params, "page": page, "page_size": 4}).json()["items"]]
+
+    assert by_cursor == by_offset
+    assert [item["hash"] for item in by_cursor] == expected_hashes()
+    for item in by_cursor:
+        assert RatingOut.model_validate(item).model_dump() == item  # NULL comments/timestamps come back as ""
+    assert {item["did"] for item in by_cursor} == ({AGENT["did"]} if "did" in params else {None})
+
+
+def test_totals(ratings_client):
+    params = {"agent_id": AGENT["id"], "page_size": 5}
+    assert ratings_client.get("/api/ratings/by-agent", params=params).json()["total_items"] == N_RATINGS
+    estimate = ratings_client.get("/api/ratings/by-agent", params={**params, "total": "estimate"}).json()
+    assert estimate["total_items"] == AGENT["num_ratings"] and estimate["total_estimated"] is True
+    assert ratings_client.get("/api/ratings/by-agent", params={**params, "total": "none"}).json()["total_items"] is None
+
+
+def test_cursor_of_another_agent_is_rejected(ratings_client):
+    cursor = ratings_client.get("/api/ratings/by-agent", params={"agent_id": AGENT["id"], "page_size": 2}).json()["next_cursor"]
+    response = ratings_client.get("/api/ratings/by-agent", params={"agent_id": agent_row(2)["id"], "cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_unknown_agent_is_404(ratings_client):
+    assert ratings_client.get("/api/ratings/by-agent", params={"agent_id": "nope"}).status_code == 404
+    assert ratings_client.get("/api/ratings/by-did", params={"did": "did:nope"}).status_code == 404
@@ -0,0 +1,65 @@
+# backend/tests/test_rerank.py
+"""Rating-aware re-ranking: Bayesian rating signal, price signal and blended ordering."""
+
+import numpy as np
+import pytest
+
+from backend.search.attributes import AgentAttributes
+from backend.search.rerank import RerankParams, rerank
+from ml.search_model.vector_store import vector_id_for
+
+IDS = np.asarray([vector_id_for(f"agent-{i}") for i in range(5)])
+
+
+@pytest.fixture
+def attributes():
+    # agent-0: one 5-star vote; agent-1: long 4.5 record; agent-2: unrated, free; agent-3: missing from the DB;
+    # agent-4: long 2.0 record (pulls the global mean down)
+    rows = [("agent-0", None, 100.0, 5.0, 1), ("agent-1", None, 10.0, 4.5, 200), ("agent-2", None, 0.0, None, 0),
+            ("agent-4", None, 1.0, 2.0, 200)]
+    return AgentAttributes(IDS, rows)
+
+
+def test_bayesian_rating_prefers_a_long_track_record(attributes):
+    rating, _ = attributes.ranking_features(IDS, rating_prior=5.0)
+    assert rating[1] > rating[0] > 0
+    assert rating[2] == rating[3]  # Unrated and unknown agents both get the global mean
+
+
+def test_price_signal_is_one_for_free_and_zero_for_the_most_expensive(attributes):
+    _, price = attributes.ranking_features(IDS, rating_prior=5.0)
+    assert price[2] == 1.0 and price[0] == 0.0 and 0 < price[1] < 1 and price[3] == 0.0
+
+
+def test_features_follow_attribute_updates(attributes):
+    before, _ = attributes.ranking_features(IDS, rating_prior=5.0)
+    attributes.update("agent-0", avg_score=1.0, num_ratings=50)
+    after, _ = attributes.ranking_features(IDS, rating_prior=5.0)
+    assert after[0] < before[0]
+
+
+def test_rerank_blends_relevance_with_rating_and_keeps_top_k(attributes):
+    scores = np.asarray([0.9, 0.8, 0.7, 0.6, 0.5], dtype=np.float32)
+
+    kept_scores, kept_ids, blended = rerank(scores, IDS, attributes, RerankParams(rating=10.0), k=2)
+    assert kept_ids.tolist() == [IDS[1], IDS[0]]
+    assert kept_scores.tolist() == pytest.approx([0.8, 0.9])
+    assert blended[0] >= blended[1]
+
+
+def test_relevance_only_params_keep_retrieval_order(attributes):
+    scores = np.asarray([0.9, 0.9, 0.5, 0.1, 0.0], dtype=np.float32)
+    assert not RerankParams().active
+    assert rerank(scores, IDS, attributes, RerankParams(), k=5)[1].tolist() == IDS.tolist()
+
+
+def test_search_endpoint_reranks_with_request_weights(search_client, session_factory, search_agents):
+    state = search_client.app.state
+    store = state.search_artifacts.current.store
+    state.search_artifacts.current.attributes = AgentAttributes.from_db(session_factory, store.vector_ids())
+    body = {"query": "invoice accounting tax", "top_k": 2}
+    assert search_client.post("/api/search", json=body).json()["results"][0]["id"] == search_agents[0]["id"]
+
+    # Same retrieval, but the rating weight lifts the best-rated candidate (agent 4: avg_score 4.0) to the top
+    results = search_client.post("/api/search", json={**body, "rerank": {"rating": 100, "overfetch": 3}}).json()["results"]
+    assert results[0]["id"] == search_agents[4]["id"] and results[0]["rank_score"] is not None
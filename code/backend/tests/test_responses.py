@@ -0,0 +1,68 @@
+# backend/tests/test_responses.py
+"""FastJSONResponse: same bytes as Starlette's JSONResponse with orjson or the stdlib, same bodies as response_model."""
+
+from datetime import date, datetime, time, timezone
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import bench_list_serialization as bench
+from backend import responses
+from backend.database.database import Base
+from backend.routes.route import AGENT_OUT_FIELDS, AgentOut, PaginatedAgents, PaginatedRatings, _agent_dict
+
+CONTENT = {"items": [{"id": "agent-1", "name": "Ägent “1”", "price_usd": 0.5, "tags": ["a", None], "ok": True}],
+           "page": 1, "total_items": None}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        if responses.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(responses, "orjson", None)
+    return request.param
+
+
+def test_bytes_match_starlette_json_response(encoder):
+    assert responses.FastJSONResponse(CONTENT).body == JSONResponse(CONTENT).body
+
+
+def test_dates_and_times_are_iso_8601(encoder):
+    content = {"at": datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc), "day": date(2025, 1, 2), "time": time(3, 4)}
+    assert responses.dumps(content) == b'{"at":"2025-01-02T03:04:05+00:00","day":"2025-01-02","time":"03:04:00"}'
+    with pytest.raises(TypeError):
+        responses.dumps({"unsupported": object()})
+
+
+@pytest.fixture
+def bench_client(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    bench.seed(session_factory, 60)
+    with TestClient(bench.build_app(session_factory)) as client:
+        yield client
+    engine.dispose()
+
+
+@pytest.mark.parametrize("resource, model", [("agents", PaginatedAgents), ("ratings", PaginatedRatings)])
+def test_fast_bodies_equal_the_response_model_path(bench_client, encoder, resource, model):
+    legacy, fast = bench_client.get(f"/legacy/{resource}"), bench_client.get(f"/fast/{resource}")
+
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == legacy.json()
+    assert model.model_validate(fast.json()).model_dump(mode="json") == fast.json()
+
+
+def test_agent_dicts_of_null_fields_are_schema_valid():
+    row = {field: None for field in AGENT_OUT_FIELDS}
+    row.update(id="agent-1", img_url="dataset/image/agent_1.png")
+    item = _agent_dict(tuple(row[field] for field in AGENT_OUT_FIELDS))
+
+    assert item["name"] == item["did"] == "" and item["img_url"] == "/images/agent_1.png"
+    assert AgentOut.model_validate(item).model_dump() == item
@@ -0,0 +1,74 @@
+# backend/tests/test_search_batch.py
+"""POST /api/search/batch: per-query answers, NDJSON streaming and executor slot handling."""
+
+import asyncio
+import json
+from dataclasses import replace
+
+from starlette.requests import Request
+
+from backend.routes import route
+from conftest import SEARCH_TOPICS
+
+
+def test_batch_answers_each_query_in_order(search_client, search_agents):
+    queries = [{"query": SEARCH_TOPICS[i], "top_k": 2} for i in (3, 0, 5)]
+    response = search_client.post("/api/search/batch", json={"queries": queries})
+
+    assert response.status_code == 200
+    top_ids = [result["results"][0]["id"] for result in response.json()["results"]]
+    assert top_ids == [search_agents[i]["id"] for i in (3, 0, 5)]
+
+
+def test_stream_sends_one_ndjson_line_per_query_and_releases_the_slot(search_client, search_agents):
+    queries = [{"query": topic, "top_k": 1} for topic in SEARCH_TOPICS]
+    response = search_client.post("/api/search/batch?stream=true", json={"queries": queries})
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == list(range(len(SEARCH_TOPICS)))
+    assert [line["results"][0]["id"] for line in lines] == [agent["id"] for agent in search_agents]
+    assert search_client.app.state.search_executor.stats()["in_flight"] == 0
+
+
+def test_saturated_executor_without_fallback_rejects_with_retry_after(search_client):
+    state = search_client.app.state
+    state.search_options = replace(state.search_options, lexical_fallback=False)
+    executor = state.search_executor
+    slots = [executor.admit() for _ in range(executor.max_queue_depth)]
+    for slot in slots:
+        slot.__enter__()
+    try:
+        for stream in ("false", "true"):
+            response = search_client.post(f"/api/search/batch?stream={stream}", json={"queries": [{"query": "code"}]})
+            assert response.status_code == 503
+            assert response.headers["retry-after"] == str(executor.retry_after_s)
+    finally:
+        for slot in slots:
+            slot.__exit__(None, None, None)
+
+
+def test_saturated_executor_with_fallback_answers_lexically(search_client):
+    executor = search_client.app.state.search_executor
+    slots = [executor.admit() for _ in range(executor.max_queue_depth)]
+    for slot in slots:
+        slot.__enter__()
+    try:
+        response = search_client.post("/api/search/batch", json={"queries": [{"query": "python code review"}]})
+    finally:
+        for slot in slots:
+            slot.__exit__(None, None, None)
+    assert response.status_code == 200
+    assert response.json()["results"][0]["mode"] == "lexical"
+
+
+def test_stream_that_is_never_iterated_holds_no_slot(search_client):
+    # A client that disconnects before the first chunk: the StreamingResponse exists, its body never runs
+    app = search_client.app
+    request = Request({"type": "http", "method": "POST", "path": "/api/search/batch", "headers": [], "app": app,
+                       "query_string": b""})
+    batch = route.BatchQueryRequest(queries=[{"query": "code"}])
+    response = asyncio.run(route.search_agents_batch_endpoint(batch, request, stream=True, hydrate=False))
+
+    assert response.media_type == "application/x-ndjson"
+    assert app.state.search_executor.stats()["in_flight"] == 0
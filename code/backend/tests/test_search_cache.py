@@ -0,0 +1,85 @@
+# backend/tests/test_search_cache.py
+"""TTLCache (LRU + TTL) and the index-version-bound SearchCache."""
+
+import numpy as np
+import pytest
+
+from backend.search import cache as cache_module
+from backend.search.cache import SearchCache, TTLCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl_s=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(maxsize=10, ttl_s=5)
+    cache.put("a", 1)
+    clock.now += 4.9
+    assert cache.get("a") == 1
+    clock.now += 0.2
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert len(cache) == 0
+
+
+def test_zero_size_or_ttl_disables_the_cache():
+    for cache in (TTLCache(maxsize=0, ttl_s=60), TTLCache(maxsize=10, ttl_s=0)):
+        cache.put("a", 1)
+        assert cache.get("a") is None
+        assert cache.stats()["misses"] == 0
+
+
+def test_queries_are_normalized_for_the_embedding_level():
+    cache = SearchCache()
+    vector = np.ones(3, dtype=np.float32)
+    cache.put_embedding("  Finance   Advisor ", vector)
+    assert normalize_query("FINANCE advisor") == "finance advisor"
+    assert cache.get_embedding("finance advisor") is vector
+
+
+def test_binding_a_new_index_version_drops_everything():
+    cache = SearchCache()
+    cache.bind_index("v1")
+    vector = np.ones(3, dtype=np.float32)
+    key = cache.result_key(vector, top_k=5)
+    cache.put_embedding("q", vector)
+    cache.put_results(key, ["r"])
+    assert cache.get_results(key) == ["r"]
+
+    cache.bind_index("v2")
+    assert cache.get_embedding("q") is None
+    assert cache.get_results(key) is None
+    assert cache.invalidations == 1
+
+
+def test_results_computed_against_a_swapped_out_index_are_not_stored():
+    cache = SearchCache()
+    cache.bind_index("v1")
+    stale_key = cache.result_key(np.ones(3, dtype=np.float32), top_k=5)
+    cache.bind_index("v2")
+    cache.put_results(stale_key, ["stale"])
+    assert len(cache.results) == 0
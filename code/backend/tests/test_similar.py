@@ -0,0 +1,40 @@
+# backend/tests/test_similar.py
+"""GET /api/agents/{id}/similar: nearest agents by stored vector, without encoding anything."""
+
+import numpy as np
+
+from ml.search_model.vector_store import AgentVectorStore, vector_id_for
+
+
+def test_store_similar_excludes_the_agent_itself():
+    agents = [{"id": f"agent-{i}", "name": f"A{i}", "description": ""} for i in range(4)]
+    vectors = np.asarray([[1, 0], [0.9, 0.1], [0, 1], [0.5, 0.5]], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    store = AgentVectorStore.from_agents(agents, vectors, index_type="flat")
+
+    scores, ids = store.similar(vector_id_for("agent-0"), 2)
+    assert ids.tolist() == [vector_id_for("agent-1"), vector_id_for("agent-3")] and scores[0] >= scores[1]
+    assert store.similar(vector_id_for("agent-unknown"), 2) is None
+    store.delete("agent-1")
+    assert vector_id_for("agent-1") not in store.similar(vector_id_for("agent-0"), 3)[1]
+
+
+def test_endpoint_returns_nearest_agents_without_encoding(search_client, search_agents):
+    encoder_calls = list(search_client.app.state.query_encoder.model.calls)
+    agent_id = search_agents[1]["id"]
+
+    response = search_client.get(f"/api/agents/{agent_id}/similar", params={"k": 3})
+    body = response.json()
+    assert response.status_code == 200 and body["agent_id"] == agent_id
+    assert len(body["results"]) == 3 and agent_id not in [hit["id"] for hit in body["results"]]
+    scores = [hit["score"] for hit in body["results"]]
+    assert scores == sorted(scores, reverse=True)
+    assert search_client.app.state.query_encoder.model.calls == encoder_calls
+
+
+def test_endpoint_404s_for_agents_not_in_the_index(search_client):
+    assert search_client.get("/api/agents/agent-unknown/similar").status_code == 404
+
+
+def test_endpoint_is_unavailable_without_search(api_client):
+    assert api_client.get("/api/agents/agent-00000/similar").status_code == 503
@@ -0,0 +1,101 @@
+# backend/tests/test_vector_store.py
+"""AgentVectorStore: id-keyed upserts, tombstoned deletes, compaction and persistence."""
+
+import numpy as np
+import pytest
+
+from ml.search_model.vector_store import AgentVectorStore, vector_id_for
+
+DIM = 8
+
+
+def unit(i: int) -> np.ndarray:
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[i % DIM] = 1.0
+    return vector
+
+
+def make_store(n: int = 4, index_type: str = "flat") -> AgentVectorStore:
+    agents = [{"id": f"agent-{i}", "name": f"Agent {i}", "description": f"topic {i}"} for i in range(n)]
+    return AgentVectorStore.from_agents(agents, np.stack([unit(i) for i in range(n)]), index_type=index_type)
+
+
+def top_id(store: AgentVectorStore, vector: np.ndarray) -> int:
+    _, ids = store.search(vector.reshape(1, -1), 1)
+    return int(ids[0, 0])
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_upsert_replaces_vector_in_place_and_inserts_new_agents(index_type):
+    store = make_store(index_type=index_type)
+
+    assert store.upsert({"id": "agent-0", "name": "Agent 0", "description": "moved"}, unit(6)) is False
+    assert store.upsert({"id": "agent-9", "name": "Agent 9", "description": "new"}, unit(7)) is True
+
+    assert len(store) == 5 and store.index.ntotal == 5
+    assert top_id(store, unit(6)) == vector_id_for("agent-0")
+    assert top_id(store, unit(7)) == vector_id_for("agent-9")
+    assert store.lookup(vector_id_for("agent-0"))["description"] == "moved"
+
+
+def test_upsert_rejects_wrongly_shaped_vectors():
+    with pytest.raises(ValueError):
+        make_store().upsert_many([{"id": "agent-9"}], np.zeros((1, DIM + 1), dtype=np.float32))
+
+
+def test_delete_hides_agent_until_it_is_upserted_again():
+    store = make_store()
+    vid = vector_id_for("agent-1")
+
+    assert store.delete("agent-1") is True
+    assert store.delete("agent-1") is False
+    assert store.lookup(vid) is None
+    _, ids = store.search(unit(1).reshape(1, -1), 4)
+    assert vid not in ids[0] and (ids[0] != -1).sum() == 3
+
+    store.upsert({"id": "agent-1", "name": "Agent 1", "description": "back"}, unit(1))
+    assert top_id(store, unit(1)) == vid and not store.tombstones
+
+
+def test_compact_drops_tombstoned_rows_and_keeps_search_consistent():
+    store = make_store(n=5)
+    store.delete("agent-0")
+    store.delete("agent-3")
+    assert store.needs_compaction(ratio=0.4)
+
+    assert store.compact() == 2
+    assert store.compact() == 0
+    assert len(store.agents) == store.vectors.shape[0] == store.index.ntotal == 3
+    assert [a["id"] for a in store.agents] == ["agent-1", "agent-2", "agent-4"]
+    assert top_id(store, unit(4)) == vector_id_for("agent-4")
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_save_and_load_round_trip_keeps_tombstones(tmp_path, mmap):
+    store = make_store()
+    store.delete("agent-2")
+    store.save(tmp_path)
+
+    loaded = AgentVectorStore.load(tmp_path, mmap=mmap)
+    assert loaded.read_only is mmap
+    assert len(loaded) == 3
+    assert loaded.lookup(vector_id_for("agent-2")) is None
+    assert top_id(loaded, unit(3)) == vector_id_for("agent-3")
+    if mmap:
+        with pytest.raises(RuntimeError):
+            loaded.upsert({"id": "agent-5"}, unit(5))
+
+
+@pytest.mark.parametrize("existing", [False, True])
+def test_repeated_ids_in_one_upsert_keep_the_last_write(existing):
+    store = make_store()
+    agent_id = "agent-0" if existing else "agent-9"
+    agents = [{"id": agent_id, "name": "first", "description": ""}, {"id": agent_id, "name": "last", "description": ""}]
+
+    counts = store.upsert_many(agents, np.stack([unit(5), unit(6)]))
+    assert counts == ((0, 1) if existing else (1, 0))
+    assert len(store.agents) == store.vectors.shape[0] == store.index.ntotal == (4 if existing else 5)
+    assert store.lookup(vector_id_for(agent_id))["name"] == "last"
+    assert top_id(store, unit(6)) == vector_id_for(agent_id)
+    _, ids = store.search(unit(6).reshape(1, -1), 5)
+    assert list(ids[0]).count(vector_id_for(agent_id)) == 1
@@ -0,0 +1,65 @@
+# backend/tests/test_vector_store_mmap.py
+"""Memory-mapped (serving) loads: shared read-only mappings, same answers as a normal load."""
+
+import logging
+
+import numpy as np
+import pytest
+
+from ml.search_model import vector_store
+from ml.search_model.metadata_store import AgentMetadata
+from ml.search_model.vector_store import AgentVectorStore
+
+DIM = 8
+
+
+@pytest.fixture
+def saved_store(tmp_path):
+    agents = [{"id": f"agent-{i}", "name": f"Agent {i}", "description": f"topic {i}"} for i in range(6)]
+    store = AgentVectorStore.from_agents(agents, np.eye(6, DIM, dtype=np.float32), index_type="flat")
+    store.save(tmp_path)
+    return store, tmp_path
+
+
+def test_mmap_load_maps_embeddings_and_metadata(saved_store):
+    _, directory = saved_store
+    store = AgentVectorStore.load(directory, mmap=True)
+
+    assert store.read_only
+    assert isinstance(store.vectors, np.memmap) and not store.vectors.flags.writeable
+    assert isinstance(store.metadata, AgentMetadata)
+
+
+def test_mmap_and_heap_loads_answer_identically(saved_store):
+    built, directory = saved_store
+    mapped = AgentVectorStore.load(directory, mmap=True)
+    queries = np.eye(6, DIM, dtype=np.float32)
+
+    scores, ids = mapped.search(queries, 3)
+    expected_scores, expected_ids = built.search(queries, 3)
+    np.testing.assert_array_equal(ids, expected_ids)
+    np.testing.assert_allclose(scores, expected_scores)
+    assert [hit["id"] for hit in mapped.hydrate(ids[:, 0], fields=["id"])] == [a["id"] for a in built.agents]
+
+
+def test_mmap_store_refuses_mutation(saved_store):
+    _, directory = saved_store
+    store = AgentVectorStore.load(directory, mmap=True)
+    with pytest.raises(RuntimeError):
+        store.delete("agent-0")
+    with pytest.raises(RuntimeError):
+        store.upsert({"id": "agent-9"}, np.eye(1, DIM, dtype=np.float32))
+    assert not store.tombstones
+
+
+def test_mmap_without_ifc_flag_warns_that_the_index_is_private(saved_store, monkeypatch, caplog):
+    import faiss
+
+    _, directory = saved_store
+    monkeypatch.setattr(vector_store, "FAISS_MMAP_IFC", False)
+    monkeypatch.setattr(vector_store, "FAISS_MMAP_FLAGS", faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    with caplog.at_level(logging.WARNING):
+        store = AgentVectorStore.load(directory, mmap=True)
+
+    assert store.index.ntotal == 6
+    assert "IO_FLAG_MMAP_IFC" in caplog.text
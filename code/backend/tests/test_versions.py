@@ -0,0 +1,73 @@
+# backend/tests/test_versions.py
+"""Artifact manifests: file checksums, sampled/full verification and rejection at load."""
+
+import pytest
+
+from backend.search.artifacts import SearchArtifactManager
+from ml.search_model import versions
+from ml.search_model.versions import (file_checksums, new_version_dir, prune_versions, publish_version, read_manifest,
+                                      resolve_current, verify_files, write_manifest)
+from conftest import ARTIFACT_DIM, ARTIFACT_MODEL_NAME, write_version
+
+
+@pytest.fixture
+def version_dir(tmp_path):
+    version = write_version(tmp_path, 3)
+    directory = resolve_current(tmp_path)[1]
+    manifest = read_manifest(directory)
+    manifest["files"] = file_checksums(directory)
+    write_manifest(directory, manifest)
+    return version, directory
+
+
+def test_intact_files_verify_in_both_modes(version_dir):
+    _, directory = version_dir
+    manifest = read_manifest(directory)
+    assert "manifest.json" not in manifest["files"]
+    assert verify_files(directory, manifest) == [] and verify_files(directory, manifest, full=True) == []
+
+
+def test_truncated_missing_and_altered_files_are_reported(version_dir):
+    _, directory = version_dir
+    manifest = read_manifest(directory)
+    (directory / "tombstones.json").unlink()
+    with open(directory / "embeddings.npy", "r+b") as f:
+        f.truncate(10)
+    data = bytearray((directory / "agents.json").read_bytes())
+    data[-2] ^= 1  # Same size, different content
+    (directory / "agents.json").write_bytes(bytes(data))
+
+    problems = sorted(verify_files(directory, manifest))
+    assert problems == ["agents.json: sampled sha256 mismatch", "embeddings.npy: size 10 != manifest "
+                        f"{manifest['files']['embeddings.npy']['size']}", "tombstones.json: missing"]
+
+
+def test_sampled_digest_reads_a_bounded_number_of_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(versions, "SAMPLE_BLOCK_SIZE", 4)
+    monkeypatch.setattr(versions, "SAMPLE_BLOCKS", 2)
+    path = tmp_path / "big.bin"
+    path.write_bytes(b"head" + b"x" * 100 + b"tail")
+    digest = versions.sampled_digest(path)
+
+    path.write_bytes(b"head" + b"y" * 100 + b"tail")  # Middle change, outside the sampled blocks
+    assert versions.sampled_digest(path) == digest
+    path.write_bytes(b"head" + b"y" * 100 + b"TAIL")
+    assert versions.sampled_digest(path) != digest
+
+
+def test_manager_rejects_a_corrupted_version(version_dir, tmp_path):
+    version, directory = version_dir
+    (directory / "index.faiss").write_bytes(b"garbage")
+    manager = SearchArtifactManager(tmp_path, ARTIFACT_MODEL_NAME, ARTIFACT_DIM, mmap=False)
+
+    status = manager.reload()
+    assert status["status"] == "rejected" and "index.faiss" in status["error"]
+    assert manager.current is None
+
+
+def test_prune_keeps_the_newest_and_the_current_version(tmp_path):
+    names = [new_version_dir(tmp_path)[0] for _ in range(4)]
+    publish_version(tmp_path, names[0])
+
+    assert prune_versions(tmp_path, keep=2) == names[1:2]
+    assert sorted(p.name for p in (tmp_path / "versions").iterdir()) == [names[0], *names[2:]]
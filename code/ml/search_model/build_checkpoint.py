@@ -0,0 +1,112 @@
+"""
+Resumable on-disk state for streaming full builds.
+
+A full build pages agents out of the database, encodes them in fixed-size batches
+and appends every finished page to a shard on disk before moving on:
+
+    search_model/build/
+        checkpoint.json     model, index type, shard list and the last agent id paged
+        shard-000000.npy    float32 (n, dim) normalized embeddings of one page
+        shard-000000.json   agent metadata dicts aligned with the shard's rows
+
+The checkpoint is rewritten (atomically) only after both files of a shard are
+complete, so a crash loses at most the page being encoded. A rerun with the same
+model picks up after `last_id`; a different model discards the stale shards.
+The directory is removed once the build has been published.
+"""
+
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .vector_store import EMBEDDINGS_FILE_NAME, _atomic_write, _json_writer, _npy_writer
+
+BUILD_DIR_NAME = "build"
+CHECKPOINT_FILE_NAME = "checkpoint.json"
+
+
+class BuildCheckpoint:
+    """Shards + progress of one (possibly interrupted) streaming full build."""
+
+    def __init__(self, directory: Path, state: dict):
+        self.directory = directory
+        self.state = state
+
+    @classmethod
+    def open(cls, directory: Union[str, Path], model_name: str, resume: bool = True) -> "BuildCheckpoint":
+        """Resume the build in `directory` if it was made with `model_name`, else start a fresh one."""
+        directory = Path(directory)
+        path = directory / CHECKPOINT_FILE_NAME
+        if resume and path.is_file():
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("model_name") == model_name:
+                logging.info(f"Resuming build from checkpoint: {state['encoded']} agents in {len(state['shards'])} shards "
+                             f"(after agent id '{state['last_id']}').")
+                return cls(directory, state)
+            logging.warning(f"Discarding build checkpoint made with model '{state.get('model_name')}'.")
+        if directory.exists():
+            shutil.rmtree(directory)
+        directory.mkdir(parents=True)
+        return cls(directory, {"model_name": model_name, "index_type": None, "dim": None,
+                               "shards": [], "encoded": 0, "last_id": None})
+
+    @property
+    def last_id(self) -> Optional[str]:
+        """Agent id the last completed page ended at (DB paging resumes after it)."""
+        return self.state["last_id"]
+
+    @property
+    def encoded(self) -> int:
+        return self.state["encoded"]
+
+    @property
+    def index_type(self) -> Optional[str]:
+        return self.state["index_type"]
+
+    @index_type.setter
+    def index_type(self, value: str) -> None:
+        self.state["index_type"] = value
+
+    def add_shard(self, agents: Sequence[dict], vectors: np.ndarray, last_id: str) -> None:
+        """Persist one encoded page, then advance the checkpoint past it."""
+        name = f"shard-{len(self.state['shards']):06d}"
+        if len(agents):
+            _atomic_write(self.directory / f"{name}.npy", _npy_writer(np.ascontiguousarray(vectors, dtype=np.float32)))
+            _atomic_write(self.directory / f"{name}.json", _json_writer(list(agents)))
+            self.state["shards"].append({"name": name, "count": len(agents)})
+            self.state["dim"] = int(vectors.shape[1])
+        self.state["encoded"] += len(agents)
+        self.state["last_id"] = last_id  # Advanced even for pages whose agents were all skipped
+        _atomic_write(self.directory / CHECKPOINT_FILE_NAME, _json_writer(self.state))
+
+    def shards(self) -> Iterator[Tuple[List[dict], np.ndarray]]:
+        """(agents, vectors) of every completed shard, in build order (vectors memory-mapped)."""
+        for shard in self.state["shards"]:
+            with open(self.directory / f"{shard['name']}.json", "r", encoding="utf-8") as f:
+                agents = json.load(f)
+            yield agents, np.load(self.directory / f"{shard['name']}.npy", mmap_mode="r")
+
+    def assemble(self) -> Tuple[List[dict], np.ndarray]:
+        """
+        All agents plus one disk-backed (memory-mapped) embedding matrix, concatenated
+        shard by shard, so the full matrix never has to fit in memory at once.
+        """
+        agents: List[dict] = []
+        vectors = np.lib.format.open_memmap(self.directory / EMBEDDINGS_FILE_NAME, mode="w+", dtype=np.float32,
+                                            shape=(self.encoded, self.state["dim"] or 0))
+        row = 0
+        for shard_agents, shard_vectors in self.shards():
+            vectors[row:row + len(shard_agents)] = shard_vectors
+            agents.extend(shard_agents)
+            row += len(shard_agents)
+        vectors.flush()
+        return agents, vectors
+
+    def discard(self) -> None:
+        """Remove the build directory (after the version has been published)."""
+        shutil.rmtree(self.directory, ignore_errors=True)
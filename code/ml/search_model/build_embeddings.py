@@ -1,6 +1,16 @@
-print("--- Executing build_embeddings.py with 'code.backend' imports ---")
+"""
+Build job: encode the agents in masumi.db and publish a versioned search artifact set.
 
-import json
+Full builds stream agents out of the database page by page with a resumable checkpoint;
+`--incremental` updates the current version in place (re-encoding only new or changed
+agents). Run as a module from the project root, since it imports `code.backend.*` and
+its sibling modules relatively (`python build_embeddings.py` no longer works):
+
+    python -m code.ml.search_model.build_embeddings [--incremental] [--index-type auto]
+"""
+
+import argparse
+import time
 import numpy as np
 import faiss
 import os
@@ -14,133 +24,445 @@ from sentence_transformers import SentenceTransformer
 
 try:
     from code.backend.database.database import SessionLocal
-    from code.backend.database.models import Agent
+    from code.backend.database.models import Agent, RegistryEntry
+    from sqlalchemy import func, select
     from sqlalchemy.orm import Session
     from sqlalchemy.exc import SQLAlchemyError
 except ImportError as e:
-    import traceback 
+    logging.error(f"Backend database modules could not be imported (run from the project root): {e}")
     sys.exit(1)
-    # --- END REPLACEMENT ---
+
+from .build_checkpoint import BUILD_DIR_NAME, BuildCheckpoint
+from .embedding_cache import EMBEDDING_CACHE_FILE_NAME, EmbeddingCache
+from .index_factory import INDEX_TYPES, build_index, choose_index_type
+from .neighbors import DEFAULT_NEIGHBORS_K
+from .parallel_encode import ParallelEncoder
+from .vector_store import AgentVectorStore, DEFAULT_COMPACTION_RATIO, agent_text, text_hash, vector_id_for
+from .versions import file_checksums, new_version_dir, prune_versions, publish_version, resolve_current, write_manifest
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)-8s %(message)s")
 
+MODEL_NAME = "all-MiniLM-L6-v2"
+OUTPUT_DIR = "search_model" # Keep saving to search_model in project root
+KEEP_VERSIONS = 3 # Artifact versions kept on disk (older ones are pruned after publishing)
+PAGE_SIZE = 2048 # Agents fetched from the DB per page (one checkpointed shard per page)
+BATCH_SIZE = 256 # Texts per model.encode call
+
+# Only the columns the build needs (no ORM objects / identity map growing with the registry)
+AGENT_COLUMNS = (Agent.id, Agent.name, Agent.description, Agent.did, Agent.category, Agent.url)
+
+
+def registry_lexical_fields(db: Session, agent_ids: list[str] | None = None) -> dict[str, dict]:
+    """
+    Tags, capability and author per agent id from the stored registry JSON blobs, for the
+    BM25 index (all entries, or only `agent_ids`). Missing registry data only weakens
+    lexical search, so it is not fatal.
+    """
+    fields = {}
+    try:
+        query = db.query(RegistryEntry)
+        if agent_ids is not None:
+            query = query.filter(RegistryEntry.id.in_(agent_ids))
+        for entry in query.all():
+            blob = entry.full_json if isinstance(entry.full_json, dict) else {}
+            capability = blob.get("Capability") or {}
+            fields[entry.id] = {
+                "tags": [t for t in (blob.get("tags") or []) if isinstance(t, str)],
+                "capability": capability.get("name") if isinstance(capability, dict) else None,
+                "author": " ".join(filter(None, (blob.get("authorName"), blob.get("authorOrganization")))) or None,
+            }
+    except SQLAlchemyError as e:
+        db.rollback()
+        logging.warning(f"Registry blobs unavailable ({e.__class__.__name__}); lexical index will use name/description only.")
+    return fields
+
 
 # --- Fetch Agent Data from Database ---
-def get_agents_from_db() -> list[dict]:
-    """Fetches all agents from the database and returns them as a list of dicts."""
-    logging.info("Connecting to database and fetching agents...")
-    db: Session = SessionLocal()
+def agents_from_rows(rows, registry_fields: dict[str, dict]) -> list[dict]:
+    """Agent column rows -> dicts suitable for saving and embedding (agents lacking text/DID are skipped)."""
     agents_data = []
-    try:
-        # Query all agents from the database
-        db_agents = db.query(Agent).all()
-        logging.info(f"Fetched {len(db_agents)} agents from the database.")
-
-        # Convert SQLAlchemy objects to dictionaries suitable for saving and embedding
-        for agent_obj in db_agents:
-            # Ensure essential fields exist for embedding and later lookup
-            if agent_obj.name and agent_obj.description and agent_obj.did:
-                agents_data.append({
-                    # Include fields needed for generating text ('name', 'description')
-                    "name": agent_obj.name,
-                    "description": agent_obj.description,
-                    # Include fields needed by the search API response ('did', 'id', etc.)
-                    "did": agent_obj.did,
-                    "id": agent_obj.id, # Assuming 'id' is the primary key used elsewhere
-                    # Add other relevant fields if needed later by the search result display
-                    "category": agent_obj.category,
-                    "url": agent_obj.url,
-                })
-            else:
-                 logging.warning(f"Skipping agent with id {agent_obj.id} due to missing name, description, or did.")
+    for agent_obj in rows:
+        # Ensure essential fields exist for embedding and later lookup
+        if agent_obj.name and agent_obj.description and agent_obj.did:
+            agents_data.append({
+                # Include fields needed for generating text ('name', 'description')
+                "name": agent_obj.name,
+                "description": agent_obj.description,
+                # Include fields needed by the search API response ('did', 'id', etc.)
+                "did": agent_obj.did,
+                "id": agent_obj.id, # Assuming 'id' is the primary key used elsewhere
+                # Add other relevant fields if needed later by the search result display
+                "category": agent_obj.category,
+                "url": agent_obj.url,
+                # Lexical-only fields (BM25): tags, capability name, author
+                **registry_fields.get(agent_obj.id, {}),
+            })
+        else:
+             logging.warning(f"Skipping agent with id {agent_obj.id} due to missing name, description, or did.")
+    return agents_data
+
+
+def count_agents() -> int:
+    """Total rows in the agents table (sizes the index type choice and progress reports)."""
+    with SessionLocal() as db:
+        return db.execute(select(func.count()).select_from(Agent)).scalar_one()
 
+
+def iter_agent_pages(page_size: int = PAGE_SIZE, after_id: str | None = None):
+    """
+    Yields (last agent id of the page, agent dicts) pages in agent id order, using
+    keyset pagination (`WHERE id > :last ORDER BY id LIMIT :n`), so every page costs
+    the same however deep into the table it is and paging can resume after any id.
+    """
+    db: Session = SessionLocal()
+    try:
+        while True:
+            query = select(*AGENT_COLUMNS).order_by(Agent.id).limit(page_size)
+            if after_id is not None:
+                query = query.where(Agent.id > after_id)
+            rows = db.execute(query).all()
+            if not rows:
+                return
+            after_id = rows[-1].id
+            registry_fields = registry_lexical_fields(db, [row.id for row in rows])
+            yield after_id, agents_from_rows(rows, registry_fields)
     except SQLAlchemyError as e:
-        logging.error(f"Database error while fetching agents: {e}", exc_info=True)
-        raise # Re-raise the exception to stop the script
-    except Exception as e:
-        logging.error(f"An unexpected error occurred fetching agents: {e}", exc_info=True)
+        logging.error(f"Database error while paging agents: {e}", exc_info=True)
         raise
     finally:
         db.close() # Ensure the session is closed
-        logging.info("Database session closed.")
 
+
+def get_agents_from_db() -> list[dict]:
+    """Fetches all agents from the database and returns them as a list of dicts."""
+    logging.info("Connecting to database and fetching agents...")
+    try:
+        agents_data = [agent for _, page in iter_agent_pages() for agent in page]
+    except Exception as e:
+        logging.error(f"An unexpected error occurred fetching agents: {e}", exc_info=True)
+        raise
+    logging.info(f"Fetched {len(agents_data)} agents from the database.")
     return agents_data
 
-# --- Main Script Logic ---
-try:
-    agents = get_agents_from_db()
-except Exception:
-    # Error already logged in get_agents_from_db, exit script
-    sys.exit(1)
 
+def load_model() -> SentenceTransformer:
+    logging.info("Loading Sentence Transformer model...")
+    try:
+        return SentenceTransformer(MODEL_NAME)
+    except Exception as e:
+        logging.error(f"Error loading Sentence Transformer model: {e}", exc_info=True)
+        sys.exit(1)
 
-if not agents:
-    logging.error("No agent data fetched from the database. Cannot build embeddings.")
-    sys.exit(1)
 
-# --- Prepare text data for embedding ---
-logging.info("Preparing text data for embedding...")
-texts = []
-# Now 'agents' is already the list of dictionaries we need
-for a in agents:
-    # Text combination logic remains the same
-    name = a.get("name", "")
-    desc = a.get("description", "")
-    combined = f"{name} {desc}".strip()
-    texts.append(combined)
-
-if not texts:
-    logging.error("No text data generated from fetched agents.")
-    sys.exit(1)
+def encode_texts(model: SentenceTransformer, texts: list[str], batch_size: int = BATCH_SIZE,
+                 show_progress_bar: bool = True) -> np.ndarray:
+    """Encode and L2-normalize texts (cosine similarity via inner product)."""
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=show_progress_bar)
+    return normalized(embeddings)
 
-logging.info(f"Prepared text data for {len(texts)} agents.")
 
-# --- Load Model and Generate Embeddings ---
-logging.info("Loading Sentence Transformer model...")
-try:
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-except Exception as e:
-    logging.error(f"Error loading Sentence Transformer model: {e}", exc_info=True)
-    sys.exit(1)
+def normalized(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    faiss.normalize_L2(embeddings)
+    return embeddings
 
-logging.info("Generating embeddings...")
-embeddings = model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
 
-# --- Normalize and Build Faiss Index ---
-logging.info("Normalizing embeddings...")
-faiss.normalize_L2(embeddings)
-dim = embeddings.shape[1]
-logging.info(f"Embeddings generated with dimension: {dim}")
+class AgentEncoder:
+    """
+    Encodes agents through the persistent embedding cache: only texts whose hash is not
+    cached for MODEL_NAME reach model.encode, so rebuild time follows the number of
+    changed agents. The model is loaded on the first cache miss (never, if nothing changed).
 
-logging.info("Building Faiss index (IndexFlatIP)...")
-index = faiss.IndexFlatIP(dim)
-index.add(embeddings)
-logging.info(f"Added {index.ntotal} vectors to the Faiss index.")
+    With `workers` > 1, misses are encoded by a ParallelEncoder process pool. The first
+    batch is still encoded in-process to measure the single-process baseline, so the
+    build log can report the pool's actual speedup.
+    """
 
-# --- Save the model files ---
-output_dir = "search_model" # Keep saving to search_model in project root
-logging.info(f"Saving model files to '{output_dir}/'...")
-os.makedirs(output_dir, exist_ok=True)
+    def __init__(self, cache: EmbeddingCache | None = None, batch_size: int = BATCH_SIZE, workers: int = 1):
+        self.cache = cache
+        self.batch_size = batch_size
+        self.workers = max(1, int(workers))
+        self._model: SentenceTransformer | None = None
+        self._pool: ParallelEncoder | None = None
+        self._baseline: tuple[int, float] | None = None # (texts, seconds) encoded single-process for calibration
 
-embeddings_path = os.path.join(output_dir, "embeddings.npy")
-index_path = os.path.join(output_dir, "index.faiss")
-agents_output_path = os.path.join(output_dir, "agents.json")
+    @property
+    def model(self) -> SentenceTransformer:
+        if self._model is None:
+            self._model = load_model()
+        return self._model
 
-try:
-    np.save(embeddings_path, embeddings)
-    logging.info(f"Saved embeddings to '{embeddings_path}'")
+    def encode_agents(self, agents: list[dict], show_progress_bar: bool = False) -> np.ndarray:
+        """Normalized embeddings for `agents`, in order (cache hits + freshly encoded misses)."""
+        hashes = [a.get("text_hash") or text_hash(agent_text(a)) for a in agents]
+        vectors = self.cache.get_many(hashes) if self.cache is not None else {}
+        texts = {h: agent_text(a) for h, a in zip(hashes, agents) if h not in vectors} # Duplicate texts encode once
+        if texts:
+            encoded = self._encode(list(texts.values()), show_progress_bar)
+            fresh = dict(zip(texts, encoded))
+            if self.cache is not None:
+                self.cache.put_many(fresh)
+            vectors.update(fresh)
+        if not agents:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.ascontiguousarray(np.stack([vectors[h] for h in hashes]), dtype=np.float32)
 
-    faiss.write_index(index, index_path)
-    logging.info(f"Saved Faiss index to '{index_path}'")
+    def _encode(self, texts: list[str], show_progress_bar: bool) -> np.ndarray:
+        if self.workers == 1:
+            return encode_texts(self.model, texts, self.batch_size, show_progress_bar)
+        parts = []
+        if self._baseline is None:
+            head, texts = texts[:self.batch_size], texts[self.batch_size:]
+            model = self.model # Loaded before the clock starts: the baseline measures encoding only
+            started = time.perf_counter()
+            parts.append(encode_texts(model, head, self.batch_size, show_progress_bar=False))
+            self._baseline = (len(head), time.perf_counter() - started)
+        if texts:
+            if self._pool is None:
+                self._pool = ParallelEncoder(MODEL_NAME, self.workers, self.batch_size)
+            parts.append(normalized(self._pool.encode(texts)))
+        return np.vstack(parts)
 
-    # Save the list of agent dictionaries fetched from DB
-    with open(agents_output_path, "w", encoding="utf-8") as f:
-        json.dump(agents, f, ensure_ascii=False, indent=2)
-    logging.info(f"Saved agent metadata (from DB) to '{agents_output_path}'")
+    def close(self) -> None:
+        """Stop the encoder pool and log its throughput against the single-process baseline."""
+        if self._pool is None:
+            return
+        self._pool.close()
+        baseline_texts, baseline_s = self._baseline
+        single_rate = baseline_texts / baseline_s if baseline_s > 0 else 0.0
+        speedup = f"{self._pool.rate / single_rate:.2f}x" if single_rate > 0 else "n/a"
+        logging.info(f"Parallel encoding: {self._pool.texts} texts on {self.workers} workers at {self._pool.rate:.1f} texts/sec "
+                     f"vs {single_rate:.1f} texts/sec single-process (calibrated on {baseline_texts} texts): speedup {speedup} "
+                     f"(encoding only; pool start-up took {self._pool.startup_seconds:.1f}s).")
+
+
+def append_to_index(index: faiss.Index | None, index_type: str, vectors: np.ndarray, agents: list[dict]) -> faiss.Index:
+    """Add agents' vectors to an appendable (flat/HNSW) index, creating it on first use."""
+    if index is None:
+        dim = vectors.shape[1]
+        index = build_index(index_type, dim, np.zeros((0, dim), dtype=np.float32), np.zeros(0, dtype=np.int64))
+    index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), np.asarray([a["vector_id"] for a in agents], dtype=np.int64))
+    return index
+
+
+def publish_store(store: AgentVectorStore, output_dir: str, build_mode: str, keep_versions: int = KEEP_VERSIONS,
+                  started: float | None = None, neighbors_k: int = DEFAULT_NEIGHBORS_K) -> str:
+    """
+    Save the store as a new immutable version under output_dir/versions/, precompute its
+    top-`neighbors_k` related-agents table (0 = none), write its manifest (counts, source DB rows, build time and per-file checksums), then atomically
+    point output_dir/CURRENT at it. Running backends pick the new version up via hot
+    swap (admin reload endpoint or CURRENT file watch) after checking it against the manifest.
+    """
+    version, version_dir = new_version_dir(output_dir)
+    store.save(version_dir)
+    if neighbors_k > 0:
+        store.build_neighbors(neighbors_k).save(version_dir)
+    write_manifest(version_dir, {
+        "version": version,
+        "model_name": MODEL_NAME,
+        "dim": store.dim,
+        "index_type": store.index_type,
+        "vector_count": int(store.index.ntotal),
+        "agent_count": len(store.agents),
+        "live_agents": store.live_count,
+        "tombstones": len(store.tombstones),
+        "neighbors_k": neighbors_k if neighbors_k > 0 else None,
+        "source_rows": count_agents(), # Rows in the agents table the build was made from
+        "build_mode": build_mode,
+        "build_seconds": round(time.perf_counter() - started, 3) if started is not None else None,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": file_checksums(version_dir),
+    })
+    publish_version(output_dir, version)
+    logging.info(f"Published search artifacts version '{version}' to '{version_dir}/'")
+    removed = prune_versions(output_dir, keep_versions)
+    if removed:
+        logging.info(f"Pruned {len(removed)} old artifact versions: {', '.join(removed)}")
+    return version
+
+
+# --- Full Rebuild ---
+def build_full(output_dir: str, keep_versions: int = KEEP_VERSIONS, index_type: str = "auto",
+               page_size: int = PAGE_SIZE, batch_size: int = BATCH_SIZE, resume: bool = True,
+               encoder: AgentEncoder | None = None, neighbors_k: int = DEFAULT_NEIGHBORS_K) -> AgentVectorStore:
+    """
+    Re-encode every agent and publish a fresh vector store version ("auto" picks the index type by corpus size).
+
+    Streaming: agents are paged out of the DB `page_size` at a time, encoded in batches of
+    `batch_size`, appended to the index (flat/HNSW; IVF types are trained once all vectors
+    are known) and written to a checkpointed on-disk shard per page. After a crash, the
+    next run resumes after the last completed shard instead of starting over.
+    With an embedding cache on the `encoder`, only agents with new text are encoded.
+    """
+    build_started = time.perf_counter()
+    encoder = encoder or AgentEncoder(batch_size=batch_size)
+    # Every worker process needs at least one batch per page to stay busy
+    min_page_size = encoder.workers * encoder.batch_size
+    if page_size < min_page_size:
+        logging.warning(f"Page size {page_size} is below workers x batch size; using {min_page_size} instead.")
+        page_size = min_page_size
+    total = count_agents()
+    checkpoint = BuildCheckpoint.open(os.path.join(output_dir, BUILD_DIR_NAME), MODEL_NAME, resume=resume)
+    if index_type != "auto":
+        checkpoint.index_type = index_type # Shards hold vectors only, so a resumed build may switch types
+    elif checkpoint.index_type is None:
+        checkpoint.index_type = choose_index_type(total)
+    index_type = checkpoint.index_type
+    appendable = not index_type.startswith("ivf") # IVF needs training data up front
+
+    # --- Re-add vectors of already completed shards to the index ---
+    index = None
+    if appendable:
+        for shard_agents, shard_vectors in checkpoint.shards():
+            index = append_to_index(index, index_type, shard_vectors, shard_agents)
+
+    # --- Page, encode, index and checkpoint ---
+    logging.info(f"Encoding {total} agents in pages of {page_size} (batches of {encoder.batch_size}, index type: {index_type})...")
+    started, done = time.perf_counter(), 0
+    for last_id, agents in iter_agent_pages(page_size, after_id=checkpoint.last_id):
+        agents = [dict(a, text_hash=text_hash(agent_text(a)), vector_id=vector_id_for(a["id"])) for a in agents]
+        # The encoder cuts the page into fixed-size batches (length-sorted across worker processes with --workers)
+        embeddings = encoder.encode_agents(agents)
+        if appendable and agents:
+            index = append_to_index(index, index_type, embeddings, agents)
+        checkpoint.add_shard(agents, embeddings, last_id)
+        done += len(agents)
+        elapsed = time.perf_counter() - started
+        logging.info(f"Encoded {checkpoint.encoded}/{total} agents "
+                     f"({done / elapsed if elapsed > 0 else 0.0:.1f} agents/sec this run).")
+
+    if not checkpoint.encoded:
+        raise ValueError("No agent data fetched from the database. Cannot build embeddings.")
+    elapsed = time.perf_counter() - started
+    logging.info(f"Encoded {done} agents in {elapsed:.1f}s ({done / elapsed if elapsed > 0 else 0.0:.1f} agents/sec); "
+                 f"{checkpoint.encoded - done} resumed from checkpoint.")
+
+    # --- Assemble the ID-mapped Faiss index + store from the shards and publish ---
+    agents, vectors = checkpoint.assemble() # Embedding matrix stays disk-backed (memory-mapped)
+    if index is None:
+        logging.info(f"Building Faiss index (type: {index_type}, keyed by agent id)...")
+        index = build_index(index_type, vectors.shape[1], vectors, np.asarray([a["vector_id"] for a in agents], dtype=np.int64))
+    store = AgentVectorStore(vectors.shape[1], vectors=vectors, agents=agents, index=index)
+    logging.info(f"Added {store.index.ntotal} vectors to the '{store.index_type}' Faiss index.")
+    publish_store(store, output_dir, "full", keep_versions, started=build_started, neighbors_k=neighbors_k)
+    checkpoint.discard()
+    return store
+
+
+# --- Incremental Sync ---
+def sync_incremental(agents: list[dict], output_dir: str, compact: bool = False,
+                     compaction_ratio: float = DEFAULT_COMPACTION_RATIO,
+                     keep_versions: int = KEEP_VERSIONS, index_type: str | None = None,
+                     encoder: AgentEncoder | None = None, neighbors_k: int = DEFAULT_NEIGHBORS_K) -> AgentVectorStore:
+    """
+    Bring the current vector store version in line with the database: encode only
+    agents whose embedded text changed (or that are new), tombstone agents that
+    disappeared, compact when the tombstone ratio crosses `compaction_ratio`, and
+    publish the result as a new version (the served version is never modified).
+    The index is rebuilt from the stored vectors (no re-encoding) when `index_type`
+    asks for a different type than the current one.
+    """
+    build_started = time.perf_counter()
+    encoder = encoder or AgentEncoder()
+    _, current_dir = resolve_current(output_dir)
+    store = AgentVectorStore.load(current_dir)
+
+    changed = []
+    for a in agents:
+        current = store.lookup(vector_id_for(a["id"]))
+        if current is None or current.get("text_hash") != text_hash(agent_text(a)):
+            changed.append(a)
+        else:
+            # Text unchanged: refresh metadata without re-encoding
+            current.update(a)
+
+    live_ids = {a["id"] for a in agents}
+    deleted = [a["id"] for a in store.agents if a["id"] not in live_ids and store.delete(a["id"])]
+
+    if changed:
+        logging.info(f"Encoding {len(changed)} new/changed agents (of {len(agents)})...")
+        embeddings = encoder.encode_agents(changed, show_progress_bar=True) # Reverted texts are cache hits
+        inserted, updated = store.upsert_many(changed, embeddings)
+        logging.info(f"Upserted agents: {inserted} inserted, {updated} updated.")
+    if deleted:
+        logging.info(f"Tombstoned {len(deleted)} agents no longer in the database.")
+
+    if compact or store.needs_compaction(compaction_ratio):
+        store.compact()
+
+    if index_type is not None:
+        wanted = choose_index_type(store.live_count) if index_type == "auto" else index_type
+        if wanted != store.index_type:
+            logging.info(f"Switching index type '{store.index_type}' -> '{wanted}'.")
+            store.rebuild_index(wanted)
+
+    publish_store(store, output_dir, "incremental", keep_versions, started=build_started, neighbors_k=neighbors_k)
+    logging.info(f"Vector store now holds {store.live_count} live agents, {len(store.tombstones)} tombstoned.")
+    return store
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the semantic search artifacts from masumi.db.")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Artifact directory (default: search_model)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Update the existing store in place: re-encode only new/changed agents, tombstone deleted ones")
+    parser.add_argument("--compact", action="store_true", help="Force compaction of tombstoned rows (incremental mode)")
+    parser.add_argument("--compaction-ratio", type=float, default=DEFAULT_COMPACTION_RATIO,
+                        help="Compact automatically once this fraction of rows is tombstoned (default: 0.2)")
+    parser.add_argument("--index-type", choices=("auto",) + INDEX_TYPES, default=None,
+                        help="Faiss index type (default: auto, picked by corpus size; incremental builds keep the current type)")
+    parser.add_argument("--keep-versions", type=int, default=KEEP_VERSIONS,
+                        help="Artifact versions to keep on disk after publishing (default: 3)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE,
+                        help="Agents fetched from the database per page / checkpointed shard (default: 2048; "
+                             "raised to workers x batch size if smaller)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Texts per encode call (default: 256)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Encoder processes (default: 1). With N > 1, length-sorted batches are spread over a process pool")
+    parser.add_argument("--restart", action="store_true",
+                        help="Full builds: discard an interrupted build's checkpoint instead of resuming it")
+    parser.add_argument("--embedding-cache", default=None,
+                        help="Embedding cache file (default: <output-dir>/embedding_cache.sqlite)")
+    parser.add_argument("--no-embedding-cache", action="store_true", help="Encode every agent, bypassing the embedding cache")
+    parser.add_argument("--neighbors", type=int, default=DEFAULT_NEIGHBORS_K,
+                        help="Related agents precomputed per agent (default: 20, 0 = no neighbour table)")
+    args = parser.parse_args(argv)
+    logging.info(f"Building search artifacts in '{args.output_dir}' ({'incremental' if args.incremental else 'full'} build).")
+
+    cache = None
+    if not args.no_embedding_cache:
+        cache = EmbeddingCache(args.embedding_cache or os.path.join(args.output_dir, EMBEDDING_CACHE_FILE_NAME), MODEL_NAME)
+    encoder = AgentEncoder(cache, batch_size=args.batch_size, workers=args.workers)
+
+    try:
+        _, current_dir = resolve_current(args.output_dir)
+        if args.incremental and os.path.isfile(os.path.join(current_dir, "index.faiss")):
+            try:
+                agents = get_agents_from_db()
+            except Exception:
+                # Error already logged in get_agents_from_db, exit script
+                sys.exit(1)
+            if not agents:
+                logging.error("No agent data fetched from the database. Cannot build embeddings.")
+                sys.exit(1)
+            sync_incremental(agents, args.output_dir, compact=args.compact,
+                             compaction_ratio=args.compaction_ratio, keep_versions=args.keep_versions,
+                             index_type=args.index_type, encoder=encoder, neighbors_k=args.neighbors)
+        else:
+            build_full(args.output_dir, keep_versions=args.keep_versions, index_type=args.index_type or "auto",
+                       page_size=args.page_size, batch_size=args.batch_size, resume=not args.restart, encoder=encoder,
+                       neighbors_k=args.neighbors)
+    except Exception as e:
+        logging.error(f"Error building search artifacts: {e}", exc_info=True)
+        sys.exit(1)
+    finally:
+        encoder.close()
+        if cache is not None:
+            cache.close()
+
+    logging.info("\nBuild process using database data completed successfully.")
 
-except Exception as e:
-    logging.error(f"Error saving model files: {e}", exc_info=True)
-    sys.exit(1)
 
-logging.info("\nBuild process using database data completed successfully.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Near-duplicate agent clusters from stored embeddings.
+
+Templated and cloned registry entries ("FinanceAdvisor-1", "FinanceAdvisor-2", ...)
+embed almost identically. Pairs above a cosine threshold are found with a blocked
+all-pairs scan of the normalized embedding matrix (upper triangle only, so every
+pair is scored once and memory stays at O(block * block)), then joined into
+clusters with union-find: A~B and B~C put A, B and C in one cluster.
+
+Only agents in clusters of two or more get a label; everything else is -1.
+"""
+
+import logging
+import time
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_DUPLICATE_THRESHOLD = 0.95  # Cosine similarity at which two agents count as near-duplicates
+PAIR_BLOCK = 4096                   # Rows per block of the all-pairs scan (4096 x 4096 float32 = 64 MiB)
+
+
+def duplicate_pairs(vectors: np.ndarray, threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+                    exclude_rows: Optional[Sequence[int]] = None,
+                    block: int = PAIR_BLOCK) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(rows a, rows b, similarities) of every pair a < b with inner product >= threshold."""
+    n = vectors.shape[0]
+    excluded = np.zeros(n, dtype=bool)
+    if exclude_rows is not None and len(exclude_rows):
+        excluded[np.asarray(exclude_rows, dtype=np.int64)] = True
+    found_a, found_b, found_sims = [], [], []
+    for r0 in range(0, n, block):
+        r1 = min(r0 + block, n)
+        rows = np.ascontiguousarray(vectors[r0:r1], dtype=np.float32)
+        for c0 in range(r0, n, block):  # Blocks left of the diagonal were covered by earlier row blocks
+            c1 = min(c0 + block, n)
+            sims = rows @ np.asarray(vectors[c0:c1], dtype=np.float32).T
+            sims[excluded[r0:r1], :] = -np.inf
+            sims[:, excluded[c0:c1]] = -np.inf
+            if c0 == r0:
+                sims[np.tril_indices(r1 - r0, m=c1 - c0)] = -np.inf  # Self pairs and the mirrored half
+            a, b = np.nonzero(sims >= threshold)
+            found_a.append(a + r0)
+            found_b.append(b + c0)
+            found_sims.append(sims[a, b])
+    if not found_a:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return np.concatenate(found_a), np.concatenate(found_b), np.concatenate(found_sims).astype(np.float32)
+
+
+def cluster_labels(n: int, rows_a: np.ndarray, rows_b: np.ndarray) -> np.ndarray:
+    """Connected components of the pair graph: per row, the smallest row of its cluster (-1 = no duplicates)."""
+    parent = np.arange(n, dtype=np.int64)
+
+    def find(x: int) -> int:
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:  # Path compression
+            parent[x], x = root, parent[x]
+        return root
+
+    for a, b in zip(rows_a.tolist(), rows_b.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)  # Smallest row is always the root
+    labels = np.asarray([find(x) for x in range(n)], dtype=np.int64)
+    sizes = np.bincount(labels, minlength=n)
+    return np.where(sizes[labels] > 1, labels, -1)
+
+
+def find_duplicate_clusters(vectors: np.ndarray, threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+                            exclude_rows: Optional[Sequence[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (labels, best similarity) per row: labels as in `cluster_labels`, similarity is the
+    row's highest score against another member of its cluster (NaN for unclustered rows).
+    """
+    started = time.perf_counter()
+    n = vectors.shape[0]
+    rows_a, rows_b, sims = duplicate_pairs(vectors, threshold, exclude_rows)
+    labels = cluster_labels(n, rows_a, rows_b)
+    best = np.full(n, -np.inf, dtype=np.float32)
+    np.maximum.at(best, rows_a, sims)
+    np.maximum.at(best, rows_b, sims)
+    best[labels < 0] = np.nan
+    clustered = labels >= 0
+    logging.info(f"Scanned {n} agents for near-duplicates (threshold {threshold}) in {time.perf_counter() - started:.2f}s: "
+                 f"{len(sims)} pairs, {len(np.unique(labels[clustered]))} clusters covering {int(clustered.sum())} agents.")
+    return labels, best
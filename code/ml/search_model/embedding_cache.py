@@ -0,0 +1,73 @@
+"""
+Persistent content-addressed embedding cache for builds.
+
+Vectors are stored in a small SQLite file keyed by (model name, sha256 of the
+embedded text), so a rebuild only runs `model.encode` for agents whose
+name/description actually changed; everything else is read back from the cache.
+
+    search_model/embedding_cache.sqlite
+        embeddings(model TEXT, text_hash TEXT, dim INTEGER, vector BLOB)   PK (model, text_hash)
+
+Vectors are stored exactly as the build produced them (float32, L2-normalized),
+so a cache hit is bit-identical to re-encoding with the same model.
+"""
+
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Union
+
+import numpy as np
+
+EMBEDDING_CACHE_FILE_NAME = "embedding_cache.sqlite"
+SQLITE_IN_CHUNK = 500  # Stay well below SQLite's bound-parameter limit per IN (...) query
+
+
+class EmbeddingCache:
+    """(model, text hash) -> embedding vector, persisted in SQLite."""
+
+    def __init__(self, path: Union[str, Path], model_name: str):
+        self.path = Path(path)
+        self.model_name = model_name
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, text_hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for the given text hashes (missing hashes are simply absent)."""
+        wanted = list(dict.fromkeys(text_hashes))
+        found: Dict[str, np.ndarray] = {}
+        for start in range(0, len(wanted), SQLITE_IN_CHUNK):
+            chunk = wanted[start:start + SQLITE_IN_CHUNK]
+            rows = self._conn.execute(
+                f"SELECT text_hash, dim, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                [self.model_name, *chunk],
+            )
+            for text_hash, dim, blob in rows:
+                found[text_hash] = np.frombuffer(blob, dtype=np.float32, count=dim)
+        self.hits += len(found)
+        self.misses += len(wanted) - len(found)
+        return found
+
+    def put_many(self, vectors: Mapping[str, np.ndarray]) -> None:
+        """Store vectors by text hash (committed immediately, so an interrupted build keeps them)."""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector) VALUES (?, ?, ?, ?)",
+            [(self.model_name, h, int(v.shape[0]), np.ascontiguousarray(v, dtype=np.float32).tobytes())
+             for h, v in vectors.items()],
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model_name,)).fetchone()[0]
+
+    def close(self) -> None:
+        logging.info(f"Embedding cache: {self.hits} hits, {self.misses} misses ({len(self)} vectors for '{self.model_name}').")
+        self._conn.close()
@@ -0,0 +1,124 @@
+"""
+Batch job: detect near-duplicate agents and persist their clusters.
+
+Reads the stored embeddings of the artifact version currently being served (no model
+call), clusters agents whose cosine similarity is above --threshold (see duplicates.py)
+and replaces the contents of the `agent_duplicates` table in one transaction. Each
+cluster's representative is its best-rated member (avg_score, then num_ratings, then
+agent id), which is the one de-duplicated listings and searches keep.
+
+    python -m code.ml.search_model.find_duplicates [--threshold 0.95] [--dry-run]
+"""
+
+import argparse
+import logging
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    from code.backend.database.catalog import bump_catalog_version
+    from code.backend.database.database import SessionLocal, engine
+    from code.backend.database.models import Agent, AgentDuplicate, CatalogState
+    from sqlalchemy import delete, select
+    from sqlalchemy.exc import SQLAlchemyError
+except ImportError as e:
+    logging.error(f"Backend database modules could not be imported (run from the project root): {e}")
+    sys.exit(1)
+
+from .duplicates import DEFAULT_DUPLICATE_THRESHOLD, find_duplicate_clusters
+from .vector_store import AgentVectorStore
+from .versions import resolve_current
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)-8s %(message)s")
+
+OUTPUT_DIR = "search_model"
+
+
+def duplicate_rows(store: AgentVectorStore, threshold: float) -> list[dict]:
+    """`agent_duplicates` rows for the live agents of a store (empty if nothing is duplicated)."""
+    vector_ids = store.vector_ids()
+    dead = store.rows_of(np.fromiter(store.tombstones, dtype=np.int64)) if store.tombstones else None
+    labels, similarity = find_duplicate_clusters(store.vectors, threshold, exclude_rows=dead)
+    clustered = np.flatnonzero(labels >= 0)
+    if not len(clustered):
+        return []
+    hits = store.hydrate(vector_ids[clustered], ("id",))
+    members: dict[int, list[tuple[str, float]]] = {}
+    for row, hit in zip(clustered.tolist(), hits):
+        if hit is not None:
+            members.setdefault(int(labels[row]), []).append((hit["id"], float(similarity[row])))
+
+    with SessionLocal() as db:
+        agent_ids = [agent_id for cluster in members.values() for agent_id, _ in cluster]
+        stats = {row.id: row for row in db.execute(
+            select(Agent.id, Agent.avg_score, Agent.num_ratings).where(Agent.id.in_(agent_ids))
+        )}
+
+    detected_at = datetime.now(tz=timezone.utc).isoformat()
+    rows = []
+    for cluster in members.values():
+        cluster = [(agent_id, sim) for agent_id, sim in cluster if agent_id in stats] # Indexed but since deleted from the DB
+        if len(cluster) < 2:
+            continue
+        representative = min(
+            (agent_id for agent_id, _ in cluster),
+            key=lambda a: (-(stats[a].avg_score or 0.0), -(stats[a].num_ratings or 0), a),
+        )
+        rows.extend({"agent_id": agent_id, "cluster_id": representative, "similarity": round(sim, 6),
+                     "detected_at": detected_at} for agent_id, sim in cluster)
+    return rows
+
+
+def replace_duplicates(rows: list[dict]) -> None:
+    """Swap the table contents for `rows` atomically (readers see the old or the new clusters, never a mix)."""
+    AgentDuplicate.__table__.create(bind=engine, checkfirst=True)
+    CatalogState.__table__.create(bind=engine, checkfirst=True)
+    with SessionLocal() as db:
+        try:
+            db.execute(delete(AgentDuplicate))
+            if rows:
+                db.execute(AgentDuplicate.__table__.insert(), rows)
+            bump_catalog_version(db) # De-duplicated catalog listings change with the clusters
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find near-duplicate agents from the stored embeddings.")
+    parser.add_argument("--model-dir", default=OUTPUT_DIR, help="Artifact directory (default: search_model)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_DUPLICATE_THRESHOLD,
+                        help="Cosine similarity at which two agents are near-duplicates (default: 0.95)")
+    parser.add_argument("--dry-run", action="store_true", help="Report the clusters without writing them to the database")
+    args = parser.parse_args(argv)
+
+    version, directory = resolve_current(args.model_dir)
+    try:
+        store = AgentVectorStore.load(directory, mmap=True)
+    except Exception as e:
+        logging.error(f"Could not load search artifacts from '{directory}': {e}", exc_info=True)
+        sys.exit(1)
+    logging.info(f"Loaded {store.live_count} agents from artifact version '{version or 'unversioned'}'.")
+
+    try:
+        rows = duplicate_rows(store, args.threshold)
+        clusters = {}
+        for row in rows:
+            clusters.setdefault(row["cluster_id"], []).append(row["agent_id"])
+        for representative, agent_ids in sorted(clusters.items(), key=lambda c: -len(c[1]))[:10]:
+            logging.info(f"Cluster '{representative}': {len(agent_ids)} agents")
+        if args.dry_run:
+            logging.info(f"Dry run: {len(clusters)} clusters / {len(rows)} agents not written.")
+            return
+        replace_duplicates(rows)
+    except SQLAlchemyError as e:
+        logging.error(f"Database error while storing duplicate clusters: {e}", exc_info=True)
+        sys.exit(1)
+    logging.info(f"Stored {len(clusters)} near-duplicate clusters covering {len(rows)} agents.")
+
+
+if __name__ == "__main__":
+    main()
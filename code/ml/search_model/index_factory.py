@@ -0,0 +1,158 @@
+"""
+Faiss index construction for the agent vector store.
+
+Supported types (all inner-product / cosine over L2-normalized vectors, all keyed
+by stable vector ids so results and removals use agent-derived ids):
+
+    flat      exact brute-force scan; the recall baseline
+    hnsw      graph index; fast, high recall, no training (deletes need a rebuild)
+    ivf_flat  inverted lists over full vectors; needs training, tuned by nprobe
+    ivf_pq    inverted lists over PQ-compressed vectors; smallest memory, lowest recall
+
+`choose_index_type` picks one from the corpus size; callers can always override.
+Query-time knobs (`nprobe` for IVF, `efSearch` for HNSW) are passed per search via
+`search_parameters`, so they can be set per deployment or per request.
+"""
+
+import logging
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# Corpus-size thresholds for automatic selection
+FLAT_MAX_VECTORS = 20_000       # Exact search is cheap enough below this
+HNSW_MAX_VECTORS = 500_000      # Graph memory overhead stays reasonable below this
+IVF_FLAT_MAX_VECTORS = 2_000_000
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+DEFAULT_HNSW_EF_SEARCH = 64
+DEFAULT_IVF_NPROBE = 16
+FAISS_MIN_POINTS_PER_CENTROID = 39  # Faiss warns (and clusters poorly) below this
+
+
+def choose_index_type(n_vectors: int) -> str:
+    """Index type for a corpus of `n_vectors` when no override is given."""
+    if n_vectors <= FLAT_MAX_VECTORS:
+        return "flat"
+    if n_vectors <= HNSW_MAX_VECTORS:
+        return "hnsw"
+    if n_vectors <= IVF_FLAT_MAX_VECTORS:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def _ivf_nlist(n_vectors: int) -> int:
+    """~4*sqrt(n) lists, capped so each centroid still gets enough training points."""
+    return max(1, min(int(4 * math.sqrt(max(n_vectors, 1))), n_vectors // FAISS_MIN_POINTS_PER_CENTROID))
+
+
+def _pq_m(dim: int) -> int:
+    """Number of PQ sub-quantizers: the largest divisor of dim giving >= 4 dims per sub-vector, capped at 64."""
+    for m in range(min(64, dim // 4), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _pq_nbits(n_vectors: int) -> int:
+    """8 bits per code when there is enough data to train 256 centroids, fewer otherwise."""
+    return max(4, min(8, int(math.log2(max(n_vectors // FAISS_MIN_POINTS_PER_CENTROID, 16)))))
+
+
+def build_index(index_type: str, dim: int, vectors: np.ndarray, ids: np.ndarray) -> faiss.Index:
+    """Create, train (if needed) and populate an ID-mapped index of the given type."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Expected one of {INDEX_TYPES}.")
+    n = len(ids)
+    if index_type.startswith("ivf") and n < FAISS_MIN_POINTS_PER_CENTROID:
+        logging.warning(f"Only {n} vectors; too few to train '{index_type}'. Falling back to 'flat'.")
+        index_type = "flat"
+
+    if index_type == "flat":
+        base = faiss.IndexFlatIP(dim)
+    elif index_type == "hnsw":
+        base = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        base.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        base.hnsw.efSearch = DEFAULT_HNSW_EF_SEARCH
+    else:
+        nlist = _ivf_nlist(n)
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_flat":
+            base = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            base = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_m(dim), _pq_nbits(n), faiss.METRIC_INNER_PRODUCT)
+        base.nprobe = min(DEFAULT_IVF_NPROBE, nlist)
+        logging.info(f"Training '{index_type}' index (nlist={nlist}) on {n} vectors...")
+        base.train(vectors)
+
+    if isinstance(base, faiss.IndexIVF):
+        # IVF stores ids in its inverted lists natively. Wrapping it in an IndexIDMap2
+        # would break remove_ids: IVF does not renumber its internal ids on removal.
+        index = base
+    else:
+        # The Python wrappers keep `base` alive via referenced_objects
+        index = faiss.IndexIDMap2(base)
+    if n:
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    """The index wrapped by an IndexIDMap/IndexIDMap2 (or the index itself)."""
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """Inverse of build_index: the type name of a loaded index."""
+    base = base_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(base, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(base, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def is_id_keyed(index: faiss.Index) -> bool:
+    """True for indexes built here (results carry vector ids); False for legacy positional indexes."""
+    return isinstance(index, (faiss.IndexIDMap2, faiss.IndexIVF))
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    """HNSW graphs cannot delete vectors in place; everything else here can."""
+    return not isinstance(base_index(index), faiss.IndexHNSW)
+
+
+def search_parameters(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                      sel: Optional[faiss.IDSelector] = None) -> Optional[faiss.SearchParameters]:
+    """
+    Per-search knobs for the index type (None when nothing applies). Knobs that do
+    not match the index type are ignored, so clients can always send both. `sel`
+    restricts the search to the selected vector ids (filtered search); the caller
+    must keep it alive for the duration of the search.
+    """
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVF) and (nprobe or sel is not None):
+        params = faiss.SearchParametersIVF()
+        if nprobe:
+            params.nprobe = min(int(nprobe), base.nlist)
+        else:
+            params.nprobe = base.nprobe
+    elif isinstance(base, faiss.IndexHNSW) and (ef_search or sel is not None):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = int(ef_search) if ef_search else base.hnsw.efSearch
+    elif sel is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+    if sel is not None:
+        params.sel = sel
+    return params
@@ -0,0 +1,169 @@
+"""
+In-process BM25 inverted index over agent metadata (the lexical half of hybrid search).
+
+MiniLM embeddings blur exact terms such as tags ("Real-time", "stock"), capability
+names ("market-analysis") and author names; BM25 matches them directly. The index is
+built from name, description, tags, capability and author at save time and persisted
+next to the Faiss index, with postings stored as CSR arrays:
+
+    vocab    sorted terms            indptr   term -> [start, end) into postings
+    rows     posting document rows   impacts  precomputed BM25 term weight per posting
+    ids      vector id per document row (so results are keyed like the Faiss index)
+
+Impacts are computed at build time, so a query is a handful of slice lookups plus
+one scatter-add; no per-query tf/length normalization is needed.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+LEXICAL_FILE_NAME = "lexical.npz"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Field -> term weight. Short, curated fields count more per occurrence than free-text descriptions.
+LEXICAL_FIELD_WEIGHTS = {
+    "name": 2.0,
+    "tags": 2.0,
+    "capability": 2.0,
+    "author": 1.0,
+    "description": 1.0,
+}
+
+# Words joined by hyphens/underscores/dots form one compound token ("market-analysis")
+_TOKEN_RE = re.compile(r"[0-9a-z]+(?:[-_.][0-9a-z]+)*")
+_PART_RE = re.compile(r"[-_.]")
+# Unicode dashes (e.g. the non-breaking hyphen in "Real‑time") are folded to "-"
+_DASHES = dict.fromkeys(map(ord, "\u2010\u2011\u2012\u2013\u2014\u2015\u2212"), "-")
+
+
+def tokenize(text: str) -> List[str]:
+    """Case-folded terms; compounds are emitted whole and as their parts ("market-analysis", "market", "analysis")."""
+    text = unicodedata.normalize("NFKC", text).translate(_DASHES).casefold()
+    tokens = []
+    for match in _TOKEN_RE.finditer(text):
+        term = match.group()
+        tokens.append(term)
+        parts = _PART_RE.split(term)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    return tokens
+
+
+def _field_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value if v is not None)
+    return str(value)
+
+
+class BM25Index:
+    """Immutable BM25 index; rows are aligned with the vector store's agent rows."""
+
+    def __init__(self, vocab: Sequence[str], indptr: np.ndarray, rows: np.ndarray,
+                 impacts: np.ndarray, ids: np.ndarray):
+        self.terms = np.asarray(vocab)
+        self.vocab: Dict[str, int] = {term: i for i, term in enumerate(vocab)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.impacts = np.asarray(impacts, dtype=np.float32)
+        self.ids = np.asarray(ids, dtype=np.int64)
+
+    @classmethod
+    def build(cls, agents: Iterable[dict], k1: float = BM25_K1, b: float = BM25_B) -> "BM25Index":
+        """Tokenize each agent's lexical fields and precompute per-posting BM25 impacts."""
+        doc_terms: List[Counter] = []
+        ids = []
+        for agent in agents:
+            counts: Counter = Counter()
+            for field, weight in LEXICAL_FIELD_WEIGHTS.items():
+                for term in tokenize(_field_text(agent.get(field))):
+                    counts[term] += weight
+            doc_terms.append(counts)
+            ids.append(agent["vector_id"])
+
+        n_docs = len(doc_terms)
+        doc_len = np.asarray([sum(c.values()) for c in doc_terms], dtype=np.float64)
+        avg_len = float(doc_len.mean()) if n_docs and doc_len.mean() > 0 else 1.0
+
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for row, counts in enumerate(doc_terms):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((row, tf))
+
+        vocab = sorted(postings)
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        rows, impacts = [], []
+        for i, term in enumerate(vocab):
+            plist = postings[term]
+            idf = np.log(1.0 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            p_rows = np.asarray([r for r, _ in plist], dtype=np.int64)
+            tf = np.asarray([t for _, t in plist], dtype=np.float64)
+            norm = k1 * (1.0 - b + b * doc_len[p_rows] / avg_len)
+            rows.append(p_rows)
+            impacts.append(idf * tf * (k1 + 1.0) / (tf + norm))
+            indptr[i + 1] = indptr[i] + len(plist)
+        return cls(
+            vocab,
+            indptr,
+            np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64),
+            np.concatenate(impacts).astype(np.float32) if impacts else np.zeros(0, dtype=np.float32),
+            np.asarray(ids, dtype=np.int64),
+        )
+
+    def save(self, path: Union[str, Path]) -> None:
+        with open(path, "wb") as f:  # File handle, so np.savez does not append ".npz" to a temp name
+            np.savez(f, vocab=self.terms, indptr=self.indptr, rows=self.rows, impacts=self.impacts, ids=self.ids)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["vocab"].tolist(), data["indptr"], data["rows"], data["impacts"], data["ids"])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int, exclude_ids: Optional[np.ndarray] = None,
+               allowed_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k (scores, vector_ids) for a query, padded with (-inf, -1). `exclude_ids` are
+        skipped; when `allowed_ids` is given, only those ids can match (filtered search).
+        """
+        out_scores = np.full(k, -np.inf, dtype=np.float32)
+        out_ids = np.full(k, -1, dtype=np.int64)
+        spans = [(self.indptr[t], self.indptr[t + 1]) for t in {self.vocab.get(term) for term in tokenize(query)} if t is not None]
+        if not spans:
+            return out_scores, out_ids
+        rows = np.concatenate([self.rows[s:e] for s, e in spans])
+        impacts = np.concatenate([self.impacts[s:e] for s, e in spans])
+        if len(rows) * 8 < len(self.ids):
+            # Selective query: sort only the matched postings
+            docs, inverse = np.unique(rows, return_inverse=True)
+            scores = np.bincount(inverse, weights=impacts).astype(np.float32)
+        else:
+            # Common terms: a dense scatter-add over all rows beats sorting the postings
+            dense = np.bincount(rows, weights=impacts, minlength=len(self.ids))
+            docs = np.flatnonzero(dense)
+            scores = dense[docs].astype(np.float32)
+        ids = self.ids[docs]
+        if exclude_ids is not None and len(exclude_ids):
+            keep = ~np.isin(ids, exclude_ids)
+            ids, scores = ids[keep], scores[keep]
+        if allowed_ids is not None:
+            keep = np.isin(ids, allowed_ids)
+            ids, scores = ids[keep], scores[keep]
+        n = min(k, len(ids))
+        if n == 0:
+            return out_scores, out_ids
+        top = np.argpartition(-scores, n - 1)[:n] if n < len(ids) else np.arange(len(ids))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        out_scores[:n] = scores[top]
+        out_ids[:n] = ids[top]
+        return out_scores, out_ids
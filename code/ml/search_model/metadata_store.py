@@ -0,0 +1,136 @@
+"""
+Columnar, offset-indexed binary store for agent metadata (search hydration).
+
+Serving processes only need a handful of string fields per search hit, so instead of
+parsing agents.json into one Python dict per agent, the build also writes agents.meta:
+
+    magic (8 bytes) | header length (uint64) | JSON header | 8-byte aligned sections
+
+Sections (described by the header as name -> [offset, dtype, length]):
+    vector_ids              int64 (n,)    row-aligned with embeddings.npy
+    sorted_ids, sorted_rows int64 (n,)    vector ids in ascending order + their rows (for searchsorted)
+    <column>.offsets        int64 (n+1,)  byte offsets into <column>.data; row i is data[off[i]:off[i+1]]
+    <column>.data           uint8         concatenated UTF-8 strings
+    <column>.null           uint8 (n,)    1 where the value is None (only for columns that have any)
+
+The file is opened with np.memmap, so loading is O(1) and the pages are shared across
+workers; vector id -> row resolution is a vectorized binary search, and strings are
+only decoded for the rows actually returned.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+METADATA_FILE_NAME = "agents.meta"
+METADATA_MAGIC = b"AGMETA\x00\x01"
+
+# String fields written to the binary store (everything the search API hydrates, plus build bookkeeping)
+METADATA_COLUMNS = ("id", "did", "name", "description", "category", "url", "text_hash")
+
+_ALIGN = 8
+
+
+def write_metadata(path: Union[str, Path], agents: Sequence[dict], columns: Sequence[str] = METADATA_COLUMNS) -> None:
+    """Serialize agents (dicts carrying "vector_id") into the columnar binary format at `path`."""
+    vector_ids = np.asarray([a["vector_id"] for a in agents], dtype=np.int64)
+    order = np.argsort(vector_ids, kind="stable").astype(np.int64)
+    arrays: Dict[str, np.ndarray] = {
+        "vector_ids": vector_ids,
+        "sorted_ids": vector_ids[order],
+        "sorted_rows": order,
+    }
+    for column in columns:
+        values = [a.get(column) for a in agents]
+        encoded = [b"" if v is None else str(v).encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        arrays[f"{column}.offsets"] = offsets
+        arrays[f"{column}.data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        if any(v is None for v in values):
+            arrays[f"{column}.null"] = np.asarray([v is None for v in values], dtype=np.uint8)
+
+    # Lay out sections after the header, each 8-byte aligned so int64 views need no copy
+    sections, cursor = {}, 0
+    for name, array in arrays.items():
+        sections[name] = [cursor, array.dtype.str, int(array.size)]
+        cursor += -(-array.nbytes // _ALIGN) * _ALIGN
+    header = json.dumps({"count": len(agents), "columns": list(columns), "sections": sections}).encode("utf-8")
+    header += b" " * (-(len(METADATA_MAGIC) + 8 + len(header)) % _ALIGN)
+    base = len(METADATA_MAGIC) + 8 + len(header)
+
+    with open(path, "wb") as f:
+        f.write(METADATA_MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(base + sections[name][0])
+            f.write(array.tobytes())
+        f.truncate(base + cursor)
+
+
+class AgentMetadata(Sequence):
+    """Read-only, memory-mapped view over an agents.meta file; behaves like a list of agent dicts."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._buffer = np.memmap(self.path, dtype=np.uint8, mode="r")
+        if bytes(self._buffer[:len(METADATA_MAGIC)]) != METADATA_MAGIC:
+            raise ValueError(f"{self.path} is not an agent metadata file (bad magic).")
+        header_len = int(np.frombuffer(self._buffer, dtype=np.uint64, count=1, offset=len(METADATA_MAGIC))[0])
+        header_start = len(METADATA_MAGIC) + 8
+        header = json.loads(bytes(self._buffer[header_start:header_start + header_len]))
+        self._base = header_start + header_len
+        self._count = int(header["count"])
+        self.columns: List[str] = header["columns"]
+        self._sections: Dict[str, np.ndarray] = {
+            name: np.frombuffer(self._buffer, dtype=np.dtype(dtype), count=length, offset=self._base + offset)
+            for name, (offset, dtype, length) in header["sections"].items()
+        }
+        self.vector_ids: np.ndarray = self._sections["vector_ids"]
+
+    @classmethod
+    def open(cls, directory: Union[str, Path]) -> Optional["AgentMetadata"]:
+        """Open directory/agents.meta, or return None if the artifact set predates it."""
+        path = Path(directory) / METADATA_FILE_NAME
+        return cls(path) if path.is_file() else None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(self._count))]
+        if row < 0:
+            row += self._count
+        if not 0 <= row < self._count:
+            raise IndexError(row)
+        agent = {column: self.value(column, row) for column in self.columns}
+        agent["vector_id"] = int(self.vector_ids[row])
+        return agent
+
+    def rows_of(self, vector_ids: Iterable[int]) -> np.ndarray:
+        """Vectorized vector id -> row resolution; -1 for ids not in the store."""
+        ids = np.asarray(vector_ids, dtype=np.int64).reshape(-1)
+        sorted_ids = self._sections["sorted_ids"]
+        if not self._count:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(sorted_ids, ids), self._count - 1)
+        return np.where(sorted_ids[pos] == ids, self._sections["sorted_rows"][pos], -1)
+
+    def value(self, column: str, row: int) -> Optional[str]:
+        null = self._sections.get(f"{column}.null")
+        if null is not None and null[row]:
+            return None
+        offsets = self._sections[f"{column}.offsets"]
+        return bytes(self._sections[f"{column}.data"][offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def hydrate(self, rows: Iterable[int], columns: Optional[Sequence[str]] = None) -> List[Optional[Dict[str, Any]]]:
+        """Field dicts for the given rows (None for row -1), decoding only the requested columns."""
+        columns = [c for c in (columns or self.columns) if c in self.columns]
+        return [
+            None if row < 0 else {**{c: self.value(c, row) for c in columns}, "vector_id": int(self.vector_ids[row])}
+            for row in (int(r) for r in rows)
+        ]
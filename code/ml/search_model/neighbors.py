@@ -0,0 +1,114 @@
+"""
+Precomputed top-K neighbour table ("related agents") for a vector store version.
+
+Built once per published version from the normalized embedding matrix with blocked
+matrix products: a block of query rows is multiplied against one block of columns at
+a time and merged into a running top-K, so memory stays at
+O(query_block * column_block + query_block * K) however large the catalogue grows.
+
+    neighbors_rows.npy     int32   (n, K)  neighbour store rows, best first, -1 = padding
+    neighbors_scores.npy   float16 (n, K)  cosine similarities
+
+Rows are aligned with the store's rows, so a related-agents lookup is one row read
+(memory-mapped when serving). The agent itself and tombstoned agents are excluded.
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+NEIGHBOR_ROWS_FILE_NAME = "neighbors_rows.npy"
+NEIGHBOR_SCORES_FILE_NAME = "neighbors_scores.npy"
+DEFAULT_NEIGHBORS_K = 20
+
+QUERY_BLOCK = 1024       # Query rows per block
+COLUMN_BLOCK = 16384     # Candidate rows per block (QUERY_BLOCK x COLUMN_BLOCK float32 = 64 MiB)
+
+
+def compute_neighbors(vectors: np.ndarray, k: int, exclude_rows: Optional[Sequence[int]] = None,
+                      query_block: int = QUERY_BLOCK, column_block: int = COLUMN_BLOCK) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k (rows, scores) by inner product for every row of `vectors`, excluding self and `exclude_rows`."""
+    n = vectors.shape[0]
+    out_rows = np.full((n, k), -1, dtype=np.int32)
+    out_scores = np.full((n, k), -np.inf, dtype=np.float16)
+    excluded = np.zeros(n, dtype=bool)
+    if exclude_rows is not None and len(exclude_rows):
+        excluded[np.asarray(exclude_rows, dtype=np.int64)] = True
+
+    for q0 in range(0, n, query_block):
+        q1 = min(q0 + query_block, n)
+        queries = np.ascontiguousarray(vectors[q0:q1], dtype=np.float32)
+        best_scores = np.full((q1 - q0, k), -np.inf, dtype=np.float32)
+        best_rows = np.full((q1 - q0, k), -1, dtype=np.int64)
+        for c0 in range(0, n, column_block):
+            c1 = min(c0 + column_block, n)
+            sims = queries @ np.asarray(vectors[c0:c1], dtype=np.float32).T
+            sims[:, excluded[c0:c1]] = -np.inf
+            # Self-similarity: rows q0..q1 meet their own columns inside this block
+            lo, hi = max(q0, c0), min(q1, c1)
+            if lo < hi:
+                own = np.arange(lo, hi)
+                sims[own - q0, own - c0] = -np.inf
+            # Block-local top-k, then merge with the running top-k
+            kk = min(k, c1 - c0)
+            part = np.argpartition(-sims, kk - 1, axis=1)[:, :kk] if kk < c1 - c0 else np.tile(np.arange(c1 - c0), (q1 - q0, 1))
+            merged_scores = np.concatenate([best_scores, np.take_along_axis(sims, part, axis=1)], axis=1)
+            merged_rows = np.concatenate([best_rows, part + c0], axis=1)
+            top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(merged_scores, top, axis=1)
+            best_rows = np.take_along_axis(merged_rows, top, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        best_rows[~np.isfinite(best_scores)] = -1  # Fewer than k other live agents
+        out_rows[q0:q1] = best_rows
+        out_scores[q0:q1] = best_scores
+    return out_rows, out_scores
+
+
+class NeighborTable:
+    """Row-aligned top-K neighbour rows + scores (plain or memory-mapped arrays)."""
+
+    def __init__(self, rows: np.ndarray, scores: np.ndarray):
+        self.rows = rows
+        self.scores = scores
+
+    @property
+    def k(self) -> int:
+        return int(self.rows.shape[1])
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, k: int = DEFAULT_NEIGHBORS_K,
+              exclude_rows: Optional[Sequence[int]] = None) -> "NeighborTable":
+        started = time.perf_counter()
+        rows, scores = compute_neighbors(vectors, k, exclude_rows)
+        logging.info(f"Computed top-{k} neighbours for {len(rows)} agents in {time.perf_counter() - started:.2f}s.")
+        return cls(rows, scores)
+
+    def save(self, directory: Union[str, Path]) -> None:
+        directory = Path(directory)
+        for name, array in ((NEIGHBOR_ROWS_FILE_NAME, self.rows), (NEIGHBOR_SCORES_FILE_NAME, self.scores)):
+            tmp_path = directory / (name + ".tmp")
+            with open(tmp_path, "wb") as f:  # File handle, so np.save does not append ".npy" to the temp name
+                np.save(f, array)
+            os.replace(tmp_path, directory / name)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap: bool = False) -> Optional["NeighborTable"]:
+        """The version's neighbour table, or None if it was built without one."""
+        directory = Path(directory)
+        rows_path, scores_path = directory / NEIGHBOR_ROWS_FILE_NAME, directory / NEIGHBOR_SCORES_FILE_NAME
+        if not (rows_path.is_file() and scores_path.is_file()):
+            return None
+        mode = "r" if mmap else None
+        return cls(np.load(rows_path, mmap_mode=mode), np.load(scores_path, mmap_mode=mode))
+
+    def lookup(self, row: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (scores, rows) of one store row, padding removed."""
+        rows = np.asarray(self.rows[row, :k], dtype=np.int64)
+        keep = rows >= 0
+        return np.asarray(self.scores[row, :k], dtype=np.float32)[keep], rows[keep]
@@ -0,0 +1,106 @@
+"""
+Multi-process sentence encoding for large builds (`build_embeddings.py --workers N`).
+
+A single `model.encode` call leaves most cores of a large build box idle, so texts are
+spread over a pool of encoder processes, each holding its own model copy and pinned to
+cpu_count / N torch threads (no oversubscription). Before being handed out, texts are
+sorted by length and cut into fixed-size batches: every batch then pads to a similar
+length instead of to the longest text in a random mix. Results are scattered back by
+input position, so callers see exactly the order they passed in.
+
+The pool is started and every worker has loaded its model before the constructor
+returns, so `rate` measures encoding only; start-up is reported as `startup_seconds`.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Sequence
+
+import numpy as np
+
+# Fresh interpreters: workers never inherit the parent's torch thread pools or locks
+MP_START_METHOD = "spawn"
+
+_worker_model = None  # Per-process model, loaded once by the pool initializer
+_worker_ready = None  # Barrier shared by the pool: passed once every worker is up
+
+
+def _init_worker(model_name: str, torch_threads: int) -> None:
+    global _worker_model
+    try:
+        import torch  # Pulled in by sentence-transformers
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _start_worker(model_name: str, torch_threads: int, ready) -> None:
+    global _worker_ready
+    _init_worker(model_name, torch_threads)
+    _worker_ready = ready
+
+
+def _wait_for_all_workers() -> None:
+    # Every worker must run one of these at the same time, so the pool spawns (and initialises) all of them
+    _worker_ready.wait()
+
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    embeddings = _worker_model.encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def length_sorted_batches(texts: Sequence[str], batch_size: int) -> List[np.ndarray]:
+    """Input positions grouped into batches of similar text length (longest first)."""
+    order = np.argsort([-len(t) for t in texts], kind="stable")
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+class ParallelEncoder:
+    """Process pool of sentence encoders; `encode` returns raw embeddings in input order."""
+
+    def __init__(self, model_name: str, workers: int, batch_size: int):
+        self.workers = int(workers)
+        self.batch_size = int(batch_size)
+        torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        logging.info(f"Starting {self.workers} encoder processes ({torch_threads} torch threads each)...")
+        started = time.perf_counter()
+        context = multiprocessing.get_context(MP_START_METHOD)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_start_worker,
+            initargs=(model_name, torch_threads, context.Barrier(self.workers)),
+        )
+        for warm_up in [self._pool.submit(_wait_for_all_workers) for _ in range(self.workers)]:
+            warm_up.result()  # Re-raises a worker start-up failure (BrokenProcessPool)
+        self.startup_seconds = time.perf_counter() - started
+        logging.info(f"Encoder processes ready in {self.startup_seconds:.1f}s (spawn + model load, not counted in throughput).")
+        self.texts = 0
+        self.seconds = 0.0
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        started = time.perf_counter()
+        batches = length_sorted_batches(texts, self.batch_size)
+        out = None
+        # map() keeps batches in submission order; each batch's rows go back to their input positions
+        for positions, embeddings in zip(batches, self._pool.map(_encode_batch, [[texts[i] for i in b] for b in batches])):
+            if out is None:
+                out = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+            out[positions] = embeddings
+        self.texts += len(texts)
+        self.seconds += time.perf_counter() - started
+        return out if out is not None else np.zeros((0, 0), dtype=np.float32)
+
+    @property
+    def rate(self) -> float:
+        """Texts per second over all `encode` calls so far."""
+        return self.texts / self.seconds if self.seconds > 0 else 0.0
+
+    def close(self) -> None:
+        self._pool.shutdown()
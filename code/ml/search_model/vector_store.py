@@ -0,0 +1,443 @@
+"""
+Stable-ID vector store for agent embeddings.
+
+Every agent gets a 63-bit vector id derived from its agent id, so the Faiss index
+(an `IndexIDMap2`, or a natively id-keyed IVF index) can be updated in place: upserting an agent replaces only its
+own vector, deleting an agent only tombstones it, and search results are resolved
+by id rather than by list position. Tombstoned rows are physically dropped by
+`compact()`, which callers run when the tombstone ratio grows too large.
+
+On-disk layout (one directory):
+    index.faiss      flat/HNSW (IndexIDMap2-wrapped) or IVF index (see index_factory), ids = vector ids
+    embeddings.npy   float32 (n, dim), L2-normalized, rows aligned with agents.json
+    agents.json      list of agent metadata dicts, each carrying its "vector_id" (used by builds)
+    agents.meta      the same metadata in columnar binary form (used for serving, see metadata_store)
+    lexical.npz      BM25 inverted index over the same agents (see lexical)
+    tombstones.json  vector ids deleted since the last compaction
+    neighbors_*.npy  optional precomputed top-K related agents per row (see neighbors)
+
+Serving processes load with `mmap=True`: the index, embedding matrix and agents.meta
+are then memory-mapped read-only, so every worker on a host shares one page-cache copy
+instead of holding a private heap copy. Builds load normally so they can mutate.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import faiss
+import numpy as np
+
+from .index_factory import build_index, choose_index_type, index_type_of, is_id_keyed, search_parameters, supports_remove
+from .lexical import LEXICAL_FILE_NAME, BM25Index
+from .metadata_store import METADATA_FILE_NAME, AgentMetadata, write_metadata
+from .neighbors import NeighborTable
+
+INDEX_FILE_NAME = "index.faiss"
+EMBEDDINGS_FILE_NAME = "embeddings.npy"
+AGENTS_FILE_NAME = "agents.json"
+TOMBSTONES_FILE_NAME = "tombstones.json"
+
+# Zero-copy mmap of flat codes (flat, IDMap and HNSW storage) needs IO_FLAG_MMAP_IFC, which older
+# Faiss builds lack; IO_FLAG_MMAP alone only maps IVF inverted lists
+FAISS_MMAP_IFC = hasattr(faiss, "IO_FLAG_MMAP_IFC")
+FAISS_MMAP_FLAGS = (faiss.IO_FLAG_MMAP_IFC if FAISS_MMAP_IFC else faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+# Filtered searches selecting at most this many agents are scored exactly from the
+# stored vectors instead of through the index (cheap, and exact even for IVF/HNSW)
+FILTER_BRUTE_FORCE_MAX = 4096
+
+# Compact once this fraction of stored rows is tombstoned
+DEFAULT_COMPACTION_RATIO = 0.2
+
+
+def vector_id_for(agent_id: str) -> int:
+    """Stable, non-negative int64 Faiss id for an agent id."""
+    digest = hashlib.blake2b(agent_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+def agent_text(agent: dict) -> str:
+    """Text that is embedded for an agent (kept in one place for full and incremental builds)."""
+    return f"{agent.get('name', '')} {agent.get('description', '')}".strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path: Path, write) -> None:
+    """Write via a temp file + os.replace so readers never observe a half-written artifact."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _json_writer(obj):
+    def write(path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+    return write
+
+
+def _npy_writer(array: np.ndarray):
+    def write(path: Path) -> None:
+        with open(path, "wb") as f:  # File handle, so np.save does not append ".npy" to the temp name
+            np.save(f, array)
+    return write
+
+
+class AgentVectorStore:
+    """Agent embeddings + metadata keyed by stable vector ids, with tombstoned deletes."""
+
+    def __init__(self, dim: int, vectors: Optional[np.ndarray] = None, agents: Optional[Sequence[dict]] = None,
+                 tombstones: Optional[Iterable[int]] = None, index: Optional[faiss.Index] = None,
+                 index_type: Optional[str] = None):
+        self.dim = int(dim)
+        if vectors is None:
+            vectors = np.zeros((0, self.dim), dtype=np.float32)
+        elif not isinstance(vectors, np.memmap):  # Keep memory maps as-is (no private copy)
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.vectors = vectors
+        # Either mutable dicts (builds) or a memory-mapped AgentMetadata view (serving)
+        self.metadata: Optional[AgentMetadata] = agents if isinstance(agents, AgentMetadata) else None
+        self.agents: Sequence[dict] = self.metadata if self.metadata is not None else list(agents or [])
+        if len(self.agents) != self.vectors.shape[0]:
+            raise ValueError(f"Vector/agent count mismatch: {self.vectors.shape[0]} vectors vs {len(self.agents)} agents.")
+        if self.metadata is not None:
+            self._row_of: Optional[Dict[int, int]] = None  # Rows resolved by binary search over the mapped ids
+            known = [vid for vid, row in zip(tombstones or (), self.metadata.rows_of(list(tombstones or ()))) if row >= 0]
+        else:
+            for agent in self.agents:
+                agent.setdefault("vector_id", vector_id_for(agent["id"]))
+            self._row_of = {a["vector_id"]: row for row, a in enumerate(self.agents)}
+            if len(self._row_of) != len(self.agents):
+                raise ValueError("Duplicate vector ids in agent metadata (duplicate agent ids?).")
+            known = set(tombstones or ()) & set(self._row_of)
+        self.tombstones: Set[int] = set(known)
+        self.read_only = False  # Set by load(mmap=True): vectors/index are shared read-only mappings
+        self.index_type = index_type or (index_type_of(index) if index is not None else "flat")
+        self.index = index if index is not None else self._build_index(self.vectors, self.vector_ids())
+        self._lexical: Optional[BM25Index] = None  # Built lazily (or loaded) and dropped on mutation
+        self.neighbors: Optional[NeighborTable] = None  # Precomputed related agents (published builds only)
+        # Deployment-wide query knobs, used when a search call does not pass its own
+        self.default_nprobe: Optional[int] = None
+        self.default_ef_search: Optional[int] = None
+
+    # ---------------- Construction / persistence ----------------
+
+    @classmethod
+    def from_agents(cls, agents: Sequence[dict], vectors: np.ndarray, index_type: str = "auto") -> "AgentVectorStore":
+        """Build a fresh store from aligned agent dicts and normalized vectors ("auto" picks the index type by size)."""
+        agents = [dict(a, text_hash=a.get("text_hash") or text_hash(agent_text(a))) for a in agents]
+        if index_type == "auto":
+            index_type = choose_index_type(len(agents))
+        return cls(vectors.shape[1], vectors=vectors, agents=agents, index_type=index_type)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap: bool = False) -> "AgentVectorStore":
+        """
+        Load a store. Legacy positional artifacts (IndexFlatIP + agents.json) are upgraded in memory.
+        With `mmap=True` the index, embeddings and agents.meta (when present) are mapped
+        read-only (shared across processes) and the store refuses mutation.
+        """
+        directory = Path(directory)
+        agents = AgentMetadata.open(directory) if mmap else None
+        if agents is None:
+            with open(directory / AGENTS_FILE_NAME, "r", encoding="utf-8") as f:
+                agents = json.load(f)
+            if not isinstance(agents, list):
+                raise ValueError("Loaded agent data for search is not a list.")
+        index = faiss.read_index(str(directory / INDEX_FILE_NAME), FAISS_MMAP_FLAGS if mmap else 0)
+        if mmap and not FAISS_MMAP_IFC and not index_type_of(index).startswith("ivf"):
+            logging.warning(f"Faiss {faiss.__version__} has no IO_FLAG_MMAP_IFC: the {index_type_of(index)} index was read "
+                            "into private memory; only the embeddings and metadata are shared. Upgrade faiss-cpu to map it.")
+
+        embeddings_path = directory / EMBEDDINGS_FILE_NAME
+        if embeddings_path.is_file():
+            vectors = np.load(embeddings_path, mmap_mode="r" if mmap else None)
+        else:
+            # Older builds may lack embeddings.npy; recover the vectors from the index itself
+            vectors = index.reconstruct_n(0, index.ntotal)
+
+        tombstones = []
+        tombstones_path = directory / TOMBSTONES_FILE_NAME
+        if tombstones_path.is_file():
+            with open(tombstones_path, "r", encoding="utf-8") as f:
+                tombstones = json.load(f)
+
+        if not is_id_keyed(index):
+            logging.info("Positional (legacy) index found; re-keying vectors by stable agent ids.")
+            index = None  # Rebuilt from `vectors` with id mapping in __init__
+        store = cls(vectors.shape[1], vectors=vectors, agents=agents, tombstones=tombstones, index=index)
+        store.read_only = mmap
+        lexical_path = directory / LEXICAL_FILE_NAME
+        if mmap and lexical_path.is_file():
+            store._lexical = BM25Index.load(lexical_path)  # Builds always re-derive it from the current metadata
+        store.neighbors = NeighborTable.load(directory, mmap=mmap)  # Dropped on mutation; builds recompute it per version
+        if store.index.ntotal != len(store.agents):
+            logging.warning(f"Search Model Mismatch! Index vectors ({store.index.ntotal}) != agents loaded ({len(store.agents)}).")
+        return store
+
+    def save(self, directory: Union[str, Path]) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        _atomic_write(directory / EMBEDDINGS_FILE_NAME, _npy_writer(self.vectors))
+        _atomic_write(directory / INDEX_FILE_NAME, lambda p: faiss.write_index(self.index, str(p)))
+        _atomic_write(directory / AGENTS_FILE_NAME, _json_writer(self.agents))
+        _atomic_write(directory / METADATA_FILE_NAME, lambda p: write_metadata(p, self.agents))
+        self._lexical = BM25Index.build(self.agents)  # Metadata may have changed in place since the last build
+        _atomic_write(directory / LEXICAL_FILE_NAME, self._lexical.save)
+        _atomic_write(directory / TOMBSTONES_FILE_NAME, _json_writer(sorted(self.tombstones)))
+
+    # ---------------- Mutation ----------------
+
+    def upsert(self, agent: dict, vector: np.ndarray) -> bool:
+        """Insert or replace one agent's vector + metadata. Returns True if the agent is new."""
+        return self.upsert_many([agent], np.asarray(vector, dtype=np.float32).reshape(1, -1))[0] == 1
+
+    def upsert_many(self, agents: Sequence[dict], vectors: np.ndarray) -> Tuple[int, int]:
+        """Insert or replace several agents. Returns (inserted, updated) counts."""
+        self._check_writable()
+        self._lexical = None
+        self.neighbors = None
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(agents), self.dim):
+            raise ValueError(f"Expected vectors of shape ({len(agents)}, {self.dim}), got {vectors.shape}.")
+        latest: Dict[int, Tuple[dict, np.ndarray]] = {}
+        for agent, vec in zip(agents, vectors):
+            latest[vector_id_for(agent["id"])] = (agent, vec)  # Repeated ids: the last write wins
+        new_rows, new_agents, replaced_ids = [], [], []
+        for vid, (agent, vec) in latest.items():
+            agent = dict(agent, vector_id=vid)
+            agent.setdefault("text_hash", text_hash(agent_text(agent)))
+            row = self._row_of.get(vid)
+            if row is None:
+                new_rows.append(vec)
+                new_agents.append(agent)
+            else:
+                self.vectors[row] = vec
+                self.agents[row] = agent
+                replaced_ids.append(vid)
+            self.tombstones.discard(vid)  # Re-adding a deleted agent revives it
+
+        if new_agents:
+            start = len(self.agents)
+            self.vectors = np.vstack([self.vectors, np.vstack(new_rows)]).astype(np.float32, copy=False)
+            self.agents.extend(new_agents)
+            for offset, agent in enumerate(new_agents):
+                self._row_of[agent["vector_id"]] = start + offset
+        if replaced_ids and not supports_remove(self.index):
+            # e.g. HNSW: vectors cannot be replaced in place, so re-index the stored vectors (no re-encoding)
+            self.rebuild_index()
+            return len(new_agents), len(replaced_ids)
+        if replaced_ids:
+            ids = np.asarray(replaced_ids, dtype=np.int64)
+            self.index.remove_ids(ids)
+            self.index.add_with_ids(self.vectors[[self._row_of[v] for v in replaced_ids]], ids)
+        if new_agents:
+            new_ids = np.asarray([a["vector_id"] for a in new_agents], dtype=np.int64)
+            self.index.add_with_ids(self.vectors[start:], new_ids)
+        return len(new_agents), len(replaced_ids)
+
+    def delete(self, agent_id: str) -> bool:
+        """Tombstone an agent; its vector stays in the index (filtered out) until compaction."""
+        self._check_writable()
+        vid = vector_id_for(agent_id)
+        if vid not in self._row_of or vid in self.tombstones:
+            return False
+        self.tombstones.add(vid)
+        return True
+
+    def needs_compaction(self, ratio: float = DEFAULT_COMPACTION_RATIO) -> bool:
+        return bool(self.agents) and len(self.tombstones) / len(self.agents) >= ratio
+
+    def compact(self) -> int:
+        """Physically drop tombstoned rows from vectors, metadata and index. Returns rows removed."""
+        if not self.tombstones:
+            return 0
+        self._check_writable()
+        self._lexical = None
+        self.neighbors = None
+        keep = [row for row, a in enumerate(self.agents) if a["vector_id"] not in self.tombstones]
+        removed = len(self.agents) - len(keep)
+        can_remove = supports_remove(self.index)
+        if can_remove:
+            self.index.remove_ids(np.asarray(sorted(self.tombstones), dtype=np.int64))
+        self.vectors = np.ascontiguousarray(self.vectors[keep])
+        self.agents = [self.agents[row] for row in keep]
+        self._row_of = {a["vector_id"]: row for row, a in enumerate(self.agents)}
+        self.tombstones.clear()
+        if not can_remove:
+            self.rebuild_index()
+        logging.info(f"Compacted vector store: removed {removed} tombstoned rows, {len(self.agents)} remain.")
+        return removed
+
+    # ---------------- Queries ----------------
+
+    def rebuild_index(self, index_type: Optional[str] = None) -> None:
+        """Re-create the Faiss index from the stored vectors, optionally switching index type."""
+        if index_type is not None:
+            self.index_type = choose_index_type(len(self.agents)) if index_type == "auto" else index_type
+        self.index = self._build_index(self.vectors, self.vector_ids())
+        logging.info(f"Rebuilt '{self.index_type}' index over {self.index.ntotal} stored vectors.")
+
+    def search(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None,
+               ef_search: Optional[int] = None, allowed_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k search returning (scores, vector_ids), skipping tombstoned agents.
+        Over-fetches by the tombstone count so callers still receive k live hits.
+        `nprobe` (IVF) / `ef_search` (HNSW) override the deployment defaults for this call.
+        `allowed_ids` restricts the search to those vector ids (filtered search).
+        """
+        if allowed_ids is not None:
+            return self._search_allowed(queries, k, np.asarray(allowed_ids, dtype=np.int64), nprobe, ef_search)
+        fetch_k = min(k + len(self.tombstones), max(self.index.ntotal, 1))
+        params = search_parameters(self.index, nprobe or self.default_nprobe, ef_search or self.default_ef_search)
+        scores, ids = self.index.search(queries, fetch_k, params=params)
+        if not self.tombstones:
+            return scores[:, :k], ids[:, :k]
+        out_scores = np.full((ids.shape[0], k), -np.inf, dtype=np.float32)
+        out_ids = np.full((ids.shape[0], k), -1, dtype=np.int64)
+        dead = np.isin(ids, np.fromiter(self.tombstones, dtype=np.int64))
+        for row in range(ids.shape[0]):
+            live = ~dead[row] & (ids[row] != -1)
+            n = min(k, int(live.sum()))
+            out_scores[row, :n] = scores[row][live][:n]
+            out_ids[row, :n] = ids[row][live][:n]
+        return out_scores, out_ids
+
+    def _search_allowed(self, queries: np.ndarray, k: int, allowed_ids: np.ndarray,
+                        nprobe: Optional[int], ef_search: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k among `allowed_ids` only, padded with (-inf, -1) when fewer agents qualify."""
+        if self.tombstones:
+            allowed_ids = allowed_ids[~np.isin(allowed_ids, np.fromiter(self.tombstones, dtype=np.int64))]
+        out_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        out_ids = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        if len(allowed_ids) == 0:
+            return out_scores, out_ids
+
+        if len(allowed_ids) <= FILTER_BRUTE_FORCE_MAX:
+            rows = self.rows_of(allowed_ids)
+            allowed_ids, rows = allowed_ids[rows >= 0], rows[rows >= 0]
+            sims = queries @ self.vectors[rows].T  # (n_queries, n_allowed) inner products
+            n = min(k, len(rows))
+            top = np.argpartition(-sims, n - 1, axis=1)[:, :n] if n < len(rows) else np.tile(np.arange(n), (len(queries), 1))
+            top = np.take_along_axis(top, np.argsort(-np.take_along_axis(sims, top, axis=1), axis=1, kind="stable"), axis=1)
+            out_scores[:, :n] = np.take_along_axis(sims, top, axis=1)
+            out_ids[:, :n] = allowed_ids[top]
+            return out_scores, out_ids
+
+        # Larger selections: let Faiss skip non-matching ids while it searches
+        selector = faiss.IDSelectorBatch(allowed_ids)
+        params = search_parameters(self.index, nprobe or self.default_nprobe, ef_search or self.default_ef_search, sel=selector)
+        n = min(k, len(allowed_ids))
+        scores, ids = self.index.search(queries, n, params=params)
+        out_scores[:, :n], out_ids[:, :n] = scores, ids
+        return out_scores, out_ids
+
+    def vector_of(self, vector_id: int) -> Optional[np.ndarray]:
+        """Stored (normalized) embedding of an agent, or None if unknown or deleted. No encoding involved."""
+        vector_id = int(vector_id)
+        if vector_id in self.tombstones:
+            return None
+        row = int(self.rows_of([vector_id])[0])
+        return np.asarray(self.vectors[row], dtype=np.float32) if row >= 0 else None
+
+    def similar(self, vector_id: int, k: int, nprobe: Optional[int] = None,
+                ef_search: Optional[int] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        "More like this": 1-D top-k (scores, vector_ids) nearest to an agent's stored vector,
+        excluding the agent itself. None if the agent is not in the store. Served from the
+        precomputed neighbour table (one row read) when it holds at least k neighbours.
+        """
+        vector = self.vector_of(vector_id)
+        if vector is None:
+            return None
+        if self.has_neighbors(k):
+            scores, rows = self.neighbors.lookup(int(self.rows_of([vector_id])[0]), k)
+            if self.metadata is not None:
+                return scores, np.asarray(self.metadata.vector_ids[rows], dtype=np.int64)
+            return scores, np.asarray([self.agents[r]["vector_id"] for r in rows], dtype=np.int64)
+        scores, ids = self.search(vector[np.newaxis, :], k + 1, nprobe, ef_search)
+        keep = (ids[0] != -1) & (ids[0] != vector_id)  # Self is normally hit #1, but ANN indexes may miss it
+        return scores[0][keep][:k], ids[0][keep][:k]
+
+    def has_neighbors(self, k: int) -> bool:
+        """True when related-agent lookups of depth k can be answered from the neighbour table."""
+        return self.neighbors is not None and k <= self.neighbors.k
+
+    def build_neighbors(self, k: int) -> NeighborTable:
+        """Compute (and attach) the top-k neighbour table over the live agents."""
+        dead = self.rows_of(np.fromiter(self.tombstones, dtype=np.int64)) if self.tombstones else None
+        self.neighbors = NeighborTable.build(self.vectors, k, exclude_rows=dead)
+        return self.neighbors
+
+    def rows_of(self, vector_ids: np.ndarray) -> np.ndarray:
+        """Rows of the given vector ids (-1 for unknown ids)."""
+        if self.metadata is not None:
+            return self.metadata.rows_of(vector_ids)
+        return np.asarray([self._row_of.get(int(v), -1) for v in vector_ids], dtype=np.int64)
+
+    @property
+    def lexical(self) -> BM25Index:
+        """BM25 index over the agents' name/description/tags/capability/author."""
+        if self._lexical is None:
+            self._lexical = BM25Index.build(self.agents)
+        return self._lexical
+
+    def search_lexical(self, query: str, k: int, allowed_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 top-k as (scores, vector_ids) of shape (1, k), skipping tombstoned agents (like `search`)."""
+        exclude = np.fromiter(self.tombstones, dtype=np.int64) if self.tombstones else None
+        scores, ids = self.lexical.search(query, k, exclude_ids=exclude, allowed_ids=allowed_ids)
+        return scores[np.newaxis, :], ids[np.newaxis, :]
+
+    def lookup(self, vector_id: int) -> Optional[dict]:
+        """Agent metadata for a vector id, or None if unknown or deleted."""
+        vector_id = int(vector_id)
+        if vector_id in self.tombstones:
+            return None
+        if self.metadata is not None:
+            row = int(self.metadata.rows_of([vector_id])[0])
+            return self.metadata[row] if row >= 0 else None
+        row = self._row_of.get(vector_id)
+        return self.agents[row] if row is not None else None
+
+    def hydrate(self, vector_ids: Sequence[int], fields: Optional[Sequence[str]] = None) -> List[Optional[dict]]:
+        """
+        Metadata for a row of search hits in one call (None for -1 / unknown / deleted ids).
+        With memory-mapped metadata, ids are resolved by one vectorized binary search and
+        only `fields` are decoded; with in-memory dicts the full dicts are returned.
+        """
+        ids = np.asarray(vector_ids, dtype=np.int64).reshape(-1)
+        if self.metadata is not None:
+            rows = self.metadata.rows_of(ids)
+            if self.tombstones:
+                rows[np.isin(ids, np.fromiter(self.tombstones, dtype=np.int64))] = -1
+            return self.metadata.hydrate(rows, fields)
+        return [self.lookup(vid) if vid != -1 else None for vid in ids]
+
+    def vector_ids(self) -> np.ndarray:
+        """Vector ids in row order (aligned with `vectors` and `agents`)."""
+        if self.metadata is not None:
+            return np.asarray(self.metadata.vector_ids)
+        return np.asarray([a["vector_id"] for a in self.agents], dtype=np.int64)
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError("Vector store was loaded memory-mapped (read-only); load it with mmap=False to modify it.")
+
+    def _build_index(self, vectors: np.ndarray, ids: np.ndarray) -> faiss.Index:
+        index = build_index(self.index_type, self.dim, vectors, ids)
+        self.index_type = index_type_of(index)  # build_index may fall back (e.g. too few vectors to train IVF)
+        return index
+
+    @property
+    def live_count(self) -> int:
+        return len(self.agents) - len(self.tombstones)
+
+    def __len__(self) -> int:
+        return self.live_count
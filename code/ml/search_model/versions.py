@@ -0,0 +1,154 @@
+"""
+Versioned layout for search artifacts.
+
+    search_model/
+        CURRENT                 name of the version being served (replaced atomically)
+        versions/<version>/     one complete, immutable vector store + manifest.json
+
+Builds write into a fresh version directory and only then flip CURRENT, so a
+running backend never sees a half-written artifact set and can hot-swap to the
+new version. A root without CURRENT is treated as the legacy flat layout
+(artifacts directly in search_model/).
+
+The manifest lists every artifact file with its size, full sha256 and a sampled
+digest (sha256 over a fixed number of blocks spread across the file). Serving
+checks sizes + sampled digests before loading: constant I/O per file however
+large the index grows, yet it catches truncation, partial copies and files from a
+different build. `verify_files(..., full=True)` re-hashes everything.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+CURRENT_FILE_NAME = "CURRENT"
+VERSIONS_DIR_NAME = "versions"
+MANIFEST_FILE_NAME = "manifest.json"
+
+# Sampled digest: SAMPLE_BLOCKS blocks of SAMPLE_BLOCK_SIZE bytes, evenly spaced from head to tail
+SAMPLE_BLOCK_SIZE = 64 * 1024
+SAMPLE_BLOCKS = 16
+
+
+def current_version(root: Union[str, Path]) -> Optional[str]:
+    """Version named by root/CURRENT, or None for the legacy flat layout."""
+    pointer = Path(root) / CURRENT_FILE_NAME
+    if not pointer.is_file():
+        return None
+    version = pointer.read_text(encoding="utf-8").strip()
+    return version or None
+
+
+def resolve_current(root: Union[str, Path]) -> Tuple[Optional[str], Path]:
+    """(version, directory) of the artifacts that should be served."""
+    root = Path(root)
+    version = current_version(root)
+    if version is None:
+        return None, root
+    return version, root / VERSIONS_DIR_NAME / version
+
+
+def new_version_dir(root: Union[str, Path]) -> Tuple[str, Path]:
+    """Create an empty directory for the next version (timestamp-named, so versions sort by age)."""
+    version = datetime.now(tz=timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    path = Path(root) / VERSIONS_DIR_NAME / version
+    path.mkdir(parents=True, exist_ok=False)
+    return version, path
+
+
+def publish_version(root: Union[str, Path], version: str) -> None:
+    """Atomically point CURRENT at `version`."""
+    pointer = Path(root) / CURRENT_FILE_NAME
+    tmp = pointer.with_name(CURRENT_FILE_NAME + ".tmp")
+    tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp, pointer)
+
+
+def prune_versions(root: Union[str, Path], keep: int) -> list:
+    """Delete all but the newest `keep` versions (never the current one). Returns removed names."""
+    versions_dir = Path(root) / VERSIONS_DIR_NAME
+    if keep < 1 or not versions_dir.is_dir():
+        return []
+    current = current_version(root)
+    versions = sorted(p.name for p in versions_dir.iterdir() if p.is_dir())
+    removed = []
+    for name in versions[:-keep]:
+        if name != current:
+            shutil.rmtree(versions_dir / name, ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def write_manifest(directory: Union[str, Path], manifest: Dict[str, Any]) -> None:
+    path = Path(directory) / MANIFEST_FILE_NAME
+    tmp = path.with_name(MANIFEST_FILE_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def read_manifest(directory: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    path = Path(directory) / MANIFEST_FILE_NAME
+    if not path.is_file():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def sampled_digest(path: Union[str, Path]) -> str:
+    """sha256 over the file size and SAMPLE_BLOCKS evenly spaced blocks (the whole file if it is small)."""
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode("ascii"))
+    with open(path, "rb") as f:
+        if size <= SAMPLE_BLOCK_SIZE * SAMPLE_BLOCKS:
+            digest.update(f.read())
+        else:
+            span = size - SAMPLE_BLOCK_SIZE
+            for i in range(SAMPLE_BLOCKS):
+                f.seek(i * span // (SAMPLE_BLOCKS - 1))
+                digest.update(f.read(SAMPLE_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def full_digest(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_checksums(directory: Union[str, Path]) -> Dict[str, Dict[str, Any]]:
+    """Manifest "files" entry: size + full and sampled sha256 of every artifact file in a version directory."""
+    directory = Path(directory)
+    return {
+        p.name: {"size": p.stat().st_size, "sha256": full_digest(p), "sampled_sha256": sampled_digest(p)}
+        for p in sorted(directory.iterdir())
+        if p.is_file() and p.name != MANIFEST_FILE_NAME and not p.name.endswith(".tmp")
+    }
+
+
+def verify_files(directory: Union[str, Path], manifest: Dict[str, Any], full: bool = False) -> List[str]:
+    """
+    Problems found comparing the artifact files against the manifest (empty list = intact).
+    Default is the constant-time check (size + sampled digest); `full=True` re-hashes whole files.
+    """
+    directory = Path(directory)
+    problems = []
+    for name, expected in (manifest.get("files") or {}).items():
+        path = directory / name
+        if not path.is_file():
+            problems.append(f"{name}: missing")
+            continue
+        size = path.stat().st_size
+        if size != expected.get("size"):
+            problems.append(f"{name}: size {size} != manifest {expected.get('size')}")
+        elif full and full_digest(path) != expected.get("sha256"):
+            problems.append(f"{name}: sha256 mismatch")
+        elif not full and sampled_digest(path) != expected.get("sampled_sha256"):
+            problems.append(f"{name}: sampled sha256 mismatch")
+    return problems